@@ -14,10 +14,42 @@ from config import (
     PER_ORG_SEARCH_LIMIT_PAGES, PER_ORG_SEARCH_PAGE_SIZE,
     PDF_CACHE_DIR, WINDOW_FIELD,
 )
-from fetch_arxiv import iter_recent_cs, search_by_terms, get_arxiv_id
-from filters import beijing_previous_day_window, in_time_window, is_cs, is_target_topic
-from classify import group_by_org
+try:
+    from config import TOPIC_MAX_CANDIDATES
+except Exception:
+    TOPIC_MAX_CANDIDATES = 0
+try:
+    from config import LOCAL_DECIDE_ENABLED, LOCAL_DECIDE_MIN_CHARS
+except Exception:
+    LOCAL_DECIDE_ENABLED, LOCAL_DECIDE_MIN_CHARS = True, 200
+try:
+    from config import MINERU_MAX_INFLIGHT
+except Exception:
+    MINERU_MAX_INFLIGHT = 3
+try:
+    from config import MINERU_DOWNLOAD_CONCURRENCY
+except Exception:
+    MINERU_DOWNLOAD_CONCURRENCY = 4
+try:
+    from config import MINERU_MAX_POLL_SEC
+except Exception:
+    MINERU_MAX_POLL_SEC = 30
+try:
+    from config import MINERU_JOURNAL_DIR
+except Exception:
+    MINERU_JOURNAL_DIR = str(Path("data") / "mineru_journal")
+from fetch_arxiv import iter_recent_cs, sync_recent_cs, search_query, plan_term_queries, get_arxiv_id, cache_stats
+from meta_store import get_store
+from fetch_journal import open_journal
+from paper_entry import PaperEntry
+from filters import beijing_previous_day_window
+from classify import compile_patterns, attribute_orgs
+from batch_classify import classify_batch
+from candidates import CandidateIndex, drop_processed
 from prefetch import cache_pdfs
+from pdf_store import link_or_copy
+from pdf_text import first_pages_text
+from cache_manager import start_background_evict
 from utils import now_local
 from pdf2md import run_local_batch
 import json2decide as j2d
@@ -29,6 +61,7 @@ import json
 # 行为开关
 FILL_MISSING_BY_ORG = True       # 仅对“基线为空”的机构直搜补齐（更快）
 ALWAYS_PER_ORG_SEARCH = False    # True=所有机构都跑直搜（更全但更慢）
+DECIDE_PAGES = 3                 # 机构判定看前几页：本地抽 PDF 与 MinerU json 两条路径一致
 
 def _debug_print_window(now, start_utc, end_utc):
     if not DEBUG:
@@ -36,25 +69,38 @@ def _debug_print_window(now, start_utc, end_utc):
     print(f"[DEBUG] now local = {now.isoformat()}")
     print(f"[DEBUG] window (UTC) = {start_utc.isoformat()}  ->  {end_utc.isoformat()}")
 
-def _collect_baseline_entries(start_utc, end_utc, time_field_mode: str) -> List[Dict]:
-    entries: List[Dict] = []
-    total_scanned = 0
-    for e in iter_recent_cs(start_utc=start_utc):
-        total_scanned += 1
-        if is_cs(e) and in_time_window(e, start_utc, end_utc, time_field_mode):
-            entries.append(e)
+def _collect_baseline_entries(start_utc, end_utc, time_field_mode: str, journal=None) -> List[PaperEntry]:
+    store = get_store()
+    # 窗口以日期范围子句下推到 arXiv 查询里，服务端只返回窗口内的条目
+    date_field = "lastUpdatedDate" if time_field_mode == "updated" else "submittedDate"
+    if store is not None:
+        # 增量同步到本地库，再用索引查询取窗口（等价于 in_time_window）
+        fetched = sync_recent_cs(store, start_utc, end_utc, date_field, journal=journal)
+        rows = store.query_window(start_utc, end_utc, time_field_mode)
+        total_scanned = len(rows)
+        batch = classify_batch(rows, orgs=False, topics=False)
+        entries = batch.select(batch.is_cs)
+        if DEBUG:
+            print(f"[DEBUG] meta store sync: fetched={fetched}  window_rows={total_scanned}  baseline_matches={len(entries)}")
+        return entries
+    rows = list(iter_recent_cs(start_utc=start_utc, end_utc=end_utc, date_field=date_field, journal=journal))
+    total_scanned = len(rows)
+    batch = classify_batch(rows, start_utc, end_utc, time_field_mode, orgs=False, topics=False)
+    entries = batch.select()
     if DEBUG:
         print(f"[DEBUG] scanned={total_scanned}  baseline_matches={len(entries)}")
     return entries
 
 
-def build_candidates_with_fallback(baseline_entries: List[Dict], start_utc, end_utc, time_field_mode: str) -> List[Dict]:
+def build_candidates_with_fallback(baseline_entries: List[PaperEntry], start_utc, end_utc, time_field_mode: str,
+                                   journal=None) -> List[PaperEntry]:
     """
     1) 用摘要/标题对 baseline 做粗分（只为确定需要直搜的机构，不用于最终分类）。
-    2) 对选定机构逐个执行 per-org 直搜（可配置深度），合并去重，返回候选列表。
-       —— 诊断日志：raw（直搜返回总数）、in_window（落在窗口的）、added（真正新增）。
+    2) 把选定机构的关键词打包成少量带日期范围的 OR 查询（plan_term_queries），合并去重，返回候选列表；
+       结果再按机构规则在本地归属回各机构（attribute_orgs），仅用于诊断日志。
+       —— 诊断日志：raw（查询返回总数）、in_window（落在窗口的）、added（真正新增）。
     """
-    rough = group_by_org(baseline_entries)
+    rough = classify_batch(baseline_entries, topics=False).buckets()
     if DEBUG:
         print(f"[DEBUG] baseline org-buckets(rough): { {k: len(v) for k, v in rough.items()} }")
 
@@ -68,39 +114,52 @@ def build_candidates_with_fallback(baseline_entries: List[Dict], start_utc, end_
     if DEBUG:
         print(f"[DEBUG] per-org search targets: {targets}")
 
-    merged = list(baseline_entries)
-    seen_ids = { (e.get("id") or "") for e in merged }
+    # 按 base id 去重，同一篇只留最新版本（基线 v1 + 直搜 v2 → v2）
+    index = CandidateIndex(baseline_entries)
+
+    org_terms = {org: ORG_SEARCH_TERMS.get(org, []) for org in targets}
+    date_field = "lastUpdatedDate" if time_field_mode == "updated" else "submittedDate"
+    plan = plan_term_queries(org_terms, start_utc, end_utc, date_field=date_field)
+    if DEBUG:
+        print(f"[DEBUG] per-org search: {len(targets)} orgs -> {len(plan)} batched queries")
 
-    def _job(org: str):
-        terms = ORG_SEARCH_TERMS.get(org, [])
-        if not terms:
-            return org, []
-        raw_list = list(search_by_terms(
-            terms,
-            limit_pages=PER_ORG_SEARCH_LIMIT_PAGES,
-            page_size=PER_ORG_SEARCH_PAGE_SIZE
+    def _job(q):
+        # 合并查询覆盖多个机构，且都带日期范围子句（结果有界）：翻到 totalResults，
+        # 不套单个机构的页数上限（否则宽窗口回补时会被截断在 5×200 条）
+        raw_list = list(search_query(
+            q.query,
+            limit_pages=None if (start_utc and end_utc) else PER_ORG_SEARCH_LIMIT_PAGES,
+            page_size=PER_ORG_SEARCH_PAGE_SIZE,
+            store=get_store(),
+            journal=journal,
         ))
-        return org, raw_list
+        return q, raw_list
 
+    compiled = compile_patterns()
+    per_org_added: Dict[str, int] = {org: 0 for org in targets}
     org_search_concurrency = getattr(build_candidates_with_fallback, "_org_search_concurrency", 1)
     with ThreadPoolExecutor(max_workers=max(1, int(org_search_concurrency))) as ex:
-        futures = { ex.submit(_job, org): org for org in targets }
+        futures = [ex.submit(_job, q) for q in plan]
         for fut in as_completed(futures):
-            org, raw_list = fut.result()
+            q, raw_list = fut.result()
             total_raw = len(raw_list)
-            after_window = [e for e in raw_list if is_cs(e) and in_time_window(e, start_utc, end_utc, time_field_mode)]
+            after_window = classify_batch(raw_list, start_utc, end_utc, time_field_mode, orgs=False, topics=False).select()
             total_window = len(after_window)
-            before = len(merged)
+            added = newer = 0
             for e in after_window:
-                xid = e.get("id") or ""
-                if xid not in seen_ids:
-                    merged.append(e)
-                    seen_ids.add(xid)
-            added = len(merged) - before
+                how = index.add(e)
+                if how == "new":
+                    added += 1
+                    for org in attribute_orgs(e, compiled, q.orgs, org_terms):
+                        per_org_added[org] += 1
+                elif how == "newer":
+                    newer += 1
             if DEBUG:
-                print(f"[FALLBACK-DEBUG] {org}: raw={total_raw}, in_window={total_window}, added={added}, merged total now {len(merged)}")
+                print(f"[FALLBACK-DEBUG] query({len(q.orgs)} orgs, {len(q.terms)} terms): raw={total_raw}, in_window={total_window}, added={added}, newer_version={newer}, merged total now {len(index)}")
 
-    return merged
+    if DEBUG and targets:
+        print(f"[FALLBACK-DEBUG] added by org: { {k: v for k, v in per_org_added.items() if v} }")
+    return index.entries()
 
 def main():
     pa = argparse.ArgumentParser("app2")
@@ -124,19 +183,33 @@ def main():
         start_utc = end_utc - timedelta(hours=window_hours)
     else:
         start_utc, end_utc = beijing_previous_day_window(now)
-    _debug_print_window(now, start_utc, end_utc)
 
     # 2) 候选集 = 基线 +（按需）per-org 直搜补齐
-    baseline_entries = _collect_baseline_entries(start_utc, end_utc, time_field_mode)
+    #    抓取过程按 shard/查询记断点日志：中途退出后重跑同一窗口会从断点续抓，整轮完成后删除日志
+    journal = open_journal(start_utc, end_utc, time_field_mode, window_hours=window_hours)
+    if journal is not None and journal.window is not None:
+        start_utc, end_utc = journal.window   # --window-hours 续跑：沿用上次中断时的窗口（过旧的已被 open_journal 丢弃）
+    _debug_print_window(now, start_utc, end_utc)
+    baseline_entries = _collect_baseline_entries(start_utc, end_utc, time_field_mode, journal)
     build_candidates_with_fallback._org_search_concurrency = org_search_concurrency
-    candidates = build_candidates_with_fallback(baseline_entries, start_utc, end_utc, time_field_mode)
+    candidates = build_candidates_with_fallback(baseline_entries, start_utc, end_utc, time_field_mode, journal)
+    if journal is not None:
+        journal.finish()
+    if DEBUG and cache_stats() is not None:
+        print(f"[DEBUG] arXiv http cache: {cache_stats()}")
     
 
     if ENABLE_TOPIC_FILTER:
         before = len(candidates)
-        candidates = [e for e in candidates if is_target_topic(e)]
+        batch = classify_batch(candidates, orgs=False, topics=True)
+        scored = [(s, e) for s, e in zip(batch.topics, batch.entries) if s.accepted]
+        if TOPIC_MAX_CANDIDATES and len(scored) > TOPIC_MAX_CANDIDATES:
+            # 按主题分截断（稳定排序，同分保持原顺序）
+            scored = sorted(scored, key=lambda se: -se[0].score)[:TOPIC_MAX_CANDIDATES]
+        candidates = [e for _, e in scored]
         if DEBUG:
-            print(f"[DEBUG] topic filter: {before} -> {len(candidates)}")
+            top = ", ".join(f"{e.arxiv_id}:{s.score:g}" for s, e in sorted(scored, key=lambda se: -se[0].score)[:5])
+            print(f"[DEBUG] topic filter: {before} -> {len(candidates)}  top scores: {top}")
 
     if DEBUG:
         print(f"[DEBUG] candidates after fallback merge: {len(candidates)}")
@@ -144,9 +217,15 @@ def main():
     if not candidates:
         print("昨天窗口内没有候选论文（基线 + 直搜均为空）。")
         return
-    # 3) 缓存 PDF 到 cache_pdfs/当日日期
     run_date = now.date().isoformat()
+    # 之前某天已处理过同一版本的论文不再下载/解析/判定
+    candidates, already = drop_processed(candidates, run_date)
+    if not candidates:
+        print(f"候选论文此前均已处理过（{len(already)} 篇，版本未变）。")
+        return
+    # 3) 缓存 PDF 到 cache_pdfs/当日日期
     id2pdf = cache_pdfs(candidates, subdir=run_date)
+    stem2aid = {Path(p).stem: aid for aid, p in id2pdf.items()}
 
     cache_root = Path(PDF_CACHE_DIR) / run_date
     pdfs = sorted(cache_root.rglob("*.pdf"))
@@ -185,6 +264,7 @@ def main():
     out_decide_dir.mkdir(parents=True, exist_ok=True)
     out_decide_path = out_decide_dir / f"{run_date}.json"
     decided_stems = set()
+    decided_large = set()
     if out_decide_path.exists():
         try:
             _t = out_decide_path.read_text(encoding="utf-8", errors="ignore")
@@ -196,6 +276,8 @@ def main():
                         _fn = str((_it or {}).get("文件名") or "")
                         if _fn:
                             decided_stems.add(Path(_fn).stem)
+                            if bool((_it or {}).get("is_large", False)):
+                                decided_large.add(Path(_fn).stem)
                     except Exception:
                         pass
             except Exception:
@@ -205,6 +287,8 @@ def main():
                         _fn = str((_it or {}).get("文件名") or "")
                         if _fn:
                             decided_stems.add(Path(_fn).stem)
+                            if bool((_it or {}).get("is_large", False)):
+                                decided_large.add(Path(_fn).stem)
                     except Exception:
                         continue
         except Exception:
@@ -243,8 +327,74 @@ def main():
     out_gather_dir.mkdir(parents=True, exist_ok=True)
     out_gather_path = out_gather_dir / f"{run_date}.txt"
     futures = []
+    local_large: set = set()   # 本地前几页已判定为 is_large 的 stem
+    def mark_processed(stem: str) -> None:
+        # 论文走完全流程才记入已处理账本：small 判定后即完成，large 要等摘要写出来
+        _store = get_store()
+        if _store is not None:
+            _store.mark_processed(stem2aid.get(stem, stem), run_date)
+
+    def record_decision(item: Dict, stem: str) -> None:
+        with lock:
+            j2d.append_result(out_decide_path, item)
+            try:
+                _fn = str(item.get("文件名") or "").strip()
+                if _fn:
+                    decided_stems.add(Path(_fn).stem)
+            except Exception:
+                pass
+        if not bool(item.get("is_large", False)):
+            mark_processed(stem)
+
+    def handle_large(stem: str) -> None:
+        """is_large 的论文：PDF/MD 放进 dataSelect，并生成摘要"""
+        src_md = (Path("data") / "md" / run_date / f"{stem}.md")
+        dst_md_dir = Path("dataSelect") / "md" / run_date
+        dst_pdf_dir = Path("dataSelect") / "pdf" / run_date
+        dst_md_dir.mkdir(parents=True, exist_ok=True)
+        dst_pdf_dir.mkdir(parents=True, exist_ok=True)
+        src_pdf = (Path(PDF_CACHE_DIR) / run_date / f"{stem}.pdf")
+        if not src_pdf.exists():
+            found = list((Path(PDF_CACHE_DIR) / run_date).rglob(f"{stem}.pdf"))
+            if found:
+                src_pdf = found[0]
+        if src_pdf.exists():
+            dst_pdf = dst_pdf_dir / src_pdf.name
+            if not dst_pdf.exists():
+                link_or_copy(src_pdf, dst_pdf)
+        if src_md.exists():
+            dst_md = dst_md_dir / src_md.name
+            if not dst_md.exists():
+                import shutil
+                shutil.copy2(src_md, dst_md)
+            one_out = out_summary_dir / f"{stem}.txt"
+            if not one_out.exists():
+                md_text = dst_md.read_text(encoding="utf-8", errors="ignore")
+                sum_client = psum.make_client(api_key=api_key, base_url=summary_base_url)
+                summary = psum.summarize_md(
+                    sum_client,
+                    summary_model,
+                    md_text,
+                    file_name=dst_md.name,
+                    system_prompt=sum_system_prompt or None,
+                    user_prompt_prefix=sum_user_prompt or None,
+                )
+                one_out.write_text(summary, encoding="utf-8")
+                with sum_lock:
+                    with out_gather_path.open("a", encoding="utf-8") as f:
+                        f.write(summary)
+                        f.write("\n\n\n############################################################\n\n\n")
+            mark_processed(stem)
+
     def on_json(path: Path) -> None:
         def job(pth: Path) -> None:
+            if pth.stem in local_large:
+                # 本地前几页已判定为 is_large，MinerU 只是为了拿全文 MD
+                try:
+                    handle_large(pth.stem)
+                except Exception:
+                    pass
+                return
             if args.runModel == "B":
                 try:
                     _stem = pth.stem
@@ -253,58 +403,15 @@ def main():
                             return
                 except Exception:
                     pass
-            text = j2d.load_first_pages_text(pth, max_page_idx=2)
+            text = j2d.load_first_pages_text(pth, max_page_idx=DECIDE_PAGES - 1)
             item = j2d.call_qwen_plus(api_key, base_url_llm, model_llm, text, file_name=pth.name, sys_prompt=org_sys_prompt or None)
-            with lock:
-                j2d.append_result(out_decide_path, item)
-                try:
-                    _fn = str(item.get("文件名") or "").strip()
-                    if _fn:
-                        decided_stems.add(Path(_fn).stem)
-                except Exception:
-                    pass
+            record_decision(item, pth.stem)
             try:
                 if bool(item.get("is_large", False)):
                     fn = str(item.get("文件名") or "").strip()
                     stem = Path(fn).stem
                     if stem:
-                        src_md = (Path("data") / "md" / run_date / f"{stem}.md")
-                        dst_md_dir = Path("dataSelect") / "md" / run_date
-                        dst_pdf_dir = Path("dataSelect") / "pdf" / run_date
-                        dst_md_dir.mkdir(parents=True, exist_ok=True)
-                        dst_pdf_dir.mkdir(parents=True, exist_ok=True)
-                        src_pdf = (Path(PDF_CACHE_DIR) / run_date / f"{stem}.pdf")
-                        if not src_pdf.exists():
-                            found = list((Path(PDF_CACHE_DIR) / run_date).rglob(f"{stem}.pdf"))
-                            if found:
-                                src_pdf = found[0]
-                        if src_pdf.exists():
-                            dst_pdf = dst_pdf_dir / src_pdf.name
-                            if not dst_pdf.exists():
-                                import shutil
-                                shutil.copy2(src_pdf, dst_pdf)
-                        if src_md.exists():
-                            dst_md = dst_md_dir / src_md.name
-                            if not dst_md.exists():
-                                import shutil
-                                shutil.copy2(src_md, dst_md)
-                            one_out = out_summary_dir / f"{stem}.txt"
-                            if not one_out.exists():
-                                md_text = dst_md.read_text(encoding="utf-8", errors="ignore")
-                                sum_client = psum.make_client(api_key=api_key, base_url=summary_base_url)
-                                summary = psum.summarize_md(
-                                    sum_client,
-                                    summary_model,
-                                    md_text,
-                                    file_name=dst_md.name,
-                                    system_prompt=sum_system_prompt or None,
-                                    user_prompt_prefix=sum_user_prompt or None,
-                                )
-                                one_out.write_text(summary, encoding="utf-8")
-                                with sum_lock:
-                                    with out_gather_path.open("a", encoding="utf-8") as f:
-                                        f.write(summary)
-                                        f.write("\n\n\n############################################################\n\n\n")
+                        handle_large(stem)
             except Exception:
                 pass
         futures.append(ex.submit(job, path))
@@ -324,8 +431,36 @@ def main():
                         continue
         except Exception:
             pass
+    # 3.5) 先用本地抽出的前几页文字做机构判定，只把 is_large 的送 MinerU 解析全文；
+    #      抽不到文字的（扫描件 / 没装 PyMuPDF、pypdf）或判定出错的，照旧由 MinerU 解析后再判定
+    if LOCAL_DECIDE_ENABLED:
+        def local_job(p: Path) -> str:
+            if args.runModel == "B":
+                with lock:
+                    if p.stem in decided_stems:
+                        return "large" if p.stem in decided_large else "small"
+                if (Path("data") / "json" / run_date / f"{p.stem}.json").exists():
+                    return "mineru"   # 已有 MinerU 结果，由上面的续跑逻辑判定
+            try:
+                text = first_pages_text(p, max_pages=DECIDE_PAGES)
+                if len(text) < LOCAL_DECIDE_MIN_CHARS:
+                    return "mineru"
+                item = j2d.call_qwen_plus(api_key, base_url_llm, model_llm, text, file_name=p.name, sys_prompt=org_sys_prompt or None)
+            except Exception as e:
+                print(f"[WARN] local decide {p.name}: {e}")
+                return "mineru"
+            record_decision(item, p.stem)
+            return "large" if bool(item.get("is_large", False)) else "small"
+
+        with ThreadPoolExecutor(max_workers=decide_concurrency) as lex:
+            outcomes = dict(zip(pdfs, lex.map(local_job, pdfs)))
+        local_large.update(p.stem for p, o in outcomes.items() if o == "large")
+        n_total = len(pdfs)
+        pdfs = [p for p in pdfs if outcomes[p] != "small"]
+        print(f"[local-decide] {n_total} pdfs: large={len(local_large)} "
+              f"small={n_total - len(pdfs)} fallback={len(pdfs) - len(local_large)} -> MinerU {len(pdfs)}")
     try:
-        run_local_batch(
+        mineru_stats = run_local_batch(
             pdfs=pdfs,
             out_md_root=Path("data") / "md",
             out_json_root=Path("data") / "json",
@@ -347,7 +482,13 @@ def main():
             limit_files=limit_files,
             on_json=on_json,
             skip_existing=(args.runModel == "B"),
+            max_inflight=MINERU_MAX_INFLIGHT,
+            download_concurrency=MINERU_DOWNLOAD_CONCURRENCY,
+            max_poll_sec=MINERU_MAX_POLL_SEC,
+            journal_dir=Path(MINERU_JOURNAL_DIR) if MINERU_JOURNAL_DIR else None,
         )
+        # 排队时间 / 每页解析耗时 / 轮询次数，便于调 MINERU_MAX_INFLIGHT 与轮询间隔
+        print(f"[mineru] {mineru_stats}")
     finally:
         for f in futures:
             try:
@@ -356,6 +497,8 @@ def main():
                 pass
         ex.shutdown(wait=True)
 
+    # MinerU 已跑完，缓存清理与后面的汇总/拷贝并行
+    evict_thread = start_background_evict()
     _argv = list(sys.argv)
     try:
         sys.argv = [sys.argv[0]]
@@ -373,6 +516,8 @@ def main():
         print(str(copy_path))
     except Exception:
         pass
+    if evict_thread is not None:
+        evict_thread.join()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,71 @@
+# atom_parser.py
+"""
+arXiv Atom 流式解析：用 ElementTree.iterparse 边读边解析响应体，
+直接产出 PaperEntry 条目（与 fetch_arxiv._entry_to_dict 结果一致），替代 feedparser。
+"""
+from __future__ import annotations
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, List, Optional
+
+from paper_entry import PaperEntry
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_ARXIV = "{http://arxiv.org/schemas/atom}"
+_OSEARCH = "{http://a9.com/-/spec/opensearch/1.1/}"
+
+class FeedPage:
+    """一页结果：entries + opensearch:totalResults（服务端报告的总条数）"""
+    __slots__ = ("entries", "total_results")
+
+    def __init__(self, entries: List[PaperEntry], total_results: Optional[int]):
+        self.entries = entries
+        self.total_results = total_results
+
+def _text(elem: Optional[ET.Element]) -> str:
+    return (elem.text or "").strip() if elem is not None else ""
+
+def _entry_from_elem(el: ET.Element) -> PaperEntry:
+    pdf_url = None
+    for ln in el.iter(f"{_ATOM}link"):
+        if ln.get("type") == "application/pdf":
+            pdf_url = ln.get("href")
+            break
+    prim = el.find(f"{_ARXIV}primary_category")
+    # published/updated 以原始字符串传入，由 PaperEntry 构造时解析
+    return PaperEntry(
+        id=_text(el.find(f"{_ATOM}id")),
+        title=_text(el.find(f"{_ATOM}title")),
+        summary=_text(el.find(f"{_ATOM}summary")),
+        authors=[_text(a.find(f"{_ATOM}name")) for a in el.iter(f"{_ATOM}author")],
+        published=_text(el.find(f"{_ATOM}published")),
+        updated=_text(el.find(f"{_ATOM}updated")),
+        primary_category=prim.get("term") if prim is not None else None,
+        comment=_text(el.find(f"{_ARXIV}comment")),
+        journal_ref=_text(el.find(f"{_ARXIV}journal_ref")),
+        pdf_url=pdf_url,
+    )
+
+def parse_stream(fp: BinaryIO) -> FeedPage:
+    """从文件对象（如 requests 的 r.raw）增量解析一页 Atom；每个 entry 解析完即释放其子树"""
+    entries: List[PaperEntry] = []
+    total: Optional[int] = None
+    root = None
+    for event, el in ET.iterparse(fp, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = el
+            continue
+        if el.tag == f"{_ATOM}entry":
+            entries.append(_entry_from_elem(el))
+            el.clear()
+            root.remove(el)
+        elif el.tag == f"{_OSEARCH}totalResults":
+            try:
+                total = int((el.text or "").strip())
+            except ValueError:
+                total = None
+    return FeedPage(entries, total)
+
+def parse_bytes(data: bytes) -> FeedPage:
+    import io
+    return parse_stream(io.BytesIO(data))
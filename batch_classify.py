@@ -0,0 +1,140 @@
+# batch_classify.py
+"""
+整批候选的分类：一次调用得到 is_cs / 窗口内 / 机构归属 / 主题分，替代 app2 里逐条的列表推导。
+- 时间与类别按列存（published/updated 两列 + array 类别编号），列建好后，
+  窗口/类别过滤只是对整列的比较，不再逐条走 as_entry/属性；多周回补按天切窗时同一份列可反复用。
+  is_cs 只对去重后的类别算一次。
+- 机构匹配与主题打分（classify.OrgMatcher / filters.TopicScorer）在条目很多时（多周回补）分块交给进程池。
+只用标准库（array + concurrent.futures），不引入 NumPy：时间列直接存 datetime，
+比较在 C 层完成，换算成整数时间戳反而更慢。
+"""
+from __future__ import annotations
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from classify import compile_patterns
+from filters import TopicScore, is_cs, topic_scorer
+from paper_entry import PaperEntry, as_entry
+
+# 条目数超过阈值才启用进程池（进程启动 + 传输文本的开销在小批量上不划算）
+try:
+    from config import CLASSIFY_PROCESS_THRESHOLD
+except Exception:
+    CLASSIFY_PROCESS_THRESHOLD = 5000
+try:
+    from config import CLASSIFY_WORKERS
+except Exception:
+    CLASSIFY_WORKERS = 0   # 0 = os.cpu_count()
+
+class EntryColumns:
+    """条目的列式视图：published/updated（UTC datetime | None）与 primary_category 编号"""
+    def __init__(self, entries: Sequence[PaperEntry]):
+        self.published: List[Optional[datetime]] = [e.published for e in entries]
+        self.updated: List[Optional[datetime]] = [e.updated for e in entries]
+        self._effective: Dict[str, List[Optional[datetime]]] = {}
+        codes: Dict[Optional[str], int] = {}
+        self.category = array("I", (codes.setdefault(e.primary_category, len(codes)) for e in entries))
+        self.categories: List[Optional[str]] = list(codes)
+
+    def __len__(self) -> int:
+        return len(self.category)
+
+    def cs_mask(self) -> List[bool]:
+        flags = [is_cs(PaperEntry(id="", primary_category=c)) for c in self.categories]
+        return [flags[c] for c in self.category]
+
+    def window_mask(self, start_utc: datetime, end_utc: datetime, mode: str = "both") -> List[bool]:
+        """与 filters.in_time_window 等价：mode='updated' 优先 updated，否则优先 published"""
+        key = "updated" if mode == "updated" else "published"
+        eff = self._effective.get(key)
+        if eff is None:
+            first, second = (self.updated, self.published) if key == "updated" else (self.published, self.updated)
+            eff = self._effective[key] = [a or b for a, b in zip(first, second)]
+        return [dt is not None and start_utc <= dt <= end_utc for dt in eff]
+
+@dataclass
+class BatchResult:
+    entries: List[PaperEntry]
+    is_cs: List[bool]
+    in_window: List[bool]                         # 未给窗口时全为 True
+    orgs: Optional[List[List[str]]] = None        # orgs=False 时为 None
+    topics: Optional[List[TopicScore]] = None     # topics=False 时为 None
+    columns: Optional[EntryColumns] = field(default=None, repr=False)
+
+    def mask(self) -> List[bool]:
+        """is_cs 且在窗口内"""
+        return [a and b for a, b in zip(self.is_cs, self.in_window)]
+
+    def select(self, mask: Optional[Iterable[bool]] = None) -> List[PaperEntry]:
+        mask = self.mask() if mask is None else mask
+        return [e for e, keep in zip(self.entries, mask) if keep]
+
+    def buckets(self, mask: Optional[Iterable[bool]] = None) -> Dict[str, List[PaperEntry]]:
+        """与 classify.group_by_org 相同的机构分桶（按 mask 过滤，默认不过滤）"""
+        if self.orgs is None:
+            raise ValueError("classify_batch(..., orgs=False) 没有机构结果")
+        out: Dict[str, List[PaperEntry]] = {}
+        mask = [True] * len(self.entries) if mask is None else mask
+        for e, hits, keep in zip(self.entries, self.orgs, mask):
+            if keep:
+                for org in hits:
+                    out.setdefault(org, []).append(e)
+        return out
+
+# ---- 进程池：只传文本字段，结果按块顺序拼回 ----
+def _text_fields(e: PaperEntry) -> Tuple:
+    return (e.title, e.summary, e.comment, e.journal_ref, e.authors)
+
+def _match_chunk(args) -> Tuple[Optional[List[List[str]]], Optional[List[TopicScore]]]:
+    rows, want_orgs, want_topics = args
+    entries = [PaperEntry(id="", title=t, summary=s, comment=c, journal_ref=j, authors=a) for t, s, c, j, a in rows]
+    return _match_local(entries, want_orgs, want_topics)
+
+def _match_local(entries: Sequence[PaperEntry], want_orgs: bool, want_topics: bool):
+    orgs = topics = None
+    if want_orgs:
+        matcher = compile_patterns()
+        orgs = [matcher.match(e.haystack, low=e.haystack_lower) for e in entries]
+    if want_topics:
+        scorer = topic_scorer()
+        topics = [scorer.score(e) for e in entries]
+    return orgs, topics
+
+def _match(entries: Sequence[PaperEntry], want_orgs: bool, want_topics: bool, workers: int):
+    if workers <= 1 or len(entries) < CLASSIFY_PROCESS_THRESHOLD:
+        return _match_local(entries, want_orgs, want_topics)
+    size = -(-len(entries) // (workers * 4))
+    chunks = [([_text_fields(e) for e in entries[i:i + size]], want_orgs, want_topics)
+              for i in range(0, len(entries), size)]
+    orgs: Optional[List[List[str]]] = [] if want_orgs else None
+    topics: Optional[List[TopicScore]] = [] if want_topics else None
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        for o, t in ex.map(_match_chunk, chunks):
+            if orgs is not None:
+                orgs.extend(o)
+            if topics is not None:
+                topics.extend(t)
+    return orgs, topics
+
+def classify_batch(entries: Iterable, start_utc: Optional[datetime] = None, end_utc: Optional[datetime] = None,
+                   mode: str = "both", orgs: bool = True, topics: bool = True,
+                   workers: Optional[int] = None) -> BatchResult:
+    """
+    对整批条目一次算出 is_cs / in_window / 机构 / 主题分。
+    orgs/topics=False 时跳过对应的文本匹配；workers 默认取 CLASSIFY_WORKERS（0 = CPU 数），
+    只有条目数达到 CLASSIFY_PROCESS_THRESHOLD 时才真的起进程池。
+    """
+    rows = [as_entry(e) for e in entries]
+    cols = EntryColumns(rows)
+    cs = cols.cs_mask()
+    if start_utc is not None and end_utc is not None:
+        win = cols.window_mask(start_utc, end_utc, mode)
+    else:
+        win = [True] * len(rows)
+    n_workers = workers if workers is not None else (CLASSIFY_WORKERS or os.cpu_count() or 1)
+    org_hits, topic_scores = _match(rows, orgs, topics, n_workers) if (orgs or topics) else (None, None)
+    return BatchResult(rows, cs, win, org_hits, topic_scores, cols)
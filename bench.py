@@ -0,0 +1,286 @@
+# bench.py
+"""
+抓取/分类热路径的小型基准脚本（不参与主流程）。
+
+    python bench.py atom --pages "bench_data/atom/*.xml"   # 用录制的 Atom 页对比 feedparser 与流式解析
+    python bench.py atom --record 3                         # 先从 arXiv 录制 3 页到 bench_data/atom/
+    python bench.py entry --n 20000                         # 旧 dict 条目 vs PaperEntry：内存与字段访问
+    python bench.py classify                                # 机构匹配 / 主题过滤：逐正则 vs OrgMatcher / TopicScorer
+    python bench.py batch --n 12000                         # cs+窗口过滤：逐条 vs classify_batch 列式（单窗口 / 按天 7 个窗口）
+"""
+from __future__ import annotations
+import argparse
+import glob
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List
+
+BENCH_DATA = Path("bench_data")
+
+def _timeit(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def _peak_kib(fn: Callable[[], object]) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+def _synthetic_page(n: int) -> bytes:
+    """没有录制数据时，生成一页结构与 arXiv API 一致的 Atom"""
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+        'xmlns:arxiv="http://arxiv.org/schemas/atom">'
+        f"<title>ArXiv Query</title><opensearch:totalResults>{n * 5}</opensearch:totalResults>"
+    ]
+    for i in range(n):
+        aid = f"2601.{i:05d}v1"
+        parts.append(
+            f"<entry><id>http://arxiv.org/abs/{aid}</id>"
+            "<updated>2026-01-05T18:59:59Z</updated><published>2026-01-05T18:59:59Z</published>"
+            f"<title>Scaling Large Language Model Agents with Tool Use, Part {i}</title>"
+            "<summary>" + ("We study post-training of transformer agents on long context tasks. " * 12) + "</summary>"
+            + "".join(f"<author><name>Author {i}-{k}</name></author>" for k in range(6))
+            + "<arxiv:comment>12 pages, 5 figures</arxiv:comment>"
+            f'<link href="http://arxiv.org/abs/{aid}" rel="alternate" type="text/html"/>'
+            f'<link title="pdf" href="http://arxiv.org/pdf/{aid}" rel="related" type="application/pdf"/>'
+            '<arxiv:primary_category term="cs.CL" scheme="http://arxiv.org/schemas/atom"/>'
+            '<category term="cs.CL" scheme="http://arxiv.org/schemas/atom"/></entry>'
+        )
+    parts.append("</feed>")
+    return "".join(parts).encode("utf-8")
+
+def _record_pages(n: int, out_dir: Path) -> None:
+    from fetch_arxiv import api_query
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(n):
+        xml = api_query({
+            "search_query": "cat:cs.CL", "sortBy": "submittedDate", "sortOrder": "descending",
+            "start": i * 200, "max_results": 200,
+        })
+        p = out_dir / f"page_{i:02d}.xml"
+        p.write_text(xml, encoding="utf-8")
+        print(f"recorded {p}")
+
+def bench_atom(args) -> None:
+    from atom_parser import parse_bytes
+    if args.record:
+        _record_pages(args.record, BENCH_DATA / "atom")
+        return
+    files = sorted(glob.glob(args.pages)) if args.pages else []
+    pages: List[bytes] = [Path(f).read_bytes() for f in files]
+    if not pages:
+        print("no recorded pages, using 3 synthetic pages of 200 entries")
+        pages = [_synthetic_page(200) for _ in range(3)]
+
+    def run_stream():
+        for data in pages:
+            for row in parse_bytes(data).entries:
+                row["published"]  # 主流程每条都会读 published
+
+    cases = {"stream": run_stream}
+    try:
+        import feedparser
+        from fetch_arxiv import _entry_to_dict
+
+        def run_feedparser():
+            for data in pages:
+                [_entry_to_dict(e) for e in feedparser.parse(data).entries]
+        cases["feedparser"] = run_feedparser
+    except ImportError:
+        print("feedparser not installed, skipping baseline")
+
+    n_entries = sum(len(parse_bytes(d).entries) for d in pages)
+    print(f"pages={len(pages)} entries={n_entries}")
+    for name, fn in cases.items():
+        t = _timeit(fn, args.repeat)
+        peak = _peak_kib(fn)
+        print(f"{name:>10}: {t * 1000:8.1f} ms  {t / max(1, n_entries) * 1e6:7.1f} us/entry  peak={peak:9.0f} KiB")
+
+def _legacy_dict(e) -> dict:
+    """旧版 _entry_to_dict 的产物：普通 dict + feedparser 风格的 links 列表"""
+    return {
+        "id": e.id, "title": e.title, "summary": e.summary, "authors": list(e.authors),
+        "published": e.published, "updated": e.updated,
+        "primary_category": str(e.primary_category), "comment": e.comment, "journal_ref": e.journal_ref,
+        "links": [
+            {"href": e.id, "rel": "alternate", "type": "text/html"},
+            {"title": "pdf", "href": e.pdf_url, "rel": "related", "type": "application/pdf"},
+        ],
+    }
+
+def bench_entry(args) -> None:
+    from atom_parser import parse_bytes
+    from paper_entry import PaperEntry
+    page = _synthetic_page(200)
+    proto = parse_bytes(page).entries
+    # 字符串字段各自独立分配，模拟逐页解析出来的真实条目
+    clone = lambda e: PaperEntry(
+        id=e.id + "", title=e.title + " ", summary=e.summary + " ", authors=[a + "" for a in e.authors],
+        published=e.published, updated=e.updated, primary_category="cs." + "CL",
+        comment=e.comment + "", journal_ref=e.journal_ref, pdf_url=e.pdf_url + "",
+    )
+    n = args.n
+
+    def build_dicts():
+        return [_legacy_dict(clone(proto[i % len(proto)])) for i in range(n)]
+
+    def build_entries():
+        return [clone(proto[i % len(proto)]) for i in range(n)]
+
+    for name, build in (("dict", build_dicts), ("PaperEntry", build_entries)):
+        tracemalloc.start()
+        rows = build()
+        cur, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if name == "dict":
+            access = lambda: [(r["title"], r["published"], r["primary_category"], r["id"]) for r in rows]
+            pdf = lambda: [next(l["href"] for l in r["links"] if l.get("type") == "application/pdf") for r in rows]
+        else:
+            access = lambda: [(r.title, r.published, r.primary_category, r.id) for r in rows]
+            pdf = lambda: [r.pdf_url for r in rows]
+        t_acc = _timeit(access, args.repeat)
+        t_pdf = _timeit(pdf, args.repeat)
+        print(f"{name:>10}: {cur / n:7.0f} B/entry  fields {t_acc / n * 1e9:6.0f} ns/entry  pdf_url {t_pdf / n * 1e9:6.0f} ns/entry")
+        del rows
+
+_ORG_SNIPPETS = [
+    "Google DeepMind", "Tsinghua University", "Microsoft Research Asia", "字节跳动", "Meta AI",
+    "Shanghai AI Laboratory", "Carnegie Mellon University", "阿里巴巴达摩院", "NVIDIA", "Allen Institute for AI",
+]
+
+def _classify_corpus(n: int) -> list:
+    """合成条目：约一半在作者/comment 里带机构名，其余不带"""
+    from atom_parser import parse_bytes
+    from paper_entry import PaperEntry
+    base = parse_bytes(_synthetic_page(50)).entries
+    out = []
+    for i in range(n):
+        e = base[i % len(base)]
+        comment = e.comment
+        if i % 2 == 0:
+            comment += "; work done at " + _ORG_SNIPPETS[i % len(_ORG_SNIPPETS)]
+        out.append(PaperEntry(id=e.id, title=e.title, summary=e.summary, authors=e.authors,
+                              published=e.published, primary_category=e.primary_category,
+                              comment=comment, pdf_url=e.pdf_url))
+    return out
+
+def bench_classify(args) -> None:
+    import re
+    from config import INSTITUTIONS_PATTERNS
+    from classify import OrgMatcher
+    entries = _classify_corpus(args.n)
+    hays = [e.haystack for e in entries]
+    legacy = {org: [re.compile(p, re.IGNORECASE) for p in pats] for org, pats in INSTITUTIONS_PATTERNS.items()}
+    matcher = OrgMatcher(INSTITUTIONS_PATTERNS)
+
+    def run_legacy():
+        return [[org for org, pats in legacy.items() if any(p.search(h) for p in pats)] for h in hays]
+
+    def run_matcher():
+        return [matcher.match(h) for h in hays]
+
+    assert run_legacy() == run_matcher(), "OrgMatcher 与逐正则结果不一致"
+    n_orgs, n_pats = len(legacy), sum(len(v) for v in legacy.values())
+    print(f"entries={len(hays)} orgs={n_orgs} patterns={n_pats} avg_len={sum(map(len, hays)) // len(hays)}")
+    for name, fn in (("per-regex", run_legacy), ("OrgMatcher", run_matcher)):
+        t = _timeit(fn, args.repeat)
+        print(f"{name:>10}: {t * 1000:8.1f} ms  {t / len(hays) * 1e6:7.1f} us/entry")
+
+    # 主题过滤：逐正则 search（只给 bool）vs TopicScorer（一次预筛 + 按字段计数打分）
+    from config import TOPIC_INCLUDE_PATTERNS, TOPIC_EXCLUDE_PATTERNS
+    from filters import TopicScorer
+    inc = [re.compile(p, re.IGNORECASE) for p in TOPIC_INCLUDE_PATTERNS]
+    exc = [re.compile(p, re.IGNORECASE) for p in TOPIC_EXCLUDE_PATTERNS]
+    scorer = TopicScorer(TOPIC_INCLUDE_PATTERNS, TOPIC_EXCLUDE_PATTERNS)
+
+    def run_topic_legacy():
+        out = []
+        for e in entries:
+            hay, end = e.haystack, e.text_end
+            out.append(not any(p.search(hay, 0, end) for p in exc) and any(p.search(hay, 0, end) for p in inc))
+        return out
+
+    def run_topic_scorer():
+        return [scorer.score(e).accepted for e in entries]
+
+    assert run_topic_legacy() == run_topic_scorer(), "TopicScorer 与逐正则结果不一致"
+    for name, fn in (("topic-bool", run_topic_legacy), ("TopicScore", run_topic_scorer)):
+        t = _timeit(fn, args.repeat)
+        print(f"{name:>10}: {t * 1000:8.1f} ms  {t / len(hays) * 1e6:7.1f} us/entry")
+
+_BATCH_CATS = ["cs.CL", "cs.LG", "cs.CV", "stat.ML", "math.OC", "eess.AS", "cs.AI", "physics.optics"]
+
+def bench_batch(args) -> None:
+    from datetime import timedelta
+    from batch_classify import EntryColumns, classify_batch
+    from filters import in_time_window, is_cs
+    from paper_entry import PaperEntry
+    base = _classify_corpus(50)
+    t0 = base[0].published
+    # 两周内均匀分布的时间、混合类别：模拟多周回补的候选
+    entries = [PaperEntry(id=e.id, title=e.title, summary=e.summary, authors=e.authors,
+                          published=t0 - timedelta(minutes=(i * 1.7) % (14 * 1440)),
+                          primary_category=_BATCH_CATS[i % len(_BATCH_CATS)], comment=e.comment)
+               for i, e in enumerate(base[i % len(base)] for i in range(args.n))]
+    end = t0
+    start = end - timedelta(days=1)
+    days = [(end - timedelta(days=d + 1), end - timedelta(days=d)) for d in range(7)]
+
+    def run_legacy():
+        return [e for e in entries if is_cs(e) and in_time_window(e, start, end)]
+
+    def run_batch():
+        return classify_batch(entries, start, end, orgs=False, topics=False).select()
+
+    def run_legacy_days():
+        return [[e for e in entries if is_cs(e) and in_time_window(e, s, t)] for s, t in days]
+
+    def run_batch_days():
+        cols = EntryColumns(entries)
+        cs = cols.cs_mask()
+        return [[e for e, c, w in zip(entries, cs, cols.window_mask(s, t)) if c and w] for s, t in days]
+
+    assert run_legacy() == run_batch(), "classify_batch 与逐条过滤结果不一致"
+    assert run_legacy_days() == run_batch_days(), "按天切窗结果不一致"
+    print(f"entries={len(entries)} in_window(1d)={len(run_legacy())}")
+    for name, fn in (("per-entry", run_legacy), ("batch", run_batch),
+                     ("per-entry x7", run_legacy_days), ("batch x7", run_batch_days)):
+        t = _timeit(fn, args.repeat)
+        print(f"{name:>12}: {t * 1000:8.1f} ms")
+
+def main() -> None:
+    pa = argparse.ArgumentParser("bench")
+    sub = pa.add_subparsers(dest="cmd", required=True)
+    pa_atom = sub.add_parser("atom", help="Atom 解析：流式 iterparse vs feedparser")
+    pa_atom.add_argument("--pages", default=str(BENCH_DATA / "atom" / "*.xml"))
+    pa_atom.add_argument("--record", type=int, default=0, help="从 arXiv 录制 N 页后退出")
+    pa_atom.add_argument("--repeat", type=int, default=5)
+    pa_atom.set_defaults(func=bench_atom)
+    pa_entry = sub.add_parser("entry", help="条目表示：旧 dict vs PaperEntry")
+    pa_entry.add_argument("--n", type=int, default=20000)
+    pa_entry.add_argument("--repeat", type=int, default=5)
+    pa_entry.set_defaults(func=bench_entry)
+    pa_cls = sub.add_parser("classify", help="机构匹配 / 主题过滤：逐正则 vs OrgMatcher / TopicScorer")
+    pa_cls.add_argument("--n", type=int, default=2000)
+    pa_cls.add_argument("--repeat", type=int, default=3)
+    pa_cls.set_defaults(func=bench_classify)
+    pa_batch = sub.add_parser("batch", help="cs+窗口过滤：逐条 vs classify_batch 列式")
+    pa_batch.add_argument("--n", type=int, default=12000)
+    pa_batch.add_argument("--repeat", type=int, default=5)
+    pa_batch.set_defaults(func=bench_batch)
+    args = pa.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# cache_manager.py
+"""
+本地缓存的容量/保留期管理：cache_pdfs/（按日目录 + PDF 仓库）、data/md、data/json，以及 *.tmp、*.part、_tmp_zip 残留。
+- 每类目录一个最长保留天数（CACHE_MAX_AGE_DAYS，按最后访问时间 = max(atime, mtime)；
+  挂载成 noatime 的盘上等同于按修改时间）。按日目录里的 PDF 是仓库实体的硬链接、与实体共用 inode 的时间，
+  所以按目录名里的日期算（今天从旧实体链接出来的不会当天就被清理）；
+- 全部受管文件合计不超过 CACHE_MAX_TOTAL_BYTES，超出时按最后访问时间从旧到新（LRU）清理。
+  按实际占用计：同一文件的多个硬链接只算一次，且要把它在受管目录里的链接全删掉才算腾出空间；
+  在受管目录外还有链接的（如 dataSelect/pdf）删了也腾不出空间，容量清理时跳过；
+- 已进入 selectPapers/（CACHE_PIN_DIRS）的论文永不清理（按文件名 stem 匹配，仓库实体按 index 里的 id 匹配）。
+
+    python cache_manager.py report         # 只报告（dry-run）
+    python cache_manager.py evict          # 真正清理
+app2.main 结束前在后台线程里跑一遍 evict（start_background_evict），不占主流程的时间。
+"""
+from __future__ import annotations
+import argparse, os, threading, time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config import DEBUG, PDF_CACHE_DIR
+from pdf_store import PDF_STORE_DIR, get_pdf_store
+from prefetch import SAFE_NAME
+
+try:
+    from config import CACHE_EVICT_ENABLED
+except Exception:
+    CACHE_EVICT_ENABLED = True
+try:
+    from config import CACHE_MAX_TOTAL_BYTES
+except Exception:
+    CACHE_MAX_TOTAL_BYTES = 0
+try:
+    from config import CACHE_MAX_AGE_DAYS
+except Exception:
+    CACHE_MAX_AGE_DAYS = {"pdf_day": 14, "pdf_store": 60, "md": 30, "json": 30, "tmp": 1}
+try:
+    from config import CACHE_PIN_DIRS
+except Exception:
+    CACHE_PIN_DIRS = ["selectPapers"]
+
+MD_ROOT = Path("data") / "md"
+JSON_ROOT = Path("data") / "json"
+CLASSES = ("pdf_day", "pdf_store", "md", "json", "tmp")
+_IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp")
+
+@dataclass
+class CacheFile:
+    path: Path
+    cls: str
+    size: int
+    last_access: float
+    inode: Tuple[int, int]
+    nlink: int
+    stem: str
+
+def _classify(path: Path, store_root: Path) -> Optional[str]:
+    name = path.name
+    if name.endswith((".tmp", ".part")) or "_tmp_zip" in path.parts:
+        return "tmp"
+    if store_root in path.parents:
+        return "pdf_store" if (store_root / "objects") in path.parents and name.endswith(".pdf") else None
+    if name.endswith(".pdf"):
+        return "pdf_day"
+    if name.endswith(".md") or (MD_ROOT in path.parents and name.lower().endswith(_IMAGE_EXTS)):
+        return "md"   # pdf2md --save-images 写出的图片跟着 md 一起按保留期清理
+    if name.endswith(".json"):
+        return "json"
+    return None
+
+def _day_dir_time(path: Path) -> Optional[float]:
+    """cache_pdfs/<YYYY-MM-DD>/... 的日期（当天结束时刻的时间戳）；目录名不是日期时返回 None"""
+    try:
+        rel = path.relative_to(PDF_CACHE_DIR)
+        day = datetime.strptime(rel.parts[0], "%Y-%m-%d")
+    except (ValueError, IndexError):
+        return None
+    return (day + timedelta(days=1)).timestamp()
+
+def scan(roots: Optional[Iterable[Path]] = None) -> List[CacheFile]:
+    """受管目录下所有可清理的文件（index.sqlite3 等其他文件不动）"""
+    roots = list(roots) if roots is not None else [Path(PDF_CACHE_DIR), Path(PDF_STORE_DIR), MD_ROOT, JSON_ROOT]
+    store_root = Path(PDF_STORE_DIR)
+    out: List[CacheFile] = []
+    seen: Set[Path] = set()
+    for root in roots:
+        if not root.exists():
+            continue
+        for dirpath, _, files in os.walk(root):
+            for fn in files:
+                p = Path(dirpath) / fn
+                if p in seen:
+                    continue
+                seen.add(p)
+                cls = _classify(p, store_root)
+                if cls is None:
+                    continue
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                last_access = max(st.st_atime, st.st_mtime)
+                if cls == "pdf_day":
+                    last_access = _day_dir_time(p) or last_access
+                out.append(CacheFile(p, cls, st.st_size, last_access,
+                                     (st.st_dev, st.st_ino), st.st_nlink, p.stem))
+    return out
+
+def pinned_stems(pin_dirs: Optional[Iterable[str]] = None) -> Set[str]:
+    out: Set[str] = set()
+    for d in (CACHE_PIN_DIRS if pin_dirs is None else pin_dirs):
+        root = Path(d)
+        if root.exists():
+            out.update(Path(fn).stem for _, _, files in os.walk(root) for fn in files)
+    return out
+
+@dataclass
+class EvictionPlan:
+    files: List[CacheFile]
+    evict: Dict[Path, str] = field(default_factory=dict)    # 路径 -> 原因（"age" / "size"）
+    pinned: int = 0
+    total_bytes: int = 0          # 清理前的实际占用
+    freed_bytes: int = 0
+
+    def report(self) -> str:
+        by_cls: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0, 0])   # 文件数, 字节, 清理数, 清理字节
+        for f in self.files:
+            row = by_cls[f.cls]
+            row[0] += 1
+            row[1] += f.size
+            if f.path in self.evict:
+                row[2] += 1
+                row[3] += f.size
+        lines = [f"{'class':>10} {'files':>7} {'MB':>9} {'evict':>7} {'MB':>9}"]
+        for cls in CLASSES:
+            if cls in by_cls:
+                n, b, en, eb = by_cls[cls]
+                lines.append(f"{cls:>10} {n:>7} {b / 1e6:>9.1f} {en:>7} {eb / 1e6:>9.1f}")
+        reasons = defaultdict(int)
+        for r in self.evict.values():
+            reasons[r] += 1
+        lines.append(f"total {self.total_bytes / 1e6:.1f} MB (hardlinks counted once), "
+                     f"freeing {self.freed_bytes / 1e6:.1f} MB; pinned={self.pinned} "
+                     + " ".join(f"{k}={v}" for k, v in sorted(reasons.items())))
+        return "\n".join(lines)
+
+def plan(files: List[CacheFile], max_total_bytes: Optional[int] = None,
+         max_age_days: Optional[Dict[str, float]] = None, pins: Optional[Set[str]] = None,
+         now: Optional[float] = None) -> EvictionPlan:
+    max_total_bytes = CACHE_MAX_TOTAL_BYTES if max_total_bytes is None else max_total_bytes
+    max_age_days = CACHE_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    pins = pinned_stems() if pins is None else pins
+    now = time.time() if now is None else now
+    store = get_pdf_store()
+
+    def is_pinned(f: CacheFile) -> bool:
+        if f.cls == "tmp":
+            return False
+        if f.stem in pins:
+            return True
+        if f.cls == "pdf_store" and store is not None:
+            return any(SAFE_NAME.sub("_", aid) in pins for aid in store.ids_for(f.stem))
+        return False
+
+    p = EvictionPlan(files)
+    groups: Dict[Tuple[int, int], List[CacheFile]] = defaultdict(list)
+    for f in files:
+        groups[f.inode].append(f)
+    p.total_bytes = sum(g[0].size for g in groups.values())
+    pinned_inodes = set()
+    for f in files:
+        if is_pinned(f):
+            pinned_inodes.add(f.inode)
+    p.pinned = len(pinned_inodes)
+
+    # 1) 超过保留期的（按单个链接算：过期的日期目录链接删掉，仓库实体另按自己的保留期）
+    for f in files:
+        days = max_age_days.get(f.cls) or 0
+        if days > 0 and f.inode not in pinned_inodes and now - f.last_access > days * 86400:
+            p.evict[f.path] = "age"
+
+    def freed(links: List[CacheFile]) -> int:
+        # 受管目录内的链接全删了、外面也没有别的链接，才真的腾出空间
+        return links[0].size if all(x.path in p.evict for x in links) and links[0].nlink <= len(links) else 0
+
+    p.freed_bytes = sum(freed(g) for g in groups.values())
+
+    # 2) 总量超出预算：按最后访问时间从旧到新整组（同一 inode 的全部链接）清理
+    if max_total_bytes and p.total_bytes - p.freed_bytes > max_total_bytes:
+        order = sorted((g for ino, g in groups.items() if ino not in pinned_inodes),
+                       key=lambda g: max(x.last_access for x in g))
+        for g in order:
+            if p.total_bytes - p.freed_bytes <= max_total_bytes:
+                break
+            if g[0].nlink > len(g) or freed(g):
+                continue   # 外面还有链接（删了也不腾空间）/ 已经整组清理
+            for x in g:
+                p.evict.setdefault(x.path, "size")
+            p.freed_bytes += g[0].size
+    return p
+
+def apply(p: EvictionPlan) -> int:
+    """执行清理，返回删除的文件数；顺带删空的日期目录、清理 PDF 仓库索引"""
+    n = 0
+    dirs: Set[Path] = set()
+    gone_shas: List[str] = []
+    for f in p.files:
+        if f.path not in p.evict:
+            continue
+        try:
+            f.path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[WARN] cache evict {f.path}: {e}")
+            continue
+        n += 1
+        dirs.add(f.path.parent)
+        if f.cls == "pdf_store":
+            gone_shas.append(f.stem)
+    store = get_pdf_store()
+    if gone_shas and store is not None:
+        store.forget(gone_shas)
+    for d in sorted(dirs, key=lambda d: -len(d.parts)):
+        try:
+            d.rmdir()    # 只删空目录
+        except OSError:
+            pass
+    return n
+
+def run(dry_run: bool = False, max_total_bytes: Optional[int] = None) -> EvictionPlan:
+    t0 = time.perf_counter()
+    p = plan(scan(), max_total_bytes=max_total_bytes)
+    if dry_run:
+        print(p.report())
+        for path, why in sorted(p.evict.items(), key=lambda kv: str(kv[0])):
+            print(f"  would evict ({why}) {path}")
+    else:
+        n = apply(p)
+        print(f"[cache] evicted {n} files, freed {p.freed_bytes / 1e6:.1f} MB "
+              f"of {p.total_bytes / 1e6:.1f} MB in {time.perf_counter() - t0:.1f}s")
+        if DEBUG:
+            print(p.report())
+    return p
+
+def start_background_evict() -> Optional[threading.Thread]:
+    """在后台线程里跑一遍清理（非守护线程：进程会等它做完再退出）；CACHE_EVICT_ENABLED=False 时返回 None"""
+    if not CACHE_EVICT_ENABLED:
+        return None
+
+    def _job() -> None:
+        try:
+            run()
+        except Exception as e:
+            print(f"[WARN] cache eviction failed: {e}")
+
+    t = threading.Thread(target=_job, name="cache-evict")
+    t.start()
+    return t
+
+def main() -> None:
+    pa = argparse.ArgumentParser("cache_manager")
+    pa.add_argument("cmd", choices=["report", "evict"])
+    pa.add_argument("--max-bytes", type=int, default=None, help="覆盖 CACHE_MAX_TOTAL_BYTES")
+    args = pa.parse_args()
+    run(dry_run=(args.cmd == "report"), max_total_bytes=args.max_bytes)
+
+if __name__ == "__main__":
+    main()
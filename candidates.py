@@ -0,0 +1,80 @@
+# candidates.py
+"""
+按版本去重的候选集：同一篇论文（base id 相同）只保留最新版本。
+基线里是 v1、per-org 直搜又搜到 v2 时只留 v2；之前某天已经处理过（MinerU + 判定）的同一版本也不再处理，
+只有版本号变了才重新走一遍。版本号用 meta_store.split_arxiv_id 解析，无版本号记为 0。
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import DEBUG
+from meta_store import split_arxiv_id
+from paper_entry import PaperEntry, as_entry
+
+try:
+    from config import SKIP_PROCESSED_PAPERS
+except Exception:
+    SKIP_PROCESSED_PAPERS = True
+
+class CandidateIndex:
+    """base_id -> 最新版本的条目；迭代顺序为 base_id 第一次出现的顺序"""
+    def __init__(self, entries: Iterable = ()):
+        self._by_base: Dict[str, PaperEntry] = {}
+        self._version: Dict[str, int] = {}
+        for e in entries:
+            self.add(e)
+
+    def add(self, entry) -> str:
+        """
+        加入一个条目，返回 "new"（新论文）/"newer"（替换成更新的版本）/"dup"（同版本或更旧，忽略）
+        """
+        e = as_entry(entry)
+        base_id, version = split_arxiv_id(e.id)
+        old = self._version.get(base_id)
+        if old is not None and version <= old:
+            return "dup"
+        self._by_base[base_id] = e
+        self._version[base_id] = version
+        return "new" if old is None else "newer"
+
+    def __contains__(self, entry) -> bool:
+        base_id, version = split_arxiv_id(as_entry(entry).id)
+        return self._version.get(base_id, -1) >= version
+
+    def __len__(self) -> int:
+        return len(self._by_base)
+
+    def __iter__(self) -> Iterator[PaperEntry]:
+        return iter(self._by_base.values())
+
+    def entries(self) -> List[PaperEntry]:
+        return list(self._by_base.values())
+
+def dedupe_versions(entries: Iterable) -> List[PaperEntry]:
+    return CandidateIndex(entries).entries()
+
+def drop_processed(entries: List[PaperEntry], run_date: str, store=None) -> Tuple[List[PaperEntry], List[PaperEntry]]:
+    """
+    (待处理, 跳过)：之前某天（run_date 以外）已处理过同一或更新版本的条目跳过；
+    同一天重跑不算（由 app2 的 runModel B 续跑逻辑处理）。
+    没有本地库或 SKIP_PROCESSED_PAPERS=False 时原样返回。
+    """
+    if store is None:
+        from meta_store import get_store
+        store = get_store()
+    if store is None or not SKIP_PROCESSED_PAPERS or not entries:
+        return list(entries), []
+    keys = [split_arxiv_id(e.id) for e in entries]
+    done = store.processed_versions(base for base, _ in keys)
+    keep: List[PaperEntry] = []
+    skipped: List[PaperEntry] = []
+    for e, (base_id, version) in zip(entries, keys):
+        hit: Optional[Tuple[int, str]] = done.get(base_id)
+        if hit is not None and hit[0] >= version and hit[1] != run_date:
+            skipped.append(e)
+        else:
+            keep.append(e)
+    if DEBUG and skipped:
+        print(f"[DEBUG] already processed on earlier days (same version): {len(skipped)} -> "
+              + ", ".join(e.arxiv_id for e in skipped[:10]))
+    return keep, skipped
@@ -1,30 +1,63 @@
 from __future__ import annotations
-from typing import Dict, Any, List, DefaultDict
+from typing import Dict, Any, Iterable, List, DefaultDict
 from collections import defaultdict
-import re
 from config import INSTITUTIONS_PATTERNS
+from multimatch import PatternSet
+from paper_entry import PaperEntry, as_entry
 
-def compile_patterns():
-    return {org: [re.compile(p, re.IGNORECASE) for p in pats]
-            for org, pats in INSTITUTIONS_PATTERNS.items()}
-
-def match_orgs(entry: Dict[str, Any], compiled) -> List[str]:
-    hay = "\n".join([
-        entry.get("title",""),
-        entry.get("summary",""),
-        entry.get("comment",""),
-        entry.get("journal_ref",""),
-        " ".join(entry.get("authors") or []),  # 有时作者串会带单位
-    ])
-    hits = []
-    for org, pats in compiled.items():
-        if any(p.search(hay) for p in pats):
-            hits.append(org)
-    return hits
-
-def group_by_org(entries: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+class OrgMatcher:
+    """
+    INSTITUTIONS_PATTERNS 一次编译成的多模式匹配器：
+    先对小写 haystack 做一遍字面串预筛（每个模式开头的固定字面，如 'google' / '腾讯'），
+    只对预筛命中的机构跑它合并后的正则校验，结果与逐机构逐模式 search 完全一致。
+    """
+    def __init__(self, patterns: Dict[str, List[str]]):
+        self.orgs = list(patterns)
+        self._order = {org: i for i, org in enumerate(self.orgs)}
+        self._set = PatternSet([(org, p) for org, pats in patterns.items() for p in pats])
+
+    def __contains__(self, org: str) -> bool:
+        return org in self._order
+
+    def match(self, hay: str, only: Iterable[str] | None = None, low: str | None = None) -> List[str]:
+        """hay 命中的机构（按配置顺序）；only 给定时只看这些机构；low 为已有的小写 hay"""
+        hits = self._set.search(hay, low if low is not None else hay.lower(), only=only)
+        return sorted(hits, key=self._order.__getitem__)
+
+_MATCHER: OrgMatcher | None = None
+
+def compile_patterns() -> OrgMatcher:
+    """进程内只编译一次"""
+    global _MATCHER
+    if _MATCHER is None:
+        _MATCHER = OrgMatcher(INSTITUTIONS_PATTERNS)
+    return _MATCHER
+
+def _haystack(entry: Dict[str, Any] | PaperEntry) -> str:
+    # title/summary/comment/journal_ref + 作者串（有时作者串会带单位）；PaperEntry 上惰性构建并缓存
+    return as_entry(entry).haystack
+
+def match_orgs(entry: Dict[str, Any] | PaperEntry, compiled: OrgMatcher | None = None) -> List[str]:
+    e = as_entry(entry)
+    return (compiled or compile_patterns()).match(e.haystack, low=e.haystack_lower)
+
+def attribute_orgs(entry: Dict[str, Any] | PaperEntry, compiled: OrgMatcher, orgs: List[str],
+                   org_terms: Dict[str, List[str]] | None = None) -> List[str]:
+    """
+    合并查询结果归属回机构：先用 INSTITUTIONS_PATTERNS 匹配（限定在 orgs 内），
+    都没命中时再退回到搜索关键词的字面匹配（与 arXiv all: 检索口径一致）。
+    """
+    e = as_entry(entry)
+    hits = compiled.match(e.haystack, only=orgs, low=e.haystack_lower)
+    if hits or not org_terms:
+        return hits
+    hay = e.haystack_lower
+    return [org for org in orgs
+            if any(t.strip('"').lower() in hay for t in org_terms.get(org, []))]
+
+def group_by_org(entries: List[PaperEntry]) -> Dict[str, List[PaperEntry]]:
     compiled = compile_patterns()
-    buckets: DefaultDict[str, List[Dict[str, Any]]] = defaultdict(list)
+    buckets: DefaultDict[str, List[PaperEntry]] = defaultdict(list)
     for e in entries:
         for org in match_orgs(e, compiled):
             buckets[org].append(e)
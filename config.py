@@ -34,8 +34,28 @@ WINDOW_FIELD = "both"
 CLASSIFY_FROM_PDF = True          # True=按 PDF 作者/单位区匹配；False=沿用摘要/标题
 PDF_CACHE_DIR = "cache_pdfs"      # 统一缓存目录
 USE_HARDLINKS = True              # Windows若无权限会自动回退为复制
+PDF_STORE_ENABLED = True          # 按内容寻址的跨天 PDF 仓库：同一 id/版本只下载一次，各日期/阶段目录用硬链接
+PDF_STORE_DIR = "cache_pdfs/_store"  # objects/<sha 前两位>/<sha256>.pdf + index.sqlite3
+# 缓存清理（cache_manager.py）：app2 结束前在后台跑一遍；selectPapers/ 里的论文永不清理
+CACHE_EVICT_ENABLED = True
+CACHE_MAX_TOTAL_BYTES = 20 * 1024 ** 3   # cache_pdfs + data/md + data/json 合计上限（硬链接只算一次）；0 = 不限
+CACHE_MAX_AGE_DAYS = {                   # 按最后访问时间的保留天数；0 = 不限
+    "pdf_day": 14,      # cache_pdfs/<日期>/ 下的链接
+    "pdf_store": 60,    # PDF 仓库实体
+    "md": 30,           # data/md
+    "json": 30,         # data/json
+    "tmp": 1,           # *.tmp、未续传完的 *.part、_tmp_zip 残留
+}
+CACHE_PIN_DIRS = ["selectPapers"]
+SKIP_PROCESSED_PAPERS = True     # 之前某天已处理（MinerU + 判定）过同一版本的论文不再处理；版本号变了才重新处理
 MAX_PDF_PAGES_TO_SCAN = 2         # 只扫前2页（作者/单位通常在首页/次页）
 PDF_EXTRACT_ENGINE = "pymupdf"    # "pymupdf"（推荐）| "pypdf"（备选）
+LOCAL_DECIDE_ENABLED = True       # 先用本地抽的前几页（app2.DECIDE_PAGES）文字做机构判定，只把 is_large 的送 MinerU
+LOCAL_DECIDE_MIN_CHARS = 200      # 抽出的文字少于此数（扫描件等）时退回 MinerU 解析后再判定
+MINERU_MAX_INFLIGHT = 3           # 同时在 MinerU 解析的批次数（第 N 批解析时上传第 N+1 批）
+MINERU_DOWNLOAD_CONCURRENCY = 4   # 并发下载/解压 MinerU 结果 zip 的线程数
+MINERU_MAX_POLL_SEC = 30          # 排队无变化时轮询间隔指数退避的上限（有变化时回到 poll_sec）
+MINERU_JOURNAL_DIR = "data/mineru_journal"   # MinerU 批次日志（batch_id/上传/结果地址），被杀掉后续跑时接回；设为 "" 关闭
 
 # （可选）作者/单位区“关键词”提示，用于简单启发式筛行
 AFFIL_HINT_KEYWORDS = [
@@ -69,6 +89,43 @@ MAX_PAGES = 5                # 10 页≈2000条（足够覆盖昨天窗口）
 # 直搜（fallback）分页（给 app.py 的 per-org 直搜使用）
 PER_ORG_SEARCH_LIMIT_PAGES = 5       # ← 新增：每个机构直搜最多扫几页
 PER_ORG_SEARCH_PAGE_SIZE   = 200     # ← 新增：每页多少条（建议 200）
+ORG_QUERY_MAX_CHARS        = 1000    # 多个机构关键词合并成一条 OR 查询时的最大查询长度
+ID_LOOKUP_BATCH            = 200     # 按 id 批量取元数据时每个请求的 id 数（id_list=a,b,c）
+
+# 基线分片并发（多个 shard 同时翻页，共享同一个限速器）
+SHARD_FETCH_CONCURRENCY = 4          # 同时抓取的 shard 数；1 = 逐个抓取
+
+# 全进程共享的 arXiv API 令牌桶限速（fetch_arxiv 与 zotero_push 共用）
+ARXIV_RATE_PER_SEC = 2.0             # 平均每秒请求数
+ARXIV_RATE_BURST   = 4               # 允许的突发请求数
+
+# 端点健康度：连续失败达到阈值后，该镜像冷却一段时间内不再优先尝试
+ENDPOINT_FAIL_THRESHOLD = 2
+ENDPOINT_COOLDOWN_SEC   = 120
+# 所有端点都在冷却（如 429 限流）时：睡到最早解冻再重试，最多 ENDPOINT_MAX_ROUNDS 轮；单次等待超过上限则放弃
+ENDPOINT_MAX_ROUNDS     = 3
+ENDPOINT_MAX_WAIT_SEC   = 300
+
+# arXiv API 响应磁盘缓存：TTL 内直接命中；过期后用 ETag/Last-Modified 复验；超出上限按 LRU 淘汰
+HTTP_CACHE_ENABLED   = False             # 调试用：重跑时复用 arXiv API 响应
+HTTP_CACHE_DIR       = "data/http_cache"
+HTTP_CACHE_TTL_SEC   = 1800              # 30 分钟内的重跑直接读缓存
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Atom 解析器："stream"（iterparse 流式解析，默认）| "feedparser"（旧实现）
+ATOM_PARSER = "stream"
+
+# 本地 arXiv 元数据库（SQLite）：基线增量同步 + 窗口索引查询
+META_STORE_ENABLED = True
+META_STORE_PATH    = "data/arxiv_meta.sqlite3"
+# 入库时同时写倒排索引（token -> 条目），供 token_index.py 在改规则后秒级重放最近几天的分类
+TOKEN_INDEX_ENABLED = True
+
+# 抓取断点日志：每个 shard/查询每页记一次进度，中途退出后重跑同一窗口从断点续抓；整轮完成后删除
+FETCH_JOURNAL_ENABLED      = True
+FETCH_JOURNAL_DIR          = "data/fetch_journal"
+FETCH_JOURNAL_MAX_AGE_DAYS = 7          # 超过这么久没续跑的日志直接清理
+FETCH_JOURNAL_WINDOW_MAX_AGE_HOURS = 1  # --window-hours 续跑：上次窗口超过这么久（且不超过窗口本身长度）才沿用，否则丢弃重抓
 
 # -------------------------------
 # 输出 & 匹配
@@ -309,3 +366,10 @@ TOPIC_EXCLUDE_PATTERNS = [
 
 
 ENABLE_TOPIC_FILTER = True
+# 主题分 = Σ 字段权重 × 该字段主题词命中次数；TOPIC_MAX_CANDIDATES>0 时只保留分数最高的 N 篇（0 = 不限）
+TOPIC_FIELD_WEIGHTS = {"title": 3.0, "summary": 1.0, "comment": 1.0, "journal_ref": 0.5}
+TOPIC_MAX_CANDIDATES = 0
+
+# 整批分类（batch_classify）：条目数达到阈值时，机构匹配/主题打分分块交给进程池；0 = CPU 数
+CLASSIFY_PROCESS_THRESHOLD = 5000
+CLASSIFY_WORKERS           = 0
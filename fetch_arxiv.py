@@ -1,8 +1,10 @@
 # fetch_arxiv.py
 from __future__ import annotations
-import time, requests, feedparser, os
+import io, itertools, time, requests, os, queue, threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Dict, Any, Iterable, List, Optional
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
 
@@ -12,6 +14,9 @@ from config import (
     MAX_RESULTS_PER_PAGE, MAX_PAGES,
 )
 from config import DEBUG
+from atom_parser import FeedPage, parse_stream
+from paper_entry import PaperEntry, as_entry
+from http_cache import ResponseCache
 
 # 分片控制：可在 config.py 里覆盖
 try:
@@ -19,6 +24,51 @@ try:
 except Exception:
     USE_SHARDED_BASELINE = True
 
+# 分片并发：同时抓取的 shard 数；所有线程共享同一个限速器
+try:
+    from config import SHARD_FETCH_CONCURRENCY
+except Exception:
+    SHARD_FETCH_CONCURRENCY = 4
+
+# 全局令牌桶限速 + 端点健康：可在 config.py 里覆盖
+try:
+    from config import ARXIV_RATE_PER_SEC, ARXIV_RATE_BURST
+except Exception:
+    ARXIV_RATE_PER_SEC, ARXIV_RATE_BURST = 2.0, 4
+try:
+    from config import ENDPOINT_FAIL_THRESHOLD, ENDPOINT_COOLDOWN_SEC
+except Exception:
+    ENDPOINT_FAIL_THRESHOLD, ENDPOINT_COOLDOWN_SEC = 2, 120
+try:
+    from config import ENDPOINT_MAX_ROUNDS, ENDPOINT_MAX_WAIT_SEC
+except Exception:
+    ENDPOINT_MAX_ROUNDS, ENDPOINT_MAX_WAIT_SEC = 3, 300
+
+# API 响应磁盘缓存（调试重跑/崩溃重启时避免重复请求 arXiv）
+try:
+    from config import HTTP_CACHE_ENABLED, HTTP_CACHE_DIR, HTTP_CACHE_TTL_SEC, HTTP_CACHE_MAX_BYTES
+except Exception:
+    HTTP_CACHE_ENABLED = False
+    HTTP_CACHE_DIR, HTTP_CACHE_TTL_SEC, HTTP_CACHE_MAX_BYTES = "data/http_cache", 1800, 200 * 1024 * 1024
+
+# id_list 批量查询：每个请求最多带多少个 id
+try:
+    from config import ID_LOOKUP_BATCH
+except Exception:
+    ID_LOOKUP_BATCH = 200
+
+# per-org 合并查询：单条 search_query 的最大长度（arXiv 对过长查询会报错/截断）
+try:
+    from config import ORG_QUERY_MAX_CHARS
+except Exception:
+    ORG_QUERY_MAX_CHARS = 1000
+
+# Atom 解析器："stream"（iterparse 流式，默认）| "feedparser"（旧实现，备用/对照）
+try:
+    from config import ATOM_PARSER
+except Exception:
+    ATOM_PARSER = "stream"
+
 # 常见计算机科学子类分片
 # CS_SHARDS = [
 #     "cs.AI", "cs.CL", "cs.CV", "cs.LG", "cs.RO", "cs.CR", "cs.DS",
@@ -45,7 +95,10 @@ def _build_session() -> requests.Session:
         connect=RETRY_TOTAL,
         read=RETRY_TOTAL,
         backoff_factor=RETRY_BACKOFF,
-        status_forcelist=[429, 500, 502, 503, 504],
+        # 429/503 不在适配器里重试（带 Retry-After 也不）：交给 _get_with_fallback 按 Retry-After 冷却、换镜像，
+        # 全部冷却时睡到解冻再重试，每次重试都经过限速器
+        status_forcelist=[500, 502, 504],
+        respect_retry_after_header=False,
         allowed_methods=["GET", "HEAD"],
         raise_on_status=False,
     )
@@ -65,56 +118,253 @@ def _build_session() -> requests.Session:
 
 _SESSION = _build_session()
 
-# ---- API Core ----
-def _get_with_fallback(params: Dict[str, Any]) -> str:
-    last_exc = None
-    for endpoint in ARXIV_API_ENDPOINTS:
-        try:
-            r = _SESSION.get(endpoint, params=params, timeout=REQUEST_TIMEOUT)
-            r.raise_for_status()
-            return r.text
-        except Exception as e:
-            last_exc = e
-            time.sleep(0.5)
-    raise last_exc
+# ---- Rate limiting ----
+class _TokenBucket:
+    """进程级令牌桶：平均 rate 次/秒，最多攒 burst 个令牌；所有线程共享"""
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(1e-6, float(rate))
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
 
-# ---- Utilities ----
-def _parse_dt(s: Optional[str]) -> Optional[datetime]:
-    if not s:
+    def acquire(self) -> None:
+        # 先预订令牌（可透支），再在锁外睡眠，保证多线程按到达顺序均匀放行
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1.0
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+_RATE_LIMITER = _TokenBucket(ARXIV_RATE_PER_SEC, ARXIV_RATE_BURST)
+
+# ---- Endpoint health ----
+class _EndpointHealth:
+    """
+    端点健康度：score 为成功率的指数滑动平均（1.0 = 健康）。
+    连续失败达到阈值（或收到 429/503 的 Retry-After）后进入冷却期，冷却期内不再优先尝试。
+    """
+    def __init__(self, endpoints: List[str], fail_threshold: int, cooldown_sec: float):
+        self.endpoints = list(endpoints)
+        self.fail_threshold = max(1, int(fail_threshold))
+        self.cooldown_sec = float(cooldown_sec)
+        self._lock = threading.Lock()
+        self._score = {ep: 1.0 for ep in self.endpoints}
+        self._fails = {ep: 0 for ep in self.endpoints}
+        self._cool_until = {ep: 0.0 for ep in self.endpoints}
+
+    def order(self) -> List[str]:
+        """健康端点按配置顺序在前；全部在冷却中时，按最早解冻的顺序兜底"""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [ep for ep in self.endpoints if self._cool_until[ep] <= now]
+            cooling = sorted((ep for ep in self.endpoints if self._cool_until[ep] > now),
+                             key=lambda ep: self._cool_until[ep])
+            healthy.sort(key=lambda ep: (self._score[ep] < 0.5, self.endpoints.index(ep)))
+        return healthy or cooling
+
+    def ok(self, ep: str) -> None:
+        with self._lock:
+            self._score[ep] = 0.8 * self._score[ep] + 0.2
+            self._fails[ep] = 0
+            self._cool_until[ep] = 0.0
+
+    def fail(self, ep: str, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self._score[ep] = 0.8 * self._score[ep]
+            self._fails[ep] += 1
+            if retry_after is not None or self._fails[ep] >= self.fail_threshold:
+                cool = retry_after if retry_after is not None else self.cooldown_sec
+                self._cool_until[ep] = time.monotonic() + cool
+                if DEBUG:
+                    print(f"[DEBUG] endpoint cooldown {cool:.0f}s: {ep} (score={self._score[ep]:.2f})")
+
+    def cooldown_left(self) -> float:
+        """全部端点都在冷却时返回距最早解冻的秒数；只要有一个可用就返回 0"""
+        now = time.monotonic()
+        with self._lock:
+            return max(0.0, min(self._cool_until.values(), default=0.0) - now)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._score)
+
+_ENDPOINTS = _EndpointHealth(ARXIV_API_ENDPOINTS, ENDPOINT_FAIL_THRESHOLD, ENDPOINT_COOLDOWN_SEC)
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    resp = getattr(exc, "response", None)
+    if resp is None or resp.status_code not in (429, 503):
         return None
     try:
-        return datetime.fromisoformat(s.replace("Z", "+00:00")).astimezone(timezone.utc)
-    except Exception:
+        return float(resp.headers.get("Retry-After", ""))
+    except (TypeError, ValueError):
+        return ENDPOINT_COOLDOWN_SEC
+
+# 第一次用到时才建（只 import fetch_arxiv 的 cache_manager / prefetch / bench 不会建出 data/http_cache）
+_CACHE: Optional[ResponseCache] = None
+_CACHE_LOCK = threading.Lock()
+
+def _get_cache() -> Optional[ResponseCache]:
+    global _CACHE
+    if not HTTP_CACHE_ENABLED:
         return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ResponseCache(HTTP_CACHE_DIR, HTTP_CACHE_TTL_SEC, HTTP_CACHE_MAX_BYTES)
+        return _CACHE
 
-def _entry_to_dict(e: Any) -> Dict[str, Any]:
-    return {
-        "id": e.get("id"),
-        "title": (e.get("title") or "").strip(),
-        "summary": (e.get("summary") or "").strip(),
-        "authors": [a.get("name", "") for a in e.get("authors", [])],
-        "published": _parse_dt(e.get("published")),
-        "updated": _parse_dt(e.get("updated")),
-        "primary_category": (e.get("arxiv_primary_category") or {}).get("term"),
-        "comment": e.get("arxiv_comment") or "",
-        "journal_ref": e.get("arxiv_journal_ref") or "",
-        "links": e.get("links", []),
-    }
+def cache_stats() -> Optional[Dict[str, Any]]:
+    """响应缓存命中统计；未启用或还没用过缓存时返回 None"""
+    return _CACHE.stats() if _CACHE is not None else None
+
+# ---- API Core ----
+def _decode(body: bytes, parse):
+    return parse(io.BytesIO(body)) if parse is not None else body.decode("utf-8", errors="replace")
+
+class _TeeReader(io.RawIOBase):
+    """边读边把字节复制一份：解析器照样流式读响应体，读完后 .body 就是要写进缓存的完整响应"""
+    def __init__(self, raw):
+        self._raw = raw
+        self._copy = io.BytesIO()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self._raw.read(len(b))
+        n = len(data)
+        b[:n] = data
+        self._copy.write(data)
+        return n
+
+    @property
+    def body(self) -> bytes:
+        return self._copy.getvalue()
+
+def _get_cached(cache: ResponseCache, endpoint: str, params: Dict[str, Any], timeout, parse):
+    """带缓存的一次请求：TTL 内命中直接返回；过期则带 ETag/Last-Modified 复验；未命中时流式解析并同时写缓存"""
+    hit = cache.get(endpoint, params)
+    if hit is not None and hit.fresh:
+        cache.record("hits")
+        return _decode(hit.body, parse)
+    _RATE_LIMITER.acquire()
+    headers = hit.validators() if hit is not None else {}
+    with _SESSION.get(endpoint, params=params, timeout=timeout or REQUEST_TIMEOUT, headers=headers,
+                      stream=True) as r:
+        if r.status_code == 304 and hit is not None:
+            cache.refresh(hit)
+            cache.record("revalidated")
+            return _decode(hit.body, parse)
+        r.raise_for_status()
+        if parse is None:
+            body = r.content
+            out = body.decode("utf-8", errors="replace")
+        else:
+            r.raw.decode_content = True
+            tee = _TeeReader(r.raw)
+            out = parse(io.BufferedReader(tee))
+            while tee.read(1 << 16):   # 解析器可能没读到流末尾，补齐后再入缓存
+                pass
+            body = tee.body
+    cache.put(endpoint, params, body, r.headers)   # 解析成功才入缓存
+    cache.record("misses")
+    return out
+
+def _get_with_fallback(params: Dict[str, Any], timeout=None, parse=None):
+    """
+    依次尝试健康端点。parse 为空时返回响应文本；
+    否则以流式方式请求，把解压后的响应体文件对象交给 parse(fp) 并返回其结果（解析失败也会换端点重试）。
+    启用 HTTP_CACHE_ENABLED 时走磁盘缓存（仍是流式解析，响应体边解析边复制进缓存）。
+    """
+    last_exc = None
+    cache = _get_cache()
+    for round_no in range(1, max(1, int(ENDPOINT_MAX_ROUNDS)) + 1):
+        for endpoint in _ENDPOINTS.order():
+            try:
+                if cache is not None:
+                    out = _get_cached(cache, endpoint, params, timeout, parse)
+                    _ENDPOINTS.ok(endpoint)
+                    return out
+                _RATE_LIMITER.acquire()
+                if parse is None:
+                    r = _SESSION.get(endpoint, params=params, timeout=timeout or REQUEST_TIMEOUT)
+                    r.raise_for_status()
+                    _ENDPOINTS.ok(endpoint)
+                    return r.text
+                with _SESSION.get(endpoint, params=params, timeout=timeout or REQUEST_TIMEOUT, stream=True) as r:
+                    r.raise_for_status()
+                    r.raw.decode_content = True
+                    out = parse(r.raw)
+                _ENDPOINTS.ok(endpoint)
+                return out
+            except Exception as e:
+                last_exc = e
+                _ENDPOINTS.fail(endpoint, _retry_after(e))
+        # 一轮下来所有端点都进了冷却（429/503 或连续失败）：睡到最早解冻再来一轮，下一轮仍经过令牌桶
+        wait = _ENDPOINTS.cooldown_left()
+        if wait <= 0 or wait > ENDPOINT_MAX_WAIT_SEC or round_no >= ENDPOINT_MAX_ROUNDS:
+            break
+        print(f"[WARN] all arXiv endpoints cooling down; retry in {wait:.0f}s "
+              f"(round {round_no}/{ENDPOINT_MAX_ROUNDS}): {last_exc}")
+        time.sleep(wait)
+    raise last_exc
+
+def api_query(params: Dict[str, Any], timeout=None) -> str:
+    """对外的 arXiv API 请求入口（共享会话、限速器与端点健康度），返回 Atom XML 文本"""
+    return _get_with_fallback(params, timeout=timeout)
+
+# ---- Utilities ----
+def _entry_to_dict(e: Any) -> PaperEntry:
+    """feedparser 条目 -> PaperEntry（仅 ATOM_PARSER="feedparser" 时使用）"""
+    pdf_url = None
+    for link in e.get("links", []):
+        if link.get("type") == "application/pdf":
+            pdf_url = link.get("href")
+            break
+    return PaperEntry(
+        id=e.get("id"),
+        title=(e.get("title") or "").strip(),
+        summary=(e.get("summary") or "").strip(),
+        authors=[a.get("name", "") for a in e.get("authors", [])],
+        published=e.get("published"),
+        updated=e.get("updated"),
+        primary_category=(e.get("arxiv_primary_category") or {}).get("term"),
+        comment=e.get("arxiv_comment") or "",
+        journal_ref=e.get("arxiv_journal_ref") or "",
+        pdf_url=pdf_url,
+    )
 
 # ---- Query Helpers ----
-def query_cs_sorted(start: int, max_results: int):
-    """主查询入口：按时间降序获取 cs.*"""
-    params = {
-        "search_query": "cat:cs.*",
-        "sortBy": "submittedDate",
-        "sortOrder": "descending",
-        "start": start,
-        "max_results": max_results,
-    }
-    xml = _get_with_fallback(params)
-    return feedparser.parse(xml)
+def _parse_with_feedparser(fp) -> FeedPage:
+    import feedparser
+    feed = feedparser.parse(fp.read())
+    total = (feed.get("feed") or {}).get("opensearch_totalresults")
+    return FeedPage([_entry_to_dict(e) for e in (feed.entries or [])], int(total) if total else None)
+
+# 日期字段 -> (排序字段, 条目里对应的时间键)
+_DATE_FIELDS = {
+    "submittedDate": ("submittedDate", "published"),
+    "lastUpdatedDate": ("lastUpdatedDate", "updated"),
+}
+
+def _arxiv_ts(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y%m%d%H%M")
 
-def _query_feed(search_query: str, sort_by: str, start: int, max_results: int):
+def date_range_clause(start_utc: datetime, end_utc: datetime, field: str = "submittedDate") -> str:
+    """arXiv 日期范围子句（GMT，精确到分钟），如 submittedDate:[202601050800 TO 202601060759]"""
+    return f"{field}:[{_arxiv_ts(start_utc)} TO {_arxiv_ts(end_utc)}]"
+
+def _with_clause(query: str, clause: str) -> str:
+    return f"({query}) AND {clause}" if clause else query
+
+def query_cs_sorted(start: int, max_results: int, clause: str = "", sort_by: str = "submittedDate") -> FeedPage:
+    """主查询入口：按时间降序获取 cs.*（可附带日期范围子句）"""
+    return _query_feed(_with_clause("cat:cs.*", clause), sort_by, start, max_results)
+
+def _query_feed(search_query: str, sort_by: str, start: int, max_results: int) -> FeedPage:
     params = {
         "search_query": search_query,
         "sortBy": sort_by,
@@ -122,99 +372,331 @@ def _query_feed(search_query: str, sort_by: str, start: int, max_results: int):
         "start": start,
         "max_results": max_results,
     }
-    xml = _get_with_fallback(params)
-    return feedparser.parse(xml)
+    parse = _parse_with_feedparser if ATOM_PARSER == "feedparser" else parse_stream
+    return _get_with_fallback(params, parse=parse)
 
-def _query_cat_submitted(cat: str, start: int, max_results: int):
-    return _query_feed(f"cat:{cat}", "submittedDate", start, max_results)
+def _query_cat_submitted(cat: str, start: int, max_results: int, clause: str = "", sort_by: str = "submittedDate") -> FeedPage:
+    return _query_feed(_with_clause(f"cat:{cat}", clause), sort_by, start, max_results)
 
-def _query_any(query: str, start: int, max_results: int):
+def _query_any(query: str, start: int, max_results: int) -> FeedPage:
     return _query_feed(query, "submittedDate", start, max_results)
 
+def _reached_total(feed: FeedPage, start: int) -> bool:
+    """服务端报告的总数已取完（totalResults 缺失时返回 False，交给空页判断）"""
+    return feed.total_results is not None and start + len(feed.entries or []) >= feed.total_results
+
 # ---- Baseline Iterators ----
-def iter_recent_cs_single(start_utc=None) -> Iterable[Dict[str, Any]]:
-    """单一大类抓取：适用于非分片模式"""
+def _iter_pages(key: str, page_fn, page_size: int, start_utc=None, store=None, stop_evt=None,
+                bounded: bool = False, date_key: str = "published", journal=None) -> Iterable[PaperEntry]:
+    """
+    通用翻页：按时间降序逐页抓取，遇到窗口起点之前的条目即停止。
+    bounded=True 表示查询里已带日期范围子句：按 totalResults 精确停止，翻页数不再受 MAX_PAGES 限制。
+    传入 store（meta_store.MetaStore）时为增量同步：新条目逐页入库，
+    且若该 key 之前已完整同步到 start_utc，遇到库里已有且 updated 未变的条目就停止翻页。
+    传入 journal（fetch_journal.FetchJournal）时每页记一次断点：续跑时先回放已抓到的条目，再从记录的 start 继续。
+    """
+    stop_on_known = store is not None and store.covers(key, start_utc)
+    complete = False
     start = 0
-    page_size = MAX_RESULTS_PER_PAGE
-    for page in range(MAX_PAGES):
-        feed = query_cs_sorted(start, page_size)
+    page = 0
+    max_pages = MAX_PAGES
+    prog = journal.resume(key) if journal is not None else None
+    if prog is not None:
+        if DEBUG:
+            print(f"[DEBUG] {key} resume from journal: replay={len(prog.rows)} start={prog.start} done={prog.done}")
+        yield from prog.rows
+        if prog.done:
+            return
+        start, page = prog.start, prog.page
+        if bounded and prog.total is not None:
+            max_pages = -(-prog.total // page_size)
+    while page < max_pages:
+        if stop_evt is not None and stop_evt.is_set():
+            return
+        feed = page_fn(start, page_size)
         entries = feed.entries or []
         if not entries:
             if DEBUG:
-                print(f"[DEBUG] single page={page} start={start} -> 0 entries, stop.")
+                print(f"[DEBUG] {key} page={page} start={start} -> 0 entries, stop.")
+            complete = True
             break
-
-        for e in entries:
-            row = _entry_to_dict(e)
-            pub = row["published"]
-            if start_utc and pub and pub < start_utc:
+        if bounded and page == 0 and feed.total_results is not None:
+            max_pages = -(-feed.total_results // page_size)
+            if DEBUG:
+                print(f"[DEBUG] {key} total={feed.total_results} -> {max_pages} page(s)")
+        rows = []
+        for row in entries:
+            dt = getattr(row, date_key)
+            if start_utc and dt and dt < start_utc:
                 if DEBUG:
-                    print(f"[DEBUG] stop at pub={pub}, before window start={start_utc}")
-                return
-            yield row
-        start += page_size
-
-def iter_recent_cs_sharded(start_utc=None) -> Iterable[Dict[str, Any]]:
-    """分片抓取：遍历多个 cs 子类"""
-    page_size = min(MAX_RESULTS_PER_PAGE, 200)
-    for shard in CS_SHARDS:
-        start = 0
-        stop_shard = False  # ✅ 控制是否提前停止整个 shard
-        for page in range(MAX_PAGES):
-            if stop_shard:
+                    print(f"[DEBUG] stop {key} at {date_key}={dt}, before window start={start_utc}")
+                complete = True
                 break
-            feed = _query_cat_submitted(shard, start, page_size)
-            entries = feed.entries or []
-            if not entries:
+            if stop_on_known and store.is_known(row):
                 if DEBUG:
-                    print(f"[DEBUG] shard page={page} start={start} shard={shard} -> 0 entries, stop shard.")
+                    print(f"[DEBUG] stop {key} at known id={row.arxiv_id} (already synced)")
+                complete = True
                 break
-            for e in entries:
-                row = _entry_to_dict(e)
-                pub = row["published"]
-                if start_utc and pub and pub < start_utc:
-                    if DEBUG:
-                        print(f"[DEBUG] stop shard={shard} at pub={pub}, before window start={start_utc}")
-                    stop_shard = True   # ✅ 标记整个 shard 需要停止
-                    break               # 跳出当前 entries 循环
-                yield row
-            start += page_size
+            rows.append(row)
+        if store is not None:
+            store.upsert_many(rows)
+        if journal is not None:
+            journal.record_page(key, start + page_size, page + 1, feed.total_results, rows)
+        yield from rows
+        if complete or _reached_total(feed, start):
+            complete = True
+            break
+        start += page_size
+        page += 1
+    if complete and store is not None:
+        store.mark_synced(key, start_utc)
+    if journal is not None:
+        journal.record_done(key)
+
+def _window_query(start_utc, end_utc, date_field: str) -> tuple[str, str, str]:
+    """返回 (日期子句, 排序字段, 条目时间键)；没有 end_utc 时不加子句（旧行为）"""
+    sort_by, date_key = _DATE_FIELDS.get(date_field, _DATE_FIELDS["submittedDate"])
+    clause = date_range_clause(start_utc, end_utc, date_field) if start_utc and end_utc else ""
+    return clause, sort_by, date_key
+
+def iter_recent_cs_single(start_utc=None, store=None, end_utc=None, date_field: str = "submittedDate",
+                          journal=None) -> Iterable[PaperEntry]:
+    """单一大类抓取：适用于非分片模式"""
+    clause, sort_by, date_key = _window_query(start_utc, end_utc, date_field)
+    page_fn = lambda start, n: query_cs_sorted(start, n, clause, sort_by)
+    key = _with_clause("cat:cs.*", clause)
+    return _iter_pages(key, page_fn, MAX_RESULTS_PER_PAGE, start_utc, store,
+                       bounded=bool(clause), date_key=date_key, journal=journal)
+
+_SHARD_DONE = object()
+
+class _ShardError:
+    def __init__(self, shard: str, exc: BaseException):
+        self.shard = shard
+        self.exc = exc
+
+def _fetch_shard(shard: str, start_utc, page_size: int, out_q: "queue.Queue", stop_evt: threading.Event,
+                 store=None, end_utc=None, date_field: str = "submittedDate", journal=None) -> None:
+    """单个 shard 的翻页抓取（在线程池里运行），结果逐条放入 out_q"""
+    try:
+        clause, sort_by, date_key = _window_query(start_utc, end_utc, date_field)
+        page_fn = lambda start, n: _query_cat_submitted(shard, start, n, clause, sort_by)
+        # 同步进度按“shard + 日期范围”记录：带上界的查询只覆盖该范围
+        key = _with_clause(f"cat:{shard}", clause)
+        for row in _iter_pages(key, page_fn, page_size, start_utc, store, stop_evt,
+                               bounded=bool(clause), date_key=date_key, journal=journal):
+            out_q.put(row)
+    except Exception as e:
+        out_q.put(_ShardError(shard, e))
+    finally:
+        out_q.put(_SHARD_DONE)
+
+def iter_recent_cs_sharded(start_utc=None, store=None, end_utc=None, date_field: str = "submittedDate",
+                           journal=None) -> Iterable[PaperEntry]:
+    """分片抓取：多个 cs 子类由线程池并发翻页，条目到达即 yield（顺序不保证）"""
+    page_size = min(MAX_RESULTS_PER_PAGE, 200)
+    workers = max(1, min(int(SHARD_FETCH_CONCURRENCY), len(CS_SHARDS)))
+    out_q: "queue.Queue" = queue.Queue()
+    stop_evt = threading.Event()
+    ex = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard")
+    try:
+        for shard in CS_SHARDS:
+            ex.submit(_fetch_shard, shard, start_utc, page_size, out_q, stop_evt, store, end_utc, date_field, journal)
+        pending = len(CS_SHARDS)
+        while pending:
+            item = out_q.get()
+            if item is _SHARD_DONE:
+                pending -= 1
+                continue
+            if isinstance(item, _ShardError):
+                raise item.exc
+            yield item
+    finally:
+        # 调用方提前退出或出错时，通知其余 shard 停止翻页
+        stop_evt.set()
+        ex.shutdown(wait=False, cancel_futures=True)
 
 # ---- Unified public interface ----
-def iter_recent_cs(limit_pages: int = MAX_PAGES, page_size: int = MAX_RESULTS_PER_PAGE, start_utc=None) -> Iterable[Dict[str, Any]]:
-    """供 app.py 调用的统一入口"""
+def iter_recent_cs(limit_pages: int = MAX_PAGES, page_size: int = MAX_RESULTS_PER_PAGE, start_utc=None, store=None,
+                   end_utc=None, date_field: str = "submittedDate", journal=None) -> Iterable[PaperEntry]:
+    """
+    供 app.py 调用的统一入口；传入 store 时只 yield 本次新抓到的条目（其余已在库中）。
+    同时给了 start_utc/end_utc 时，窗口以 date_field（submittedDate | lastUpdatedDate）范围子句下推到服务端。
+    传入 journal 时按 shard 记断点，中断后可续跑。
+    """
     if USE_SHARDED_BASELINE:
-        return iter_recent_cs_sharded(start_utc=start_utc)
+        return iter_recent_cs_sharded(start_utc=start_utc, store=store, end_utc=end_utc, date_field=date_field,
+                                      journal=journal)
     else:
-        return iter_recent_cs_single(start_utc=start_utc)
+        return iter_recent_cs_single(start_utc=start_utc, store=store, end_utc=end_utc, date_field=date_field,
+                                     journal=journal)
+
+def sync_recent_cs(store, start_utc, end_utc=None, date_field: str = "submittedDate", journal=None) -> int:
+    """把基线增量同步进本地元数据库，返回本次抓取（含从断点日志回放）的条目数"""
+    n = 0
+    for _ in iter_recent_cs(start_utc=start_utc, store=store, end_utc=end_utc, date_field=date_field, journal=journal):
+        n += 1
+    return n
 
 # ---- Per-org search ----
-def search_by_terms(terms, limit_pages=5, page_size=200):
-    """机构名关键字搜索 (cat:cs.*) AND (all:term1 OR all:term2 ...)"""
-    if not terms:
-        return
+_CS_CLAUSE = "((cat:cs.*) OR (cat:stat.ML))"
+
+def _terms_query(terms: List[str], date_clause: str = "") -> str:
     or_block = " OR ".join([f'all:{t}' for t in terms])
-    query = f"((cat:cs.*) OR (cat:stat.ML)) AND ({or_block})"
+    query = f"{_CS_CLAUSE} AND ({or_block})"
+    if date_clause:
+        query += f" AND {date_clause}"
+    return query
 
+def search_query(query: str, limit_pages: Optional[int] = 5, page_size=200, store=None, journal=None) -> Iterable[PaperEntry]:
+    """
+    按给定 search_query 翻页搜索；传入 store 时顺带入库，传入 journal 时按查询记断点。
+    limit_pages=None 时一直翻到 totalResults（只给带日期范围子句的查询用）；
+    到了页数上限但服务端还有结果时打 WARN，说明结果被截断了。
+    """
     start = 0
-    for page in range(limit_pages):
+    first_page = 0
+    prog = journal.resume(query) if journal is not None else None
+    if prog is not None:
+        yield from prog.rows
+        if prog.done:
+            return
+        start, first_page = prog.start, prog.page
+    feed = None
+    pages = itertools.count(first_page) if limit_pages is None else range(first_page, limit_pages)
+    for page in pages:
         feed = _query_any(query, start, page_size)
         entries = feed.entries or []
         if not entries:
             if DEBUG:
-                print(f"[DEBUG] per-org page={page} start={start} -> 0 entries, stop.")
+                print(f"[DEBUG] search page={page} start={start} -> 0 entries, stop.")
+            break
+        rows = entries
+        if store is not None:
+            store.upsert_many(rows)
+        if journal is not None:
+            journal.record_page(query, start + page_size, page + 1, feed.total_results, rows)
+        yield from rows
+        if _reached_total(feed, start):
             break
-        for e in entries:
-            yield _entry_to_dict(e)
         start += page_size
+    else:
+        if feed is not None and feed.total_results is not None and feed.total_results > start:
+            print(f"[WARN] search truncated at {limit_pages} pages: {start}/{feed.total_results} results "
+                  f"fetched for {query[:120]}")
+    if journal is not None:
+        journal.record_done(query)
+
+def search_by_terms(terms, limit_pages=5, page_size=200, store=None,
+                    start_utc=None, end_utc=None, date_field: str = "submittedDate"):
+    """机构名关键字搜索 (cat:cs.*) AND (all:term1 OR all:term2 ...)；给了窗口时附带日期范围子句，传入 store 时顺带入库"""
+    if not terms:
+        return
+    clause = date_range_clause(start_utc, end_utc, date_field) if start_utc and end_utc else ""
+    yield from search_query(_terms_query(list(terms), clause), limit_pages, page_size, store)
+
+class TermQuery(NamedTuple):
+    query: str          # 完整的 search_query
+    orgs: List[str]     # 这条查询覆盖的机构
+    terms: List[str]    # 实际放进查询的关键词（已跨机构去重）
+
+def plan_term_queries(
+    org_terms: Dict[str, List[str]],
+    start_utc: Optional[datetime] = None,
+    end_utc: Optional[datetime] = None,
+    date_field: str = "submittedDate",
+    max_chars: int = ORG_QUERY_MAX_CHARS,
+) -> List[TermQuery]:
+    """
+    把多个机构的关键词贪心打包成少量 OR 查询：每条查询不超过 max_chars，
+    重复关键词只搜一次；给了窗口时追加日期范围子句，只返回窗口内的结果。
+    单个机构的关键词太多时会被拆到多条查询里。
+    """
+    date_clause = date_range_clause(start_utc, end_utc, date_field) if start_utc and end_utc else ""
+    groups: List[tuple] = []          # [(terms, orgs)]
+    term_group: Dict[str, int] = {}   # 关键词 -> 所在查询下标（重复关键词只搜一次）
+    for org, terms in org_terms.items():
+        for t in terms:
+            if t in term_group:
+                orgs = groups[term_group[t]][1]
+            else:
+                if not groups or len(_terms_query(groups[-1][0] + [t], date_clause)) > max_chars:
+                    groups.append(([], []))
+                groups[-1][0].append(t)
+                term_group[t] = len(groups) - 1
+                orgs = groups[-1][1]
+            if org not in orgs:
+                orgs.append(org)
+    return [TermQuery(_terms_query(terms, date_clause), orgs, terms) for terms, orgs in groups]
+
+# ---- Bulk id lookup ----
+@dataclass(frozen=True)
+class ArxivRecord:
+    """按 id 查到的论文元数据"""
+    arxiv_id: str                       # 带版本号，如 2506.16012v2
+    base_id: str                        # 不带版本号
+    version: int
+    title: str
+    summary: str
+    authors: List[str] = field(default_factory=list)
+    published: Optional[datetime] = None
+    updated: Optional[datetime] = None
+    primary_category: Optional[str] = None
+    pdf_url: Optional[str] = None
+
+    @classmethod
+    def from_entry(cls, e: PaperEntry) -> "ArxivRecord":
+        from meta_store import split_arxiv_id
+        base_id, version = split_arxiv_id(e.id)
+        return cls(
+            arxiv_id=e.arxiv_id, base_id=base_id, version=version,
+            title=" ".join(e.title.split()), summary=e.summary,
+            authors=list(e.authors), published=e.published, updated=e.updated,
+            primary_category=e.primary_category, pdf_url=e.pdf_url,
+        )
+
+def lookup_ids(ids: Iterable[str], store=None, batch_size: int = ID_LOOKUP_BATCH, timeout=None,
+               failed: Optional[List[str]] = None) -> Dict[str, ArxivRecord]:
+    """
+    批量按 arXiv id 取元数据，返回 {请求的 id: ArxivRecord}。
+    先查本地元数据库（store），缺的再用 id_list=a,b,c 分批请求（共享会话/限速/缓存），结果顺带入库。
+    请求里不带版本号的 id 对应最新版本；查不到的 id 不出现在结果里。
+    某一批请求失败时只跳过这一批（其余批次的结果照常返回），这批的 id 追加到 failed（传入时）。
+    """
+    from meta_store import split_arxiv_id
+    wanted = list(dict.fromkeys(i.strip() for i in ids if i and i.strip()))
+    out: Dict[str, ArxivRecord] = {}
+    if store is not None:
+        for aid, e in store.get_by_ids(wanted).items():
+            out[aid] = ArxivRecord.from_entry(e)
+    missing = [aid for aid in wanted if aid not in out]
+    for i in range(0, len(missing), max(1, batch_size)):
+        chunk = missing[i:i + batch_size]
+        params = {"id_list": ",".join(chunk), "start": 0, "max_results": len(chunk)}
+        parse = _parse_with_feedparser if ATOM_PARSER == "feedparser" else parse_stream
+        try:
+            feed = _get_with_fallback(params, timeout=timeout, parse=parse)
+        except Exception as ex:
+            print(f"[WARN] lookup_ids: batch of {len(chunk)} ids failed: {ex}")
+            if failed is not None:
+                failed.extend(chunk)
+            continue
+        rows = [e for e in (feed.entries or []) if "/abs/" in e.id]  # 跳过 API 错误条目
+        if store is not None:
+            store.upsert_many(rows)
+        by_exact = {e.arxiv_id: e for e in rows}
+        by_base = {split_arxiv_id(e.id)[0]: e for e in rows}
+        for aid in chunk:
+            e = by_exact.get(aid) or by_base.get(aid)
+            if e is not None:
+                out[aid] = ArxivRecord.from_entry(e)
+    if DEBUG:
+        print(f"[DEBUG] lookup_ids: requested={len(wanted)} from_store={len(wanted) - len(missing)} resolved={len(out)}")
+    return out
 
 # ---- Misc helpers ----
-def extract_pdf_url(entry: Dict[str, Any]) -> str | None:
-    for link in entry.get("links", []):
-        if link.get("type") == "application/pdf":
-            return link.get("href")
-    return None
+def extract_pdf_url(entry: Dict[str, Any] | PaperEntry) -> str | None:
+    return as_entry(entry).pdf_url
 
-def get_arxiv_id(entry: Dict[str, Any]) -> str:
-    raw = (entry.get("id") or "").rstrip("/")
-    return raw.split("/")[-1]
+def get_arxiv_id(entry: Dict[str, Any] | PaperEntry) -> str:
+    return as_entry(entry).arxiv_id
@@ -0,0 +1,168 @@
+# fetch_journal.py
+"""
+长时间翻页抓取的断点日志（checkpoint journal）：
+每个 shard / 查询每抓完一页，就向 JSONL 日志追加一行 {key, 下一页 start, 页号, totalResults, 本页条目}。
+进程中途退出后，同一窗口的下一次运行先回放日志里已抓到的条目，再从记录的 start 继续翻页，不必从第 0 页重来。
+日志按“运行窗口”一文件；整轮抓取正常结束后删除。只追加写，崩溃时最多丢掉最后一行未写完的记录。
+--window-hours 的窗口随启动时刻变化，这类日志按小时数命名，第一行记下实际窗口；
+只有中断不久（见 FETCH_JOURNAL_WINDOW_MAX_AGE_HOURS）的续跑才沿用同一窗口，否则丢弃日志按新窗口重抓。
+"""
+from __future__ import annotations
+import hashlib, json, threading, time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import DEBUG
+from paper_entry import PaperEntry
+
+try:
+    from config import FETCH_JOURNAL_ENABLED
+except Exception:
+    FETCH_JOURNAL_ENABLED = True
+try:
+    from config import FETCH_JOURNAL_DIR
+except Exception:
+    FETCH_JOURNAL_DIR = str(Path("data") / "fetch_journal")
+try:
+    from config import FETCH_JOURNAL_MAX_AGE_DAYS
+except Exception:
+    FETCH_JOURNAL_MAX_AGE_DAYS = 7
+try:
+    from config import FETCH_JOURNAL_WINDOW_MAX_AGE_HOURS
+except Exception:
+    FETCH_JOURNAL_WINDOW_MAX_AGE_HOURS = 1
+
+def _dt_str(dt: Optional[datetime]) -> Optional[str]:
+    return dt.isoformat() if dt is not None else None
+
+def _row_to_json(e: PaperEntry) -> Dict[str, Any]:
+    return {
+        "id": e.id, "title": e.title, "summary": e.summary, "authors": list(e.authors),
+        "published": _dt_str(e.published), "updated": _dt_str(e.updated),
+        "primary_category": e.primary_category, "comment": e.comment,
+        "journal_ref": e.journal_ref, "pdf_url": e.pdf_url,
+    }
+
+class KeyProgress:
+    """某个 key 已完成的进度：下一页 start、已翻页数、totalResults、已抓到的条目、是否已翻完"""
+    __slots__ = ("start", "page", "total", "rows", "done")
+
+    def __init__(self):
+        self.start = 0
+        self.page = 0
+        self.total: Optional[int] = None
+        self.rows: List[PaperEntry] = []
+        self.done = False
+
+class FetchJournal:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._state: Dict[str, KeyProgress] = {}
+        self.window: Optional[Tuple[datetime, datetime]] = None   # 记录过的抓取窗口（UTC）
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        n = 0
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # 崩溃时写了一半的最后一行
+                if "window" in rec:
+                    s, e = rec["window"]
+                    self.window = (datetime.fromisoformat(s), datetime.fromisoformat(e))
+                    continue
+                st = self._state.setdefault(rec["key"], KeyProgress())
+                if rec.get("done"):
+                    st.done = True
+                    continue
+                st.start = int(rec["start"])
+                st.page = int(rec["page"])
+                st.total = rec.get("total")
+                st.rows.extend(PaperEntry.from_dict(r) for r in rec.get("rows") or [])
+                n += 1
+        if DEBUG and n:
+            print(f"[DEBUG] fetch journal {self.path.name}: resuming {len(self._state)} key(s) from {n} page record(s)")
+
+    def resume(self, key: str) -> Optional[KeyProgress]:
+        """该 key 之前的进度；没有记录时返回 None"""
+        with self._lock:
+            return self._state.get(key)
+
+    def _append(self, rec: Dict[str, Any]) -> None:
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+
+    def record_page(self, key: str, next_start: int, page: int, total: Optional[int], rows: List[PaperEntry]) -> None:
+        """一页抓完（且已交给调用方）后记录：下次从 next_start 继续"""
+        self._append({
+            "key": key, "start": next_start, "page": page, "total": total,
+            "rows": [_row_to_json(r) for r in rows],
+        })
+
+    def record_window(self, start_utc: datetime, end_utc: datetime) -> None:
+        self.window = (start_utc, end_utc)
+        self._append({"window": [start_utc.isoformat(), end_utc.isoformat()]})
+
+    def record_done(self, key: str) -> None:
+        self._append({"key": key, "done": True})
+
+    def finish(self) -> None:
+        """整轮抓取完成：删除日志"""
+        with self._lock:
+            self.path.unlink(missing_ok=True)
+            self._state.clear()
+            self.window = None
+
+def _prune(root: Path, max_age_days: float) -> None:
+    # 从未续跑完成的旧日志（比如某天崩溃后没有再跑同一窗口）
+    cutoff = time.time() - max_age_days * 86400
+    for p in root.glob("*.jsonl"):
+        try:
+            if p.stat().st_mtime < cutoff:
+                p.unlink()
+        except OSError:
+            continue
+
+def open_journal(start_utc: datetime, end_utc: datetime, mode: str, window_hours: int = 0) -> Optional[FetchJournal]:
+    """
+    按运行窗口打开（或续用）断点日志；FETCH_JOURNAL_ENABLED=False 时返回 None。
+    window_hours>0（窗口 = 启动时刻往前 N 小时）时按小时数 + mode 命名：日志里已有窗口、
+    且上次窗口的终点距现在不超过 min(窗口长度, FETCH_JOURNAL_WINDOW_MAX_AGE_HOURS) 时沿用
+    （调用方用 journal.window 替换自己算的窗口）；过旧的窗口连同已抓条目一起丢弃，记下这次的窗口。
+    """
+    if not FETCH_JOURNAL_ENABLED:
+        return None
+    root = Path(FETCH_JOURNAL_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+    _prune(root, FETCH_JOURNAL_MAX_AGE_DAYS)
+    if window_hours > 0:
+        run_key = f"last{window_hours}h|{mode}"
+    else:
+        run_key = f"{start_utc.isoformat()}|{end_utc.isoformat()}|{mode}"
+    name = hashlib.sha256(run_key.encode("utf-8")).hexdigest()[:16]
+    journal = FetchJournal(root / f"{name}.jsonl")
+    if window_hours > 0 and journal.window is not None:
+        # 续跑太晚的话，旧窗口会漏掉中断以来的新论文，不如重抓
+        age_h = (end_utc - journal.window[1]).total_seconds() / 3600
+        max_age_h = min(float(window_hours), float(FETCH_JOURNAL_WINDOW_MAX_AGE_HOURS))
+        if 0 <= age_h <= max_age_h:
+            s, e = journal.window
+            print(f"[resume] resuming interrupted --window-hours {window_hours} run: "
+                  f"window {s.isoformat()} .. {e.isoformat()} (saved {age_h * 60:.0f} min ago)")
+        else:
+            print(f"[resume] discarding stale fetch journal for --window-hours {window_hours} "
+                  f"(saved {age_h:.1f}h ago, limit {max_age_h:g}h)")
+            journal.finish()
+    if window_hours > 0 and journal.window is None:
+        journal.record_window(start_utc, end_utc)
+    return journal
@@ -2,6 +2,7 @@ from __future__ import annotations
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, Tuple
 from config import LOCAL_TZ, ARXIV_CATEGORIES
+from paper_entry import PaperEntry, as_entry
 
 def beijing_previous_day_window(now_local):
     """
@@ -19,32 +20,74 @@ def beijing_previous_day_window(now_local):
     end_utc = end_beijing - timedelta(hours=8)
     return start_utc.replace(tzinfo=timezone.utc), end_utc.replace(tzinfo=timezone.utc)
 
-def in_time_window(entry: Dict[str, Any], start_utc: datetime, end_utc: datetime, mode: str = "both") -> bool:
-    pub = entry.get("published")
-    upd = entry.get("updated")
+def in_time_window(entry: Dict[str, Any] | PaperEntry, start_utc: datetime, end_utc: datetime, mode: str = "both") -> bool:
+    e = as_entry(entry)
     if mode == "updated":
-        dt = upd or pub
+        dt = e.updated or e.published
     else:
-        dt = pub or upd
+        dt = e.published or e.updated
     return bool(dt and start_utc <= dt <= end_utc)
 
-def is_cs(entry: Dict[str, Any]) -> bool:
-    cat = entry.get("primary_category") or ""
+def is_cs(entry: Dict[str, Any] | PaperEntry) -> bool:
+    cat = as_entry(entry).primary_category or ""
     return any(cat.startswith(p) for p in ARXIV_CATEGORIES)
 
-import re
+from bisect import bisect_left
+from typing import NamedTuple, Optional
 from config import TOPIC_INCLUDE_PATTERNS, TOPIC_EXCLUDE_PATTERNS
+from multimatch import PatternSet
 
-_INC = [re.compile(p, re.IGNORECASE) for p in TOPIC_INCLUDE_PATTERNS]
-_EXC = [re.compile(p, re.IGNORECASE) for p in (TOPIC_EXCLUDE_PATTERNS or [])]
-
-def is_target_topic(entry: Dict[str, Any]) -> bool:
-    hay = "\n".join([
-        entry.get("title",""),
-        entry.get("summary",""),
-        entry.get("comment",""),
-        entry.get("journal_ref",""),
-    ])
-    if any(p.search(hay) for p in _EXC):
-        return False
-    return any(p.search(hay) for p in _INC)
+# 主题分：各字段命中一次的权重（标题里出现主题词比摘要里更说明问题）
+try:
+    from config import TOPIC_FIELD_WEIGHTS
+except Exception:
+    TOPIC_FIELD_WEIGHTS = {"title": 3.0, "summary": 1.0, "comment": 1.0, "journal_ref": 0.5}
+
+class TopicScore(NamedTuple):
+    score: float                 # Σ 字段权重 × 该字段 include 命中次数；命中 exclude 时为 0
+    hits: Dict[str, int]         # 每个字段的 include 命中次数
+    excluded: bool               # 命中任一 exclude 模式
+
+    @property
+    def accepted(self) -> bool:
+        # 只看有没有命中（与旧的 is_target_topic 一致）；分数只用于排序/截断，权重设成 0 的字段照样算命中
+        return not self.excluded and bool(self.hits)
+
+class TopicScorer:
+    """
+    include/exclude 两组主题正则一次编译（字面定位 + 定点校验，见 multimatch），
+    在共享的 haystack（不含作者部分）上一遍统计各字段的命中次数。
+    """
+    def __init__(self, include, exclude, weights: Optional[Dict[str, float]] = None):
+        self._inc = PatternSet(list(enumerate(include)))
+        self._exc = PatternSet(list(enumerate(exclude or [])))
+        self.weights = dict(TOPIC_FIELD_WEIGHTS if weights is None else weights)
+
+    def score(self, entry: Dict[str, Any] | PaperEntry) -> TopicScore:
+        e = as_entry(entry)
+        hay, low, end = e.haystack, e.haystack_lower, e.text_end
+        if self._exc.search(hay, low, end):
+            return TopicScore(0.0, {}, True)
+        bounds = e.field_bounds
+        ends = [b for _, b in bounds]
+        hits: Dict[str, int] = {}
+        for _, m in self._inc.finditer(hay, low, end):
+            name = bounds[bisect_left(ends, m.start())][0]
+            hits[name] = hits.get(name, 0) + 1
+        score = sum(self.weights.get(name, 1.0) * n for name, n in hits.items())
+        return TopicScore(score, hits, False)
+
+_SCORER: Optional[TopicScorer] = None
+
+def topic_scorer() -> TopicScorer:
+    global _SCORER
+    if _SCORER is None:
+        _SCORER = TopicScorer(TOPIC_INCLUDE_PATTERNS, TOPIC_EXCLUDE_PATTERNS)
+    return _SCORER
+
+def topic_score(entry: Dict[str, Any] | PaperEntry) -> TopicScore:
+    return topic_scorer().score(entry)
+
+def is_target_topic(entry: Dict[str, Any] | PaperEntry) -> bool:
+    # 与机构匹配共用同一份 haystack；只在不含作者串的文本部分里找主题词
+    return topic_score(entry).accepted
@@ -0,0 +1,120 @@
+# http_cache.py
+"""
+arXiv API 响应的本地磁盘缓存：按 (endpoint, 规范化参数) 的 SHA-256 寻址。
+- TTL 内直接命中，不走网络；
+- 过期但有 ETag/Last-Modified 时带条件请求头复验（304 即续期）；
+- 总大小超过上限时按最近使用时间（LRU）淘汰。
+"""
+from __future__ import annotations
+import hashlib, json, os, threading, time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+class CachedResponse:
+    __slots__ = ("key", "body", "meta", "fresh")
+
+    def __init__(self, key: str, body: bytes, meta: Dict[str, Any], fresh: bool):
+        self.key = key
+        self.body = body
+        self.meta = meta
+        self.fresh = fresh
+
+    def validators(self) -> Dict[str, str]:
+        """条件请求头；服务端没给过 ETag/Last-Modified 时为空"""
+        h = {}
+        if self.meta.get("etag"):
+            h["If-None-Match"] = self.meta["etag"]
+        if self.meta.get("last_modified"):
+            h["If-Modified-Since"] = self.meta["last_modified"]
+        return h
+
+class ResponseCache:
+    def __init__(self, root: str | Path, ttl_sec: float, max_bytes: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.ttl_sec = float(ttl_sec)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._size = sum(p.stat().st_size for p in self.root.glob("*/*.body"))
+
+    @staticmethod
+    def make_key(endpoint: str, params: Dict[str, Any]) -> str:
+        norm = urlencode(sorted((str(k), str(v)) for k, v in params.items()))
+        return hashlib.sha256(f"{endpoint}?{norm}".encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        d = self.root / key[:2]
+        return d / f"{key}.body", d / f"{key}.meta.json"
+
+    def get(self, endpoint: str, params: Dict[str, Any]) -> Optional[CachedResponse]:
+        key = self.make_key(endpoint, params)
+        body_p, meta_p = self._paths(key)
+        try:
+            meta = json.loads(meta_p.read_text(encoding="utf-8"))
+            body = body_p.read_bytes()
+        except (OSError, ValueError):
+            return None
+        fresh = time.time() - float(meta.get("stored_at", 0)) < self.ttl_sec
+        if fresh:
+            os.utime(body_p)  # 记录最近使用时间，供 LRU 淘汰
+        return CachedResponse(key, body, meta, fresh)
+
+    def put(self, endpoint: str, params: Dict[str, Any], body: bytes, headers) -> None:
+        key = self.make_key(endpoint, params)
+        body_p, meta_p = self._paths(key)
+        body_p.parent.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "url": endpoint,
+            "params": {str(k): str(v) for k, v in params.items()},
+            "stored_at": time.time(),
+            "etag": headers.get("ETag") or "",
+            "last_modified": headers.get("Last-Modified") or "",
+        }
+        old = body_p.stat().st_size if body_p.exists() else 0
+        tmp = body_p.with_suffix(".tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, body_p)
+        meta_p.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        with self._lock:
+            self._size += len(body) - old
+        self._evict()
+
+    def refresh(self, hit: CachedResponse) -> None:
+        """304 复验通过：续期 TTL"""
+        body_p, meta_p = self._paths(hit.key)
+        hit.meta["stored_at"] = time.time()
+        meta_p.write_text(json.dumps(hit.meta, ensure_ascii=False), encoding="utf-8")
+        os.utime(body_p)
+
+    def _evict(self) -> None:
+        with self._lock:
+            if self._size <= self.max_bytes:
+                return
+            bodies = sorted(self.root.glob("*/*.body"), key=lambda p: p.stat().st_mtime)
+            for p in bodies:
+                if self._size <= self.max_bytes:
+                    break
+                try:
+                    sz = p.stat().st_size
+                    p.unlink()
+                    p.with_name(p.name[:-len(".body")] + ".meta.json").unlink(missing_ok=True)
+                    self._size -= sz
+                except OSError:
+                    continue
+
+    def record(self, kind: str) -> None:
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.revalidated + self.misses
+            rate = (self.hits + self.revalidated) / total if total else 0.0
+            return {
+                "hits": self.hits, "revalidated": self.revalidated, "misses": self.misses,
+                "hit_rate": round(rate, 3), "bytes": self._size,
+            }
@@ -0,0 +1,330 @@
+# meta_store.py
+from __future__ import annotations
+import json, sqlite3, threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional
+
+from config import DEBUG
+from paper_entry import PaperEntry, as_entry
+from token_index import tokenize
+
+# 本地元数据库开关：可在 config.py 里覆盖
+try:
+    from config import META_STORE_ENABLED
+except Exception:
+    META_STORE_ENABLED = True
+try:
+    from config import META_STORE_PATH
+except Exception:
+    META_STORE_PATH = str(Path("data") / "arxiv_meta.sqlite3")
+try:
+    from config import TOKEN_INDEX_ENABLED
+except Exception:
+    TOKEN_INDEX_ENABLED = True
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    base_id          TEXT NOT NULL,
+    version          INTEGER NOT NULL,
+    id               TEXT NOT NULL,
+    title            TEXT,
+    summary          TEXT,
+    authors          TEXT,
+    published        TEXT,
+    updated          TEXT,
+    primary_category TEXT,
+    comment          TEXT,
+    journal_ref      TEXT,
+    links            TEXT,
+    fetched_at       TEXT,
+    PRIMARY KEY (base_id, version)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_pub_first ON entries (COALESCE(published, updated));
+CREATE INDEX IF NOT EXISTS idx_entries_upd_first ON entries (COALESCE(updated, published));
+CREATE TABLE IF NOT EXISTS docs (
+    doc      INTEGER PRIMARY KEY,
+    base_id  TEXT NOT NULL,
+    version  INTEGER NOT NULL,
+    UNIQUE (base_id, version)
+);
+-- 倒排索引：每篇一行，内容是 token_index.tokenize 切好的词（空格分隔），rowid = docs.doc
+CREATE VIRTUAL TABLE IF NOT EXISTS doc_tokens USING fts5(
+    tokens, tokenize='unicode61 remove_diacritics 0', detail='none'
+);
+-- 已处理（MinerU + 判定）过的论文：每个 base_id 记最新处理过的版本
+CREATE TABLE IF NOT EXISTS processed (
+    base_id       TEXT PRIMARY KEY,
+    version       INTEGER NOT NULL,
+    run_date      TEXT NOT NULL,
+    processed_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key            TEXT PRIMARY KEY,
+    covered_since  TEXT NOT NULL,
+    synced_at      TEXT NOT NULL
+);
+"""
+
+def split_arxiv_id(raw_id: str) -> tuple[str, int]:
+    """'http://arxiv.org/abs/2506.16012v2' -> ('2506.16012', 2)；无版本号时记为 0"""
+    aid = (raw_id or "").rstrip("/").split("/abs/")[-1]
+    head, sep, tail = aid.rpartition("v")
+    if sep and head and tail.isdigit():
+        return head, int(tail)
+    return aid, 0
+
+_MIN_DT = datetime.min.replace(tzinfo=timezone.utc)
+
+def _dt_to_str(dt: Optional[datetime]) -> Optional[str]:
+    # 统一成 UTC ISO 字符串，保证 SQLite 里按字符串比较 == 按时间比较
+    if dt is None:
+        return None
+    return dt.astimezone(timezone.utc).isoformat()
+
+def _str_to_dt(s: Optional[str]) -> Optional[datetime]:
+    if not s:
+        return None
+    return datetime.fromisoformat(s)
+
+class MetaStore:
+    """arXiv 元数据本地库（SQLite），主键 = (base_id, version)"""
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    # ---- entries ----
+    def upsert_many(self, rows: Iterable[Dict[str, Any]]) -> int:
+        now = _dt_to_str(datetime.now(timezone.utc))
+        params = []
+        docs = []
+        for r in rows:
+            e = as_entry(r)
+            base_id, version = split_arxiv_id(e.id)
+            if not base_id:
+                continue
+            if TOKEN_INDEX_ENABLED:
+                docs.append((base_id, version, " ".join(tokenize(e.haystack))))
+            params.append((
+                base_id, version, e.id, e.title, e.summary,
+                json.dumps(list(e.authors), ensure_ascii=False),
+                _dt_to_str(e.published), _dt_to_str(e.updated),
+                e.primary_category, e.comment, e.journal_ref,
+                json.dumps(e.links, ensure_ascii=False),
+                now,
+            ))
+        if not params:
+            return 0
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)", params
+            )
+            if docs:
+                self._index_docs(docs)
+            self._conn.commit()
+        return len(params)
+
+    def is_known(self, row: Dict[str, Any]) -> bool:
+        """同一 id+版本 且 updated 一致 → 已入库且未变化"""
+        e = as_entry(row)
+        base_id, version = split_arxiv_id(e.id)
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT updated FROM entries WHERE base_id=? AND version=?", (base_id, version)
+            )
+            hit = cur.fetchone()
+        return hit is not None and hit[0] == _dt_to_str(e.updated)
+
+    def get_by_ids(self, ids: Iterable[str]) -> Dict[str, PaperEntry]:
+        """按 arXiv id 取条目：带版本号精确匹配，不带版本号取库里最新版本；返回 {请求的 id: 条目}"""
+        out: Dict[str, PaperEntry] = {}
+        with self._lock:
+            for aid in ids:
+                base_id, version = split_arxiv_id(aid)
+                if version:
+                    cur = self._conn.execute(
+                        "SELECT * FROM entries WHERE base_id=? AND version=?", (base_id, version))
+                else:
+                    cur = self._conn.execute(
+                        "SELECT * FROM entries WHERE base_id=? ORDER BY version DESC LIMIT 1", (base_id,))
+                hit = cur.fetchone()
+                if hit is not None:
+                    cols = [c[0] for c in cur.description]
+                    out[aid] = self._row_to_entry(dict(zip(cols, hit)))
+        return out
+
+    def query_window(self, start_utc: datetime, end_utc: datetime, mode: str = "both") -> List[PaperEntry]:
+        """索引版 filters.in_time_window：mode='updated' 优先 updated，否则优先 published"""
+        expr = self._window_expr(mode)
+        sql = f"SELECT * FROM entries WHERE {expr} BETWEEN ? AND ? ORDER BY {expr} DESC"
+        with self._lock:
+            cur = self._conn.execute(sql, (_dt_to_str(start_utc), _dt_to_str(end_utc)))
+            cols = [c[0] for c in cur.description]
+            rows = cur.fetchall()
+        return [self._row_to_entry(dict(zip(cols, r))) for r in rows]
+
+    # ---- 倒排索引（token_index） ----
+    @staticmethod
+    def _window_expr(mode: str, alias: str = "") -> str:
+        a = f"{alias}." if alias else ""
+        if mode == "updated":
+            return f"COALESCE({a}updated, {a}published)"
+        return f"COALESCE({a}published, {a}updated)"
+
+    def window_keys(self, start_utc: datetime, end_utc: datetime, mode: str = "both") -> set:
+        expr = self._window_expr(mode)
+        with self._lock:
+            cur = self._conn.execute(
+                f"SELECT base_id, version FROM entries WHERE {expr} BETWEEN ? AND ?",
+                (_dt_to_str(start_utc), _dt_to_str(end_utc)))
+            return set(cur.fetchall())
+
+    def _index_docs(self, docs: List[tuple]) -> None:
+        """docs: [(base_id, version, 空格分隔的词)]；同一版本重复入库时覆盖旧的倒排记录。调用方持锁"""
+        self._conn.executemany("INSERT OR IGNORE INTO docs (base_id, version) VALUES (?,?)",
+                               [(b, v) for b, v, _ in docs])
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO doc_tokens (rowid, tokens) "
+            "SELECT doc, ? FROM docs WHERE base_id=? AND version=?",
+            [(toks, b, v) for b, v, toks in docs])
+
+    def unindexed_in_window(self, start_utc: datetime, end_utc: datetime, mode: str = "both") -> int:
+        """窗口内还没进倒排索引的条目数（索引上线前入库、或曾关闭 TOKEN_INDEX_ENABLED）"""
+        expr = self._window_expr(mode, "e")
+        sql = ("SELECT COUNT(*) FROM entries e LEFT JOIN docs d ON d.base_id = e.base_id AND d.version = e.version "
+               f"WHERE d.doc IS NULL AND {expr} BETWEEN ? AND ?")
+        with self._lock:
+            return self._conn.execute(sql, (_dt_to_str(start_utc), _dt_to_str(end_utc))).fetchone()[0]
+
+    def keys_for_match(self, fts_query: str, start_utc: datetime, end_utc: datetime, mode: str = "both") -> set:
+        """窗口内满足 FTS5 查询（token_index 生成）的 (base_id, version)"""
+        expr = self._window_expr(mode, "e")
+        sql = ("SELECT d.base_id, d.version FROM doc_tokens t "
+               "JOIN docs d ON d.doc = t.rowid "
+               "JOIN entries e ON e.base_id = d.base_id AND e.version = d.version "
+               f"WHERE doc_tokens MATCH ? AND {expr} BETWEEN ? AND ?")
+        with self._lock:
+            cur = self._conn.execute(sql, (fts_query, _dt_to_str(start_utc), _dt_to_str(end_utc)))
+            return set(cur.fetchall())
+
+    def get_by_keys(self, keys: Iterable[tuple]) -> Dict[tuple, PaperEntry]:
+        """按 (base_id, version) 批量取条目，按时间降序返回 {key: 条目}"""
+        keys = list(keys)
+        out: Dict[tuple, PaperEntry] = {}
+        with self._lock:
+            for i in range(0, len(keys), 400):
+                chunk = keys[i:i + 400]
+                marks = ",".join("(?,?)" for _ in chunk)
+                cur = self._conn.execute(
+                    f"SELECT * FROM entries WHERE (base_id, version) IN (VALUES {marks})",
+                    [x for k in chunk for x in k])
+                cols = [c[0] for c in cur.description]
+                for r in cur.fetchall():
+                    d = dict(zip(cols, r))
+                    out[(d["base_id"], d["version"])] = self._row_to_entry(d)
+        return dict(sorted(out.items(), key=lambda kv: kv[1].published or kv[1].updated or _MIN_DT, reverse=True))
+
+    def reindex(self) -> int:
+        """对库里全部条目重建倒排索引（索引功能上线前入库的条目、或改了切词规则后用）"""
+        with self._lock:
+            cur = self._conn.execute("SELECT * FROM entries")
+            cols = [c[0] for c in cur.description]
+            docs = []
+            for r in cur.fetchall():
+                d = dict(zip(cols, r))
+                docs.append((d["base_id"], d["version"], " ".join(tokenize(self._row_to_entry(d).haystack))))
+            self._conn.execute("DELETE FROM doc_tokens")
+            self._index_docs(docs)
+            self._conn.commit()
+        return len(docs)
+
+    @staticmethod
+    def _row_to_entry(r: Dict[str, Any]) -> PaperEntry:
+        # 与 fetch_arxiv 抓取结果同为 PaperEntry
+        return PaperEntry.from_dict({
+            "id": r["id"],
+            "title": r["title"] or "",
+            "summary": r["summary"] or "",
+            "authors": json.loads(r["authors"] or "[]"),
+            "published": _str_to_dt(r["published"]),
+            "updated": _str_to_dt(r["updated"]),
+            "primary_category": r["primary_category"],
+            "comment": r["comment"] or "",
+            "journal_ref": r["journal_ref"] or "",
+            "links": json.loads(r["links"] or "[]"),
+        })
+
+    # ---- processed ledger ----
+    def mark_processed(self, arxiv_id: str, run_date: str) -> None:
+        """记一篇论文（带版本号的 id）在 run_date 这次运行里处理完了；只会往更新的版本上改"""
+        base_id, version = split_arxiv_id(arxiv_id)
+        if not base_id:
+            return
+        now = _dt_to_str(datetime.now(timezone.utc))
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO processed (base_id, version, run_date, processed_at) VALUES (?,?,?,?) "
+                "ON CONFLICT(base_id) DO UPDATE SET version=excluded.version, run_date=excluded.run_date, "
+                "processed_at=excluded.processed_at WHERE excluded.version >= processed.version",
+                (base_id, version, run_date, now),
+            )
+            self._conn.commit()
+
+    def processed_versions(self, base_ids: Iterable[str]) -> Dict[str, tuple]:
+        """{base_id: (已处理的版本号, run_date)}，没处理过的不在结果里"""
+        ids = list(dict.fromkeys(base_ids))
+        out: Dict[str, tuple] = {}
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                cur = self._conn.execute(
+                    f"SELECT base_id, version, run_date FROM processed WHERE base_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for base_id, version, run_date in cur:
+                    out[base_id] = (version, run_date)
+        return out
+
+    # ---- sync state ----
+    def covers(self, key: str, start_utc: Optional[datetime]) -> bool:
+        """key（shard/查询）此前是否已完整同步到 start_utc 或更早"""
+        if start_utc is None:
+            return False
+        with self._lock:
+            cur = self._conn.execute("SELECT covered_since FROM sync_state WHERE key=?", (key,))
+            hit = cur.fetchone()
+        return hit is not None and hit[0] <= _dt_to_str(start_utc)
+
+    def mark_synced(self, key: str, start_utc: Optional[datetime]) -> None:
+        if start_utc is None:
+            return
+        since = _dt_to_str(start_utc)
+        now = _dt_to_str(datetime.now(timezone.utc))
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sync_state (key, covered_since, synced_at) VALUES (?,?,?) "
+                "ON CONFLICT(key) DO UPDATE SET covered_since=MIN(covered_since, excluded.covered_since), "
+                "synced_at=excluded.synced_at",
+                (key, since, now),
+            )
+            self._conn.commit()
+
+_STORE: Optional[MetaStore] = None
+_STORE_LOCK = threading.Lock()
+
+def get_store() -> Optional[MetaStore]:
+    """进程级单例；META_STORE_ENABLED=False 时返回 None"""
+    global _STORE
+    if not META_STORE_ENABLED:
+        return None
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = MetaStore(META_STORE_PATH)
+            if DEBUG:
+                print(f"[DEBUG] meta store: {_STORE.path}")
+    return _STORE
@@ -0,0 +1,191 @@
+# multimatch.py
+"""
+多模式匹配的字面串预筛（机构匹配 classify.OrgMatcher 与主题打分 filters.TopicScorer 共用）。
+每个正则按顶层 '|' 拆分支，取各分支开头必须出现的字面串（小写）；
+在小写文本里用子串查找定位这些字面串，只在出现位置上跑真正的正则（regex.match），
+绝大多数模式一个位置都没有，整段正则扫描也就省掉了。
+Python re 的大分支交替正则不会做 Aho–Corasick 式优化，实测比逐个 search 还慢，故用这种方式。
+"""
+from __future__ import annotations
+import re
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+_REGEX_META = set("\\.^$*+?{}[]|()")
+
+def _is_word(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+def _split_top_level(pat: str) -> List[str]:
+    """按顶层（不在括号/字符类里）的 '|' 拆分支"""
+    out, buf, depth, in_cls, i = [], [], 0, False, 0
+    while i < len(pat):
+        c = pat[i]
+        if c == "\\":
+            buf.append(pat[i:i + 2])
+            i += 2
+            continue
+        if in_cls:
+            in_cls = c != "]"
+        elif c == "[":
+            in_cls = True
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            out.append("".join(buf))
+            buf = []
+            i += 1
+            continue
+        buf.append(c)
+        i += 1
+    out.append("".join(buf))
+    return out
+
+def _close_paren(pat: str) -> int:
+    """pat[0] == '(' 时对应的右括号位置；找不到返回 -1"""
+    depth, in_cls, i = 0, False, 0
+    while i < len(pat):
+        c = pat[i]
+        if c == "\\":
+            i += 2
+            continue
+        if in_cls:
+            in_cls = c != "]"
+        elif c == "[":
+            in_cls = True
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return -1
+
+def _branch_literals(branch: str) -> Optional[List[Tuple[str, bool]]]:
+    """
+    分支的匹配必然从其中某个 (字面串, 前面是否有 \\b) 开始；字面串已小写。
+    分支以分组开头时（如 \\b(sampling|top-?p)\\b）展开分组里的各分支；取不到字面时返回 None。
+    """
+    bounded = branch.startswith(r"\b")
+    if bounded:
+        branch = branch[2:]
+    if branch.startswith("("):
+        close = _close_paren(branch)
+        inner = branch[1:close]
+        if close < 0 or branch[close + 1:close + 2] in ("?", "*", "{"):
+            return None  # 分组可省略
+        if inner.startswith("?:"):
+            inner = inner[2:]
+        elif inner.startswith("?"):
+            return None  # 前瞻/后顾/命名组等
+        out: List[Tuple[str, bool]] = []
+        for alt in _split_top_level(inner):
+            lits = _branch_literals((r"\b" if bounded else "") + alt)
+            if lits is None:
+                return None
+            out.extend(lits)
+        return out
+    i = 0
+    while i < len(branch) and branch[i] not in _REGEX_META:
+        i += 1
+    lit = branch[:i]
+    if i < len(branch) and branch[i] in "?*{":
+        lit = lit[:-1]  # 'Labs?' 这类：最后一个字符可省略
+    if not lit:
+        return None
+    # \b 后面跟的若不是词字符，\b 要求的是前一个字符为词字符，不能按“前面不是词字符”来跳过
+    return [(lit.lower(), bounded and _is_word(lit[0]))]
+
+def literal_prefixes(pat: str) -> Optional[List[Tuple[str, bool]]]:
+    """模式命中时，匹配必然从其中某个字面串的出现位置开始；有分支取不到字面时返回 None（= 整段扫描）"""
+    out: List[Tuple[str, bool]] = []
+    for branch in _split_top_level(pat):
+        lits = _branch_literals(branch)
+        if lits is None:
+            return None
+        out.extend(lits)
+    return out
+
+class PatternSet:
+    """
+    一组带标签的正则：同一标签下的多个模式合并成一个正则（regex[label]）。
+    匹配时先在小写文本里找各字面串的出现位置，只在这些位置上用 regex.match 校验；
+    字面串前有 \\b 且前一个字符是词字符的位置直接跳过。取不到字面的模式退回整段 finditer。
+    """
+    def __init__(self, patterns: Sequence[Tuple[Hashable, str]], flags: int = re.IGNORECASE):
+        grouped: Dict[Hashable, List[str]] = {}
+        for label, p in patterns:
+            grouped.setdefault(label, []).append(p)
+        self.labels = list(grouped)
+        self.regex = {label: re.compile("|".join(f"(?:{p})" for p in pats), flags)
+                      for label, pats in grouped.items()}
+        by_lit: Dict[Tuple[str, bool], Set[Hashable]] = defaultdict(set)
+        always: Set[Hashable] = set()
+        for label, p in patterns:
+            lits = literal_prefixes(p)
+            if lits is None:
+                always.add(label)
+            else:
+                for key in lits:
+                    by_lit[key].add(label)
+        self._always = frozenset(always)
+        # 整段扫描的标签不必再按字面位置校验
+        self._literals = [(lit, bounded, tuple(l for l in labels if l not in always))
+                          for (lit, bounded), labels in by_lit.items()]
+
+    def _starts(self, low: str, end: int, only) -> Dict[Hashable, Set[int]]:
+        """各标签可能的匹配起点"""
+        starts: Dict[Hashable, Set[int]] = defaultdict(set)
+        for lit, bounded, labels in self._literals:
+            if only is not None:
+                labels = [l for l in labels if l in only]
+                if not labels:
+                    continue
+            i = low.find(lit, 0, end)
+            while i != -1:
+                if not (bounded and i > 0 and _is_word(low[i - 1])):
+                    for label in labels:
+                        starts[label].add(i)
+                i = low.find(lit, i + 1, end)
+        return starts
+
+    def finditer(self, text: str, low: str, end: Optional[int] = None,
+                 only: Optional[Iterable[Hashable]] = None, first: bool = False) -> Iterator[Tuple[Hashable, re.Match]]:
+        """
+        [0, end) 内的 (标签, 匹配)，同一标签的匹配互不重叠（与 regex.finditer 一致）。
+        low 为 text.lower()；first=True 时每个标签只给第一个匹配（只关心是否命中时用）。
+        """
+        end = len(text) if end is None else end
+        only = set(only) if only is not None else None
+        full = set(self._always) if only is None else self._always & only
+        if len(low) != len(text):
+            # 个别字符小写后长度会变，位置对不上：全部退回整段扫描
+            full = set(self.labels) if only is None else set(only) & set(self.labels)
+            starts: Dict[Hashable, Set[int]] = {}
+        else:
+            starts = self._starts(low, end, only)
+        for label in full:
+            for m in self.regex[label].finditer(text, 0, end):
+                yield label, m
+                if first:
+                    break
+        for label, positions in starts.items():
+            rx, last = self.regex[label], -1
+            for pos in sorted(positions):
+                if pos < last:
+                    continue
+                m = rx.match(text, pos, end)
+                if m is None:
+                    continue
+                yield label, m
+                if first:
+                    break
+                last = max(m.end(), pos + 1)
+
+    def search(self, text: str, low: str, end: Optional[int] = None,
+               only: Optional[Iterable[Hashable]] = None) -> Set[Hashable]:
+        """[0, end) 内实际命中的标签"""
+        return {label for label, _ in self.finditer(text, low, end, only, first=True)}
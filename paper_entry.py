@@ -0,0 +1,137 @@
+# paper_entry.py
+"""
+论文条目的紧凑表示（替代 _entry_to_dict 产出的 dict）：
+- __slots__，不带 feedparser 的整套 links，只保留预先算好的 pdf_url / arxiv_id；
+- primary_category 做字符串驻留（同类条目共享一个对象）；
+- published/updated 构造时解析为 datetime，之后是普通 slot 读取；检索用的 haystack 首次使用时才拼接并缓存。
+为兼容旧代码，仍支持 entry.get("title") / entry["published"] 这种 dict 式读取。
+"""
+from __future__ import annotations
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+_KEYS = ("id", "title", "summary", "authors", "published", "updated",
+         "primary_category", "comment", "journal_ref", "links")
+
+# haystack 里不含作者的文本部分，按此顺序以 '\n' 拼接
+TEXT_FIELDS = ("title", "summary", "comment", "journal_ref")
+
+def _parse_dt(s: Optional[str]) -> Optional[datetime]:
+    if not s:
+        return None
+    try:
+        return datetime.fromisoformat(s.replace("Z", "+00:00")).astimezone(timezone.utc)
+    except Exception:
+        return None
+
+def _arxiv_id_from_url(raw: str) -> str:
+    return (raw or "").rstrip("/").split("/")[-1]
+
+class PaperEntry:
+    __slots__ = ("id", "title", "summary", "authors", "primary_category", "comment", "journal_ref",
+                 "arxiv_id", "pdf_url", "published", "updated", "_hay", "_low", "_text_end")
+
+    def __init__(self, id: str, title: str = "", summary: str = "", authors: Iterable[str] = (),
+                 published: Any = None, updated: Any = None, primary_category: Optional[str] = None,
+                 comment: str = "", journal_ref: str = "", pdf_url: Optional[str] = None):
+        self.id = id or ""
+        self.title = title or ""
+        self.summary = summary or ""
+        self.authors = tuple(authors or ())
+        self.primary_category = sys.intern(primary_category) if primary_category else None
+        self.comment = comment or ""
+        self.journal_ref = journal_ref or ""
+        self.arxiv_id = _arxiv_id_from_url(self.id)
+        self.pdf_url = pdf_url
+        # 构造时就解析成 datetime：时间窗过滤等热路径直接读 slot，不经过 property
+        self.published = _parse_dt(published) if isinstance(published, str) else published
+        self.updated = _parse_dt(updated) if isinstance(updated, str) else updated
+        self._hay = None
+        self._low = None
+        self._text_end = 0
+
+    # ---- 检索文本：惰性拼接 ----
+    @property
+    def haystack(self) -> str:
+        """title/summary/comment/journal_ref + 作者串；text_end 之前是不含作者的部分"""
+        if self._hay is None:
+            text = "\n".join(getattr(self, name) for name in TEXT_FIELDS)
+            self._text_end = len(text)
+            self._hay = text + "\n" + " ".join(self.authors)
+        return self._hay
+
+    @property
+    def text_end(self) -> int:
+        self.haystack
+        return self._text_end
+
+    @property
+    def haystack_lower(self) -> str:
+        """haystack 的小写版，供多模式字面预筛（机构匹配与主题打分共用）"""
+        if self._low is None:
+            self._low = self.haystack.lower()
+        return self._low
+
+    @property
+    def field_bounds(self) -> Tuple[Tuple[str, int], ...]:
+        """haystack 里各文本字段的 (字段名, 结束位置)，依次为 title/summary/comment/journal_ref"""
+        out, pos = [], 0
+        for name in TEXT_FIELDS:
+            pos += len(getattr(self, name))
+            out.append((name, pos))
+            pos += 1
+        return tuple(out)
+
+    @property
+    def links(self) -> list:
+        """兼容旧的 links 结构（只含 abs 与 pdf 两条）"""
+        out = [{"href": self.id, "rel": "alternate", "type": "text/html"}] if self.id else []
+        if self.pdf_url:
+            out.append({"href": self.pdf_url, "rel": "related", "type": "application/pdf", "title": "pdf"})
+        return out
+
+    # ---- dict 兼容 ----
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _KEYS:
+            val = getattr(self, key)
+            return default if val is None and default is not None else val
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in _KEYS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: (list(self.authors) if k == "authors" else getattr(self, k)) for k in _KEYS}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "PaperEntry":
+        pdf_url = d.get("pdf_url")
+        if pdf_url is None:
+            for link in d.get("links") or []:
+                if link.get("type") == "application/pdf":
+                    pdf_url = link.get("href")
+                    break
+        return cls(
+            id=d.get("id") or "", title=d.get("title") or "", summary=d.get("summary") or "",
+            authors=d.get("authors") or (), published=d.get("published"), updated=d.get("updated"),
+            primary_category=d.get("primary_category"), comment=d.get("comment") or "",
+            journal_ref=d.get("journal_ref") or "", pdf_url=pdf_url,
+        )
+
+    def __repr__(self) -> str:
+        return f"PaperEntry({self.arxiv_id!r}, {self.title[:40]!r})"
+
+def as_entry(e: Any) -> PaperEntry:
+    """PaperEntry 原样返回；旧的 dict 条目就地转换"""
+    return e if type(e) is PaperEntry else PaperEntry.from_dict(e)
+
+def haystack_of(e: Any) -> Tuple[str, int]:
+    """(检索文本, 不含作者部分的结束位置)；dict 条目也能用"""
+    e = as_entry(e)
+    return e.haystack, e.text_end
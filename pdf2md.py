@@ -3,15 +3,20 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import posixpath
+import shutil
+import tempfile
+import threading
 import time
 import zipfile
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Iterable, Callable
+from typing import IO, Any, Iterable, Callable
 
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests.adapters
+from concurrent.futures import CancelledError, ThreadPoolExecutor
 
 
 # -----------------------------
@@ -36,42 +41,79 @@ def backoff_sleep(attempt: int, base: float = 1.0, cap: float = 10.0) -> None:
     time.sleep(min(cap, base * (2 ** (attempt - 1))))
 
 
-def pick_first_md(zip_path: Path) -> tuple[str, str]:
-    with zipfile.ZipFile(zip_path, "r") as zf:
-        names = [n for n in zf.namelist() if n.lower().endswith(".md")]
-        if not names:
-            raise RuntimeError(f"no .md in zip: {zip_path}")
-        # 选“路径最浅、名字最短”的 md
-        names.sort(key=lambda s: (s.count("/"), len(s)))
-        name = names[0]
-        raw = zf.read(name)
-    return name, raw.decode("utf-8", errors="replace")
+def _md_name(names: list[str]) -> str | None:
+    # 选“路径最浅、名字最短”的 md
+    mds = sorted((n for n in names if n.lower().endswith(".md")), key=lambda s: (s.count("/"), len(s)))
+    return mds[0] if mds else None
 
 
-def pick_preferred_json(zip_path: Path) -> tuple[str, Any]:
+def _json_name(names: list[str]) -> str | None:
     """
     优先 *content_list.json（更适合喂模型做结构化总结）
     其次 *model.json
     否则第一个 json
     """
-    with zipfile.ZipFile(zip_path, "r") as zf:
-        names = [n for n in zf.namelist() if n.lower().endswith(".json")]
-        if not names:
-            raise RuntimeError(f"no .json in zip: {zip_path}")
+    names = [n for n in names if n.lower().endswith(".json")]
+    prefer = [n for n in names if n.lower().endswith("content_list.json")]
+    if not prefer:
+        prefer = [n for n in names if n.lower().endswith("model.json")]
+    cand = sorted(prefer or names, key=lambda s: (s.count("/"), len(s)))
+    return cand[0] if cand else None
 
-        prefer = [n for n in names if n.lower().endswith("content_list.json")]
-        if not prefer:
-            prefer = [n for n in names if n.lower().endswith("model.json")]
-
-        cand = prefer or names
-        cand.sort(key=lambda s: (s.count("/"), len(s)))
-        name = cand[0]
-        text = zf.read(name).decode("utf-8", errors="replace")
 
+def _parse_json_text(text: str) -> Any:
     try:
-        return name, json.loads(text)
+        return json.loads(text)
     except Exception:
-        return name, text
+        return text
+
+
+def _safe_rel(name: str, base: str) -> str | None:
+    """zip 条目相对 base 的规范化路径；绝对路径或跳出 base（../）的返回 None"""
+    if name.startswith("/"):
+        return None
+    rel = posixpath.normpath(posixpath.relpath(name, base) if base else name)
+    if posixpath.isabs(rel) or rel == ".." or rel.startswith("../"):
+        return None
+    return rel
+
+
+_IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp")
+
+
+@dataclass
+class ZipOutputs:
+    md_text: str
+    json_obj: Any
+    images: dict[str, bytes]   # 相对 md 所在目录的路径（md 里引用的 images/xxx.jpg）-> 内容
+
+
+def read_zip_outputs(src: Any, *, with_images: bool = False) -> ZipOutputs:
+    """
+    只打开一次 zip（路径或已 seek(0) 的文件对象），取出 md、首选 json，以及（可选）md 引用的图片；
+    md 选路径最浅、名字最短的，json 优先 *content_list.json。图片路径规范化后不能跳出 md 所在目录。
+    """
+    with zipfile.ZipFile(src, "r") as zf:
+        names = zf.namelist()
+        md = _md_name(names)
+        js = _json_name(names)
+        if not md:
+            raise RuntimeError("no .md in zip")
+        if not js:
+            raise RuntimeError("no .json in zip")
+        md_text = zf.read(md).decode("utf-8", errors="replace")
+        obj = _parse_json_text(zf.read(js).decode("utf-8", errors="replace"))
+        images: dict[str, bytes] = {}
+        if with_images:
+            base = posixpath.dirname(md)
+            for n in names:
+                if not n.lower().endswith(_IMAGE_EXTS):
+                    continue
+                rel = _safe_rel(n, base)
+                if rel is None:
+                    continue
+                images[rel] = zf.read(n)
+    return ZipOutputs(md_text, obj, images)
 
 
 # -----------------------------
@@ -83,10 +125,230 @@ class BatchApplyResult:
     file_urls: list[str]
 
 
+@dataclass
+class _InFlight:
+    """已上传、正在 MinerU 那边解析的一个批次"""
+    batch_id: str
+    pdfs: list[Path]
+    deadline: float
+    handed: set[str] = field(default_factory=set)   # 已交出去处理的 data_id（= pdf stem）
+    submitted: float = field(default_factory=time.time)
+    interval: AdaptiveInterval | None = None
+    next_poll: float = 0.0
+    signature: tuple = ()
+    started: dict[str, float] = field(default_factory=dict)   # stem -> 第一次看到 running/done 的时间
+    pages: dict[str, tuple[int, int]] = field(default_factory=dict)   # stem -> (extracted_pages, total_pages)
+    reattached: bool = False   # 从 MinerUJournal 找回的批次（不占提交线程的空位）
+    failures: int = 0          # 连续轮询失败次数
+
+    def observe(self, items: list[dict[str, Any]], stats: PollStats, now: float) -> bool:
+        """用一次轮询结果更新排队/页数统计；返回是否有进展"""
+        for it in items:
+            stem = _item_stem(it)
+            st = str(it.get("state") or "").lower()
+            prog = it.get("extract_progress") or {}
+            if prog.get("total_pages"):
+                self.pages[stem] = (int(prog.get("extracted_pages") or 0), int(prog["total_pages"]))
+            if st in ("running", "done", "failed") and stem not in self.started:
+                self.started[stem] = now
+                stats.queued_files += 1
+                stats.queue_sec += now - self.submitted
+                if stats.first_running is None:
+                    stats.first_running = now
+        sig = _progress_signature(items)
+        changed = sig != self.signature
+        self.signature = sig
+        return changed
+
+    def remaining_pages(self, items: list[dict[str, Any]], avg_pages: float) -> float:
+        left = 0.0
+        for it in items:
+            st = str(it.get("state") or "").lower()
+            if st in ("done", "failed"):
+                continue
+            stem = _item_stem(it)
+            done_pages, total = self.pages.get(stem, (0, 0))
+            left += (total - done_pages) if total else avg_pages
+        return left + avg_pages * max(0, len(self.pdfs) - len(items))
+
+
+def _item_stem(it: dict[str, Any]) -> str:
+    return str(it.get("data_id") or Path(str(it.get("file_name") or "")).stem)
+
+
+def new_finished_items(batch: _InFlight, items: list[dict[str, Any]]) -> list[tuple[Path, dict[str, Any]]]:
+    """本次轮询里新变成 done/failed 的 (pdf, 结果条目)，按 data_id / file_name 对回本地文件"""
+    by_stem = {p.stem: p for p in batch.pdfs}
+    by_name = {p.name: p for p in batch.pdfs}
+    out = []
+    for it in items:
+        if str(it.get("state") or "").lower() not in ("done", "failed"):
+            continue
+        p = by_stem.get(str(it.get("data_id") or "")) or by_name.get(str(it.get("file_name") or ""))
+        if p is None or p.stem in batch.handed:
+            continue
+        batch.handed.add(p.stem)
+        out.append((p, it))
+    return out
+
+
+@dataclass
+class JournalBatch:
+    """日志里回放出的一个批次"""
+    batch_id: str
+    applied_at: float
+    files: dict[str, str] = field(default_factory=dict)       # data_id -> 文件名
+    uploaded: set[str] = field(default_factory=set)
+    results: dict[str, dict[str, Any]] = field(default_factory=dict)   # data_id -> {state, full_zip_url, err_msg}
+    written: set[str] = field(default_factory=set)
+    closed: bool = False
+
+    def pending(self) -> list[str]:
+        """已上传（已付费）、还没写出结果、也没解析失败的 data_id"""
+        return [d for d in self.files if d in self.uploaded and d not in self.written
+                and (self.results.get(d) or {}).get("state") != "failed"]
+
+
+class MinerUJournal:
+    """
+    MinerU 批次的持久日志（JSONL，只追加）：申请到 batch_id、每个文件上传完、每个文件出结果（含 zip 地址）、
+    结果写盘、批次收尾各追加一行。进程在上传后、下载结果前被杀掉时，下一次 run_local_batch 从日志里找回
+    还没收尾的批次继续轮询/下载，已上传的文件不再重新上传（MinerU 按上传计费）。
+    崩溃时最多丢掉最后一行没写完的记录；所有批次都收尾后日志删除。
+    """
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.batches: dict[str, JournalBatch] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # 崩溃时写了一半的最后一行
+                self._apply(rec)
+
+    def _apply(self, rec: dict[str, Any]) -> None:
+        ev, bid = rec.get("ev"), str(rec.get("batch_id") or "")
+        if ev == "apply":
+            self.batches[bid] = JournalBatch(bid, float(rec.get("t") or 0.0),
+                                             {str(f["data_id"]): str(f.get("name") or "") for f in rec.get("files") or []})
+            return
+        b = self.batches.get(bid)
+        if b is None:
+            return
+        if ev == "upload":
+            b.uploaded.add(str(rec["data_id"]))
+        elif ev == "result":
+            b.results[str(rec["data_id"])] = {k: rec.get(k) for k in ("state", "full_zip_url", "err_msg")}
+        elif ev == "written":
+            b.written.add(str(rec["data_id"]))
+        elif ev == "close":
+            b.closed = True
+
+    def _append(self, rec: dict[str, Any]) -> None:
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._apply(rec)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+
+    def record_apply(self, batch_id: str, files: list[dict[str, Any]]) -> None:
+        self._append({"ev": "apply", "batch_id": batch_id, "t": time.time(),
+                      "files": [{"data_id": f.get("data_id"), "name": f.get("name")} for f in files]})
+
+    def record_upload(self, batch_id: str, data_id: str) -> None:
+        self._append({"ev": "upload", "batch_id": batch_id, "data_id": data_id})
+
+    def record_results(self, batch_id: str, items: list[dict[str, Any]]) -> None:
+        """done/failed 的结果条目（每个文件只在状态或地址变化时记一次）"""
+        b = self.batches.get(batch_id)
+        if b is None:
+            return
+        for it in items:
+            st = str(it.get("state") or "").lower()
+            did = str(it.get("data_id") or Path(str(it.get("file_name") or "")).stem)
+            if st not in ("done", "failed") or did not in b.files:
+                continue
+            old = b.results.get(did) or {}
+            if old.get("state") == st and old.get("full_zip_url") == it.get("full_zip_url"):
+                continue
+            self._append({"ev": "result", "batch_id": batch_id, "data_id": did, "state": st,
+                          "full_zip_url": it.get("full_zip_url"), "err_msg": it.get("err_msg")})
+
+    def record_written(self, batch_id: str, data_id: str) -> None:
+        self._append({"ev": "written", "batch_id": batch_id, "data_id": data_id})
+
+    def close(self, batch_id: str) -> None:
+        self._append({"ev": "close", "batch_id": batch_id})
+
+    def unfinished(self) -> list[JournalBatch]:
+        with self._lock:
+            return [b for b in self.batches.values() if not b.closed]
+
+    def finish(self) -> None:
+        """所有批次都已收尾时删除日志"""
+        with self._lock:
+            if all(b.closed for b in self.batches.values()):
+                self.path.unlink(missing_ok=True)
+                self.batches.clear()
+
+
+def open_mineru_journal(journal_dir: str | Path, date_dir: str, max_age_days: float = 7) -> MinerUJournal:
+    """<journal_dir>/<date_dir>.jsonl（与 md/json 输出同一个日期目录）；顺带删掉太久没续跑的旧日志"""
+    root = ensure_dir(journal_dir)
+    cutoff = time.time() - max_age_days * 86400
+    for p in root.glob("*.jsonl"):
+        try:
+            if p.stat().st_mtime < cutoff:
+                p.unlink()
+        except OSError:
+            continue
+    return MinerUJournal(root / f"{date_dir}.jsonl")
+
+
+# 同一批次连续这么多次轮询失败就当作超时放弃（过期 token、批次查不到等，不再无限重试）
+_MAX_POLL_FAILURES = 10
+
+# 查询批次结果时表示“任务/批次不存在”的业务错误码（过期或被清理）
+_NOT_FOUND_CODES = {-60012}
+
+
+class MinerUAPIError(RuntimeError):
+    """接口返回 code != 0"""
+    def __init__(self, data: dict[str, Any]) -> None:
+        super().__init__(f"MinerU API error: {data}")
+        self.code = data.get("code")
+
+
+def batch_not_found(exc: Exception) -> bool:
+    """只有明确的“不存在”（404 或不存在的业务错误码）才算批次没了；429、401/403、5xx 等都当作暂时错误退避重试"""
+    if isinstance(exc, MinerUAPIError):
+        return exc.code in _NOT_FOUND_CODES
+    if isinstance(exc, requests.HTTPError):
+        return exc.response is not None and exc.response.status_code == 404
+    return False
+
+
 class MinerUClient:
-    def __init__(self, base_url: str, token: str, *, timeout: tuple[int, int] = (20, 120)) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        *,
+        timeout: tuple[int, int] = (20, 120),
+        journal: MinerUJournal | None = None,
+    ) -> None:
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
+        self.journal = journal
         self.session = requests.Session()
         self.session.headers.update(
             {
@@ -102,7 +364,7 @@ class MinerUClient:
         r.raise_for_status()
         data = r.json()
         if data.get("code") != 0:
-            raise RuntimeError(f"MinerU API error: {data}")
+            raise MinerUAPIError(data)
         return data
 
     def _get(self, path: str) -> dict[str, Any]:
@@ -111,7 +373,7 @@ class MinerUClient:
         r.raise_for_status()
         data = r.json()
         if data.get("code") != 0:
-            raise RuntimeError(f"MinerU API error: {data}")
+            raise MinerUAPIError(data)
         return data
 
     # doc: POST /api/v4/file-urls/batch  :contentReference[oaicite:4]{index=4}
@@ -124,11 +386,25 @@ class MinerUClient:
         urls = out.get("file_urls") or []
         if not batch_id or not isinstance(urls, list) or not urls:
             raise RuntimeError(f"unexpected apply response: {data}")
+        if self.journal is not None:
+            # 上传前先落盘：之后任何时刻被杀掉，下次都能凭 batch_id 找回
+            self.journal.record_apply(batch_id, files)
         return BatchApplyResult(batch_id=batch_id, file_urls=[str(u) for u in urls])
 
     # doc: GET /api/v4/extract-results/batch/{batch_id} :contentReference[oaicite:5]{index=5}
     def get_batch_results(self, batch_id: str) -> dict[str, Any]:
-        return self._get(f"/api/v4/extract-results/batch/{batch_id}")
+        resp = self._get(f"/api/v4/extract-results/batch/{batch_id}")
+        if self.journal is not None:
+            self.journal.record_results(batch_id, batch_progress(resp)[0])
+        return resp
+
+    def mark_uploaded(self, batch_id: str, data_id: str) -> None:
+        if self.journal is not None:
+            self.journal.record_upload(batch_id, data_id)
+
+    def mark_written(self, batch_id: str, data_id: str) -> None:
+        if self.journal is not None:
+            self.journal.record_written(batch_id, data_id)
 
 
 def upload_to_presigned_url(
@@ -155,63 +431,138 @@ def upload_to_presigned_url(
     raise RuntimeError(f"upload failed: {file_path.name}. last_exc={last_exc!r}")
 
 
-def wait_batch_done(
-    client: MinerUClient,
-    batch_id: str,
+class AdaptiveInterval:
+    """
+    单个批次的轮询间隔：状态一有变化就回到 min_sec；没变化时按 factor 指数退避，
+    还在排队（没有 running）时最长 max_sec，已有文件在解析时最长 active_max_sec（快完成时反应更快）。
+    """
+    def __init__(self, min_sec: float, max_sec: float, active_max_sec: float | None = None, factor: float = 1.6) -> None:
+        self.min_sec = max(0.05, float(min_sec))
+        self.max_sec = max(self.min_sec, float(max_sec))
+        self.active_max_sec = max(self.min_sec, float(active_max_sec if active_max_sec is not None else 2 * self.min_sec))
+        self.factor = factor
+        self.interval = self.min_sec
+
+    def next(self, changed: bool, active: bool) -> float:
+        if changed:
+            self.interval = self.min_sec
+        else:
+            self.interval = min(self.interval * self.factor, self.active_max_sec if active else self.max_sec)
+        return self.interval
+
+
+@dataclass
+class PollStats:
+    """MinerU 轮询/解析统计（run_local_batch 的返回值，app2 打印）"""
+    polls: int = 0
+    files_done: int = 0
+    files_failed: int = 0
+    queued_files: int = 0          # 观察到开始解析的文件数
+    queue_sec: float = 0.0         # 累计排队时间：上传完 → 第一次看到 running（或直接 done）
+    pages_done: int = 0            # 已解析完的页数（running 时见过 total_pages 的文件）
+    first_running: float | None = None
+    last_done: float | None = None
+    eta_sec: float | None = None   # 在途批次全部解析完的估计剩余时间
+
+    @property
+    def avg_queue_sec(self) -> float:
+        return self.queue_sec / self.queued_files if self.queued_files else 0.0
+
+    @property
+    def sec_per_page(self) -> float | None:
+        """整体吞吐折算的每页耗时（墙钟，含并行）"""
+        if not self.pages_done or self.first_running is None or self.last_done is None:
+            return None
+        return max(0.0, self.last_done - self.first_running) / self.pages_done
+
+    @property
+    def avg_pages(self) -> float | None:
+        return self.pages_done / self.files_done if self.files_done and self.pages_done else None
+
+    def __str__(self) -> str:
+        spp = self.sec_per_page
+        eta = f"{self.eta_sec:.0f}s" if self.eta_sec is not None else "?"
+        return (f"done={self.files_done} failed={self.files_failed} polls={self.polls} "
+                f"queue={self.avg_queue_sec:.1f}s/file "
+                f"parse={f'{spp:.2f}s/page' if spp is not None else '?'} eta={eta}")
+
+
+def _progress_signature(items: list[dict[str, Any]]) -> tuple:
+    """状态与已解析页数；两次轮询的签名不同 = 有进展"""
+    return tuple(sorted(
+        (str(it.get("data_id") or it.get("file_name") or ""), str(it.get("state") or ""),
+         int((it.get("extract_progress") or {}).get("extracted_pages") or 0))
+        for it in items
+    ))
+
+
+def batch_progress(resp: dict[str, Any]) -> tuple[list[dict[str, Any]], dict[str, int], int]:
+    """get_batch_results 的返回 -> (结果条目, 各状态计数, done+failed 数)"""
+    data = resp.get("data") or {}
+    items = data.get("extract_result") or []
+    if not isinstance(items, list):
+        items = []
+    items = [it for it in items if isinstance(it, dict)]
+    states: dict[str, int] = {}
+    done_or_failed = 0
+    for it in items:
+        st = str(it.get("state") or "unknown").lower()
+        states[st] = states.get(st, 0) + 1
+        if st in ("done", "failed"):
+            done_or_failed += 1
+    return items, states, done_or_failed
+
+
+def zip_session(pool_size: int) -> requests.Session:
+    """下载结果 zip 用的共享 Session：连接池大小与下载并发一致，多个线程复用 keep-alive 连接"""
+    sess = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    sess.mount("https://", adapter)
+    sess.mount("http://", adapter)
+    return sess
+
+
+def download_zip_buffer(
+    zip_url: str,
+    token: str,
     *,
-    expected_total: int,
-    timeout_sec: int = 900,
-    poll_sec: int = 3,
-) -> list[dict[str, Any]]:
-    deadline = time.time() + timeout_sec
-    last: dict[str, Any] | None = None
-
-    while time.time() < deadline:
-        last = client.get_batch_results(batch_id)
-        data = last.get("data") or {}
-        items = data.get("extract_result") or []
-        if not isinstance(items, list):
-            items = []
-
-        states: dict[str, int] = {}
-        done_or_failed = 0
-        for it in items:
-            if not isinstance(it, dict):
-                continue
-            st = str(it.get("state") or "unknown").lower()
-            states[st] = states.get(st, 0) + 1
-            if st in ("done", "failed"):
-                done_or_failed += 1
-
-        print(f"\r[parse] {done_or_failed}/{expected_total} {states}", end="", flush=True)
-
-        if expected_total > 0 and done_or_failed >= expected_total:
-            print()
-            return [it for it in items if isinstance(it, dict)]
-
-        time.sleep(poll_sec)
-
-    raise TimeoutError(f"batch not finished in time. last={last}")
-
-
-def download_zip(zip_url: str, token: str, dest: Path, *, max_retries: int = 6) -> None:
+    session: requests.Session | None = None,
+    max_retries: int = 6,
+    spool_max: int = 64 * 1024 * 1024,
+    spool_dir: Path | None = None,
+) -> IO[bytes]:
+    """
+    下载到 SpooledTemporaryFile 并 seek(0) 返回：不超过 spool_max 时整份在内存里，
+    更大的才落到 spool_dir 下的临时文件（关闭即删除）。调用方负责 close。
+    """
     last_exc: Exception | None = None
     headers = {"Authorization": f"Bearer {token}"}
+    http = session or requests
     for attempt in range(1, max_retries + 1):
+        buf = tempfile.SpooledTemporaryFile(max_size=spool_max, dir=spool_dir)
         try:
-            with requests.get(zip_url, headers=headers, stream=True, timeout=(30, 900)) as r:
+            with http.get(zip_url, headers=headers, stream=True, timeout=(30, 900)) as r:
                 r.raise_for_status()
-                with dest.open("wb") as f:
-                    for chunk in r.iter_content(chunk_size=1024 * 128):
-                        if chunk:
-                            f.write(chunk)
-            return
+                for chunk in r.iter_content(chunk_size=1024 * 128):
+                    if chunk:
+                        buf.write(chunk)
+            buf.seek(0)
+            return buf
         except Exception as e:
+            buf.close()
             last_exc = e
             backoff_sleep(attempt)
     raise RuntimeError(f"download zip failed. last_exc={last_exc!r}")
 
 
+def _write_file(path: Path, data: str | bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(data, bytes):
+        path.write_bytes(data)
+    else:
+        path.write_text(data, encoding="utf-8")
+
+
 def run_local_batch(
     *,
     pdfs: list[Path],
@@ -236,7 +587,12 @@ def run_local_batch(
      limit_files: int = 0,
      on_json: Callable[[Path], None] | None = None,
      skip_existing: bool = False,
-) -> None:
+     max_inflight: int = 3,
+     download_concurrency: int = 4,
+     save_images: bool = False,
+     max_poll_sec: int = 30,
+     journal_dir: Path | None = None,
+) -> PollStats:
     if limit_files and limit_files > 0:
         pdfs = pdfs[:limit_files]
     date_dir = today_str()
@@ -244,7 +600,9 @@ def run_local_batch(
     out_json_dir = ensure_dir(out_json_root / date_dir)
     tmp_zip_dir = ensure_dir(out_md_dir / "_tmp_zip")
 
-    client = MinerUClient(base_url, token)
+    # 批次日志：申请到的 batch_id / 上传 / 结果地址落盘，进程被杀后下次运行找回已付费的批次
+    journal = open_mineru_journal(journal_dir, date_dir) if journal_dir else None
+    client = MinerUClient(base_url, token, journal=journal)
 
     # --- build request body (doc-aligned) ---
     # files: [{"name": "...pdf", "data_id": "...", "page_ranges": "...", "is_ocr": ...}, ...] :contentReference[oaicite:8]{index=8}
@@ -278,95 +636,257 @@ def run_local_batch(
                 continue
             _filtered.append(p)
         pdfs = _filtered
-    for pdf_chunk in chunks(pdfs, max(1, batch_size)):
-        # 对齐 chunk 的 files payload
-        chunk_payload = []
-        for p in pdf_chunk:
-            one = {"name": p.name, "data_id": p.stem}
-            if page_ranges:
-                one["page_ranges"] = page_ranges
-            if model_version == "pipeline":
-                one["is_ocr"] = bool(is_ocr)
-            chunk_payload.append(one)
-
-        applied = client.apply_upload_urls(chunk_payload, model_version=model_version, extra=extra)
-
-        total = len(pdf_chunk)
-        done = 0
-        def _one(idx: int) -> None:
-            upload_to_presigned_url(pdf_chunk[idx], applied.file_urls[idx], max_retries=upload_retries)
-        with ThreadPoolExecutor(max_workers=max(1, upload_concurrency)) as ex:
-            futs = [ex.submit(_one, i) for i in range(total)]
-            for _ in as_completed(futs):
-                done += 1
-                print(f"\r[upload] {done}/{total}", end="", flush=True)
-        print()
-
-        # 2) poll
-        results = wait_batch_done(
-            client,
-            applied.batch_id,
-            expected_total=len(pdf_chunk),
-            timeout_sec=timeout_sec,
-            poll_sec=poll_sec,
-        )
-
-        # 3) download + extract
-        # 用 file_name / data_id 来匹配
-        by_name = {str(it.get("file_name") or ""): it for it in results}
-        by_dataid = {str(it.get("data_id") or ""): it for it in results}
-
-        wrote = 0
-        total_write = len(pdf_chunk)
-        for p in pdf_chunk:
-            it = by_dataid.get(p.stem) or by_name.get(p.name)
-            if not it:
-                print(f"[skip] no result item for {p.name}")
-                continue
-
-            state = str(it.get("state") or "").lower()
-            if state != "done":
-                print(f"[skip] {p.name} state={state} err={it.get('err_msg')}")
-                continue
 
-            zip_url = it.get("full_zip_url")
-            if not zip_url:
-                print(f"[skip] {p.name} has no full_zip_url")
+    # 上次运行已上传、还没拿到结果的文件：接回原来的批次继续轮询，不再重新上传
+    reattach: list[_InFlight] = []
+    if journal is not None:
+        by_stem = {p.stem: p for p in pdfs}
+        for jb in journal.unfinished():
+            mine = [by_stem[d] for d in jb.pending() if d in by_stem]
+            if not mine:
+                journal.close(jb.batch_id)   # 没上传完的文件照常重新提交；本次用不到的批次直接收尾
                 continue
+            reattach.append(_InFlight(jb.batch_id, mine, time.time() + timeout_sec, reattached=True))
+            print(f"[resume] batch {jb.batch_id}: {len(mine)} files uploaded by an earlier run")
+        taken = {p.stem for b in reattach for p in b.pdfs}
+        pdfs = [p for p in pdfs if p.stem not in taken]
+    # 流水线：最多 max_inflight 个批次同时在 MinerU 那边解析。
+    # 提交线程按顺序为各 chunk 申请上传地址并上传（有空位才提交下一批，第 N 批解析时第 N+1 批已在上传），
+    # 主线程轮询所有在途批次，每个文件一变成 done 就交给结果线程下载解压、回调 on_json，
+    # 不必等同批次里最慢的那篇，也不必等前面的批次。
+    submit_client = MinerUClient(base_url, token, journal=journal)   # requests.Session 不跨线程共用
+    slots = threading.BoundedSemaphore(max(1, max_inflight))
+    upload_pool = ThreadPoolExecutor(max_workers=max(1, upload_concurrency))
+    print_lock = threading.Lock()
+
+    stop = threading.Event()   # 主循环退出（含异常 / Ctrl-C）时置位，让等空位的提交线程放弃
+
+    def _submit(pdf_chunk: list[Path]) -> _InFlight:
+        while not slots.acquire(timeout=0.5):
+            if stop.is_set():
+                raise CancelledError("run_local_batch stopped")
+        try:
+            chunk_payload = []
+            for p in pdf_chunk:
+                one = {"name": p.name, "data_id": p.stem}
+                if page_ranges:
+                    one["page_ranges"] = page_ranges
+                if model_version == "pipeline":
+                    one["is_ocr"] = bool(is_ocr)
+                chunk_payload.append(one)
+
+            applied = submit_client.apply_upload_urls(chunk_payload, model_version=model_version, extra=extra)
+            futs = [upload_pool.submit(upload_to_presigned_url, p, u, max_retries=upload_retries)
+                    for p, u in zip(pdf_chunk, applied.file_urls)]
+            for p, f in zip(pdf_chunk, futs):
+                f.result()
+                submit_client.mark_uploaded(applied.batch_id, p.stem)
+            with print_lock:
+                print(f"[upload] batch {applied.batch_id}: {len(pdf_chunk)} files")
+            return _InFlight(applied.batch_id, pdf_chunk, time.time() + timeout_sec)
+        except Exception:
+            slots.release()
+            raise
+
+    wrote_lock = threading.Lock()
+    wrote = 0
+    # 结果 zip：download_concurrency 个线程共用一个带连接池的 Session 并发下载，
+    # 下到内存（过大才落盘），一次打开取出 md/json/图片，写盘走有界的线程池
+    dl_workers = max(1, download_concurrency)
+    dl_session = zip_session(dl_workers)
+    io_pool = ThreadPoolExecutor(max_workers=max(2, dl_workers), thread_name_prefix="write")
+
+    def _collect_one(p: Path, it: dict[str, Any], batch_id: str) -> bool:
+        # 3) download + extract（单个文件：批次里其余文件还在解析）
+        nonlocal wrote
+        state = str(it.get("state") or "").lower()
+        if state != "done":
+            print(f"[skip] {p.name} state={state} err={it.get('err_msg')}")
+            return False
+
+        zip_url = it.get("full_zip_url")
+        if not zip_url:
+            print(f"[skip] {p.name} has no full_zip_url")
+            return False
 
-            zip_path = tmp_zip_dir / f"{p.stem}.zip"
-            download_zip(zip_url, token, zip_path)
-
-            # md
-            _, md_text = pick_first_md(zip_path)
-            (out_md_dir / f"{p.stem}.md").write_text(md_text, encoding="utf-8")
-
-            # json
-            _, obj = pick_preferred_json(zip_path)
-            if isinstance(obj, str):
-                (out_json_dir / f"{p.stem}.json").write_text(obj, encoding="utf-8")
-            else:
-                (out_json_dir / f"{p.stem}.json").write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
-            if on_json:
-                try:
-                    on_json(out_json_dir / f"{p.stem}.json")
-                except Exception:
-                    pass
+        try:
+            buf = download_zip_buffer(zip_url, token, session=dl_session, spool_dir=tmp_zip_dir)
+            try:
+                if keep_zip:
+                    with (tmp_zip_dir / f"{p.stem}.zip").open("wb") as f:
+                        shutil.copyfileobj(buf, f)
+                    buf.seek(0)
+                res = read_zip_outputs(buf, with_images=save_images)
+            finally:
+                buf.close()
+
+            # md / json / 图片交给写盘线程池并行写，写完再回调
+            obj = res.json_obj
+            json_text = obj if isinstance(obj, str) else json.dumps(obj, ensure_ascii=False, indent=2)
+            writes = [
+                io_pool.submit(_write_file, out_md_dir / f"{p.stem}.md", res.md_text),
+                io_pool.submit(_write_file, out_json_dir / f"{p.stem}.json", json_text),
+            ]
+            md_root = out_md_dir.resolve()
+            for rel, data in res.images.items():
+                dst = out_md_dir / rel
+                if md_root not in dst.resolve().parents:
+                    print(f"[skip] {p.name} image outside md dir: {rel}")
+                    continue
+                writes.append(io_pool.submit(_write_file, dst, data))
+            for w in writes:
+                w.result()
+        except Exception as e:
+            print(f"[skip] {p.name} result: {e}")
+            return False
+        client.mark_written(batch_id, p.stem)
+        if on_json:
+            try:
+                on_json(out_json_dir / f"{p.stem}.json")
+            except Exception:
+                pass
+        with wrote_lock:
             wrote += 1
-            print(f"\r[write] {wrote}/{total_write}", end="", flush=True)
-
-            if not keep_zip:
-                try:
-                    zip_path.unlink(missing_ok=True)
-                except Exception:
-                    pass
-            print()
+        return True
+
+    stats = PollStats()
+    inflight: list[_InFlight] = []
+    for b in reattach:
+        b.interval = AdaptiveInterval(poll_sec, max_poll_sec)
+        inflight.append(b)   # next_poll=0：马上轮询一次
+    collecting = []
+    closed: list[str] = []   # 已收尾的 batch_id（结果都交出去后在日志里记 close）
+    total_files = len(pdfs) + sum(len(b.pdfs) for b in reattach)
+    remaining: dict[str, float] = {}   # batch_id -> 估计剩余页数
+    with ThreadPoolExecutor(max_workers=1) as submitter, ThreadPoolExecutor(max_workers=dl_workers) as collector:
+        pending = [submitter.submit(_submit, c) for c in chunks(pdfs, max(1, batch_size))]
+        try:
+            finished_files = 0
+            last_line = ""
+
+            def _drop_reattached(b: _InFlight, err: Exception) -> None:
+                # 找回的批次在 MinerU 那边已查不到（过期 / 被清理）：日志里有 zip 地址的直接下载，其余重新提交
+                inflight.remove(b)
+                closed.append(b.batch_id)
+                known = journal.batches[b.batch_id].results if journal is not None else {}
+                redo = []
+                for p in b.pdfs:
+                    res = known.get(p.stem) or {}
+                    if res.get("state") == "done" and res.get("full_zip_url"):
+                        b.handed.add(p.stem)
+                        collecting.append(collector.submit(_collect_one, p, res, b.batch_id))
+                    else:
+                        redo.append(p)
+                print(f"[WARN] resumed batch {b.batch_id} is gone ({err!r}): "
+                      f"{len(b.pdfs) - len(redo)} from saved result urls, {len(redo)} re-submitted")
+                if redo:
+                    pending.append(submitter.submit(_submit, redo))
+
+            def _retire(b: _InFlight, finished: bool, why: str = "") -> None:
+                # 批次出队：正常完成的在日志里收尾；超时/轮询一直失败的留在日志里，下次运行接着找回（已上传已付费）
+                nonlocal finished_files
+                inflight.remove(b)
+                if finished:
+                    closed.append(b.batch_id)
+                remaining.pop(b.batch_id, None)
+                if not b.reattached:
+                    slots.release()
+                rest = [p for p in b.pdfs if p.stem not in b.handed]
+                finished_files += len(rest)
+                if not finished:
+                    print(f"[WARN] batch {b.batch_id} {why}; {len(rest)} files left for the next run")
+                for p in rest:
+                    print(f"[skip] no result item for {p.name}")
+
+            while pending or inflight:
+                for f in [f for f in pending if f.done()]:
+                    pending.remove(f)
+                    try:
+                        b = f.result()
+                    except Exception as e:
+                        print(f"[WARN] batch submit failed: {e!r}")
+                        continue
+                    b.interval = AdaptiveInterval(poll_sec, max_poll_sec)
+                    b.next_poll = b.submitted + b.interval.min_sec
+                    inflight.append(b)
+
+                # 2) poll：一个线程轮询所有在途批次，每个批次按自己的自适应间隔；新到 done/failed 的文件立刻交给结果线程
+                for b in list(inflight):
+                    now = time.time()
+                    if now < b.next_poll:
+                        continue
+                    try:
+                        items, states, done_or_failed = batch_progress(client.get_batch_results(b.batch_id))
+                    except Exception as e:
+                        if b.reattached and batch_not_found(e):
+                            _drop_reattached(b, e)
+                            continue
+                        b.failures += 1
+                        print(f"[WARN] poll {b.batch_id} ({b.failures}/{_MAX_POLL_FAILURES}): {e!r}")
+                        if now > b.deadline or b.failures >= _MAX_POLL_FAILURES:
+                            _retire(b, False, f"gave up after {b.failures} failed polls: {e!r}")
+                            continue
+                        b.next_poll = now + b.interval.next(False, False)
+                        continue
+                    b.failures = 0
+                    # 找回的批次里 b.pdfs 只有还没写出结果的文件：只按这些文件统计进度
+                    wanted = {p.stem for p in b.pdfs}
+                    items = [it for it in items if _item_stem(it) in wanted]
+                    _, states, done_or_failed = batch_progress({"data": {"extract_result": items}})
+                    stats.polls += 1
+                    changed = b.observe(items, stats, now)
+                    for p, it in new_finished_items(b, items):
+                        finished_files += 1
+                        if str(it.get("state") or "").lower() == "done":
+                            stats.files_done += 1
+                            stats.pages_done += b.pages.get(p.stem, (0, 0))[1]
+                            stats.last_done = now
+                        else:
+                            stats.files_failed += 1
+                        collecting.append(collector.submit(_collect_one, p, it, b.batch_id))
+                    if done_or_failed >= len(b.pdfs):
+                        _retire(b, True)
+                        continue
+                    if now > b.deadline:
+                        _retire(b, False, f"not finished in {timeout_sec}s: {states}")
+                        continue
+                    remaining[b.batch_id] = b.remaining_pages(items, stats.avg_pages or 10.0)
+                    b.next_poll = now + b.interval.next(changed, states.get("running", 0) > 0)
+
+                spp = stats.sec_per_page
+                stats.eta_sec = sum(remaining.values()) * spp if (spp is not None and inflight) else None
+                eta = f" eta≈{stats.eta_sec:.0f}s" if stats.eta_sec is not None else ""
+                line = f"[parse] in flight={len(inflight)} finished={finished_files}/{total_files} written={wrote}{eta}"
+                if line != last_line:
+                    with print_lock:
+                        print(line)
+                    last_line = line
+                if pending or inflight:
+                    wait = min((b.next_poll for b in inflight), default=time.time() + 0.2) - time.time()
+                    time.sleep(min(max(0.0, wait), 0.2) if pending else max(0.0, wait))
+            for f in collecting:
+                f.result()
+        finally:
+            # 正常结束时都已完成；异常退出时别让 with 的 shutdown(wait=True) 等着没提交的批次
+            stop.set()
+            for f in pending + collecting:
+                f.cancel()
+    if journal is not None:
+        # 只有正常完成的批次收尾；超时的留着给下次运行找回（过期的由 open_mineru_journal 按天数清理），全部收尾后删日志
+        for bid in closed:
+            journal.close(bid)
+        journal.finish()
+    print(f"[write] {wrote}/{total_files}")
+    upload_pool.shutdown(wait=True)
+    io_pool.shutdown(wait=True)
+    dl_session.close()
 
     if not keep_zip:
         try:
             tmp_zip_dir.rmdir()
         except Exception:
             pass
+    return stats
 
 def main() -> None:
     pa = argparse.ArgumentParser("pdf2md (MinerU local batch)")
@@ -379,12 +899,18 @@ def main() -> None:
 
     pa.add_argument("--model-version", default=os.environ.get("MINERU_MODEL_VERSION", "vlm"), choices=["vlm", "pipeline"])
     pa.add_argument("--timeout-sec", type=int, default=900)
-    pa.add_argument("--poll-sec", type=int, default=3)
+    pa.add_argument("--poll-sec", type=int, default=3, help="最短轮询间隔（状态有变化时）")
+    pa.add_argument("--max-poll-sec", type=int, default=30, help="排队无变化时退避到的最长轮询间隔")
     pa.add_argument("--upload-retries", type=int, default=6)
     pa.add_argument("--keep-zip", action="store_true")
     pa.add_argument("--batch-size", type=int, default=10)
     pa.add_argument("--upload-concurrency", type=int, default=10)
+    pa.add_argument("--max-inflight", type=int, default=3, help="同时在 MinerU 解析的批次数")
+    pa.add_argument("--download-concurrency", type=int, default=4, help="并发下载结果 zip 的线程数")
+    pa.add_argument("--save-images", action="store_true", help="把 md 引用的图片一并写到 md 目录")
     pa.add_argument("--limit-files", type=int, default=0)
+    pa.add_argument("--journal-dir", default=str(Path("data") / "mineru_journal"),
+                    help="批次日志目录（被杀掉后下次接回已上传的批次）；传空串关闭")
 
     # pipeline only (文档：仅 pipeline 有效) :contentReference[oaicite:11]{index=11}
     pa.add_argument("--is-ocr", action="store_true", help="pipeline: 启用 OCR")
@@ -416,7 +942,7 @@ def main() -> None:
     enable_formula = True if not args.enable_formula else True
     enable_table = True if not args.enable_table else True
 
-    run_local_batch(
+    stats = run_local_batch(
         pdfs=pdfs,
         out_md_root=Path(args.out_md_root),
         out_json_root=Path(args.out_json_root),
@@ -436,7 +962,13 @@ def main() -> None:
         batch_size=args.batch_size,
         upload_concurrency=args.upload_concurrency,
         limit_files=args.limit_files,
+        max_inflight=args.max_inflight,
+        download_concurrency=args.download_concurrency,
+        save_images=bool(args.save_images),
+        max_poll_sec=args.max_poll_sec,
+        journal_dir=Path(args.journal_dir) if args.journal_dir else None,
     )
+    print(f"[mineru] {stats}")
 
 
 if __name__ == "__main__":
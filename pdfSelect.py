@@ -7,6 +7,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any, List
 
+from pdf_store import link_or_copy
+
 
 def ensure_dir(p: str | Path) -> Path:
     p = Path(p)
@@ -84,7 +86,7 @@ def main() -> None:
         if src_pdf.exists():
             dst_pdf = dst_pdf_dir / src_pdf.name
             if not dst_pdf.exists():
-                shutil.copy2(src_pdf, dst_pdf)
+                link_or_copy(src_pdf, dst_pdf)
             copied_pdf += 1
         src_md = src_md_dir / f"{stem}.md"
         if src_md.exists():
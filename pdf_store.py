@@ -0,0 +1,189 @@
+# pdf_store.py
+"""
+按内容寻址的 PDF 仓库（跨天共用）：
+- 实体文件按 SHA-256 存放：<PDF_STORE_DIR>/objects/ab/abcdef....pdf，同样的字节只存一份；
+- index.sqlite3 记录 arXiv id（带版本号）-> sha256，同一篇论文第二天再出现（更新窗口、按机构直搜）时不再下载；
+- cache_pdfs/<日期>/、dataSelect/pdf/<日期>/ 等目录里的 PDF 都用硬链接“物化”（link_or_copy），
+  USE_HARDLINKS=False、跨盘或文件系统不支持硬链接时退回复制。
+"""
+from __future__ import annotations
+import hashlib, os, shutil, sqlite3, threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from config import PDF_CACHE_DIR, USE_HARDLINKS
+
+try:
+    from config import PDF_STORE_ENABLED
+except Exception:
+    PDF_STORE_ENABLED = True
+try:
+    from config import PDF_STORE_DIR
+except Exception:
+    PDF_STORE_DIR = str(Path(PDF_CACHE_DIR) / "_store")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pdfs (
+    arxiv_id  TEXT PRIMARY KEY,
+    sha256    TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    added_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pdfs_sha ON pdfs (sha256);
+"""
+
+def _tmp_name(p: Path) -> Path:
+    # 同目录、按进程/线程区分的临时名，改名到位前不会被当成完整文件
+    return p.with_name(f"{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+def link_or_copy(src: str | Path, dst: str | Path) -> str:
+    """
+    把 src 放到 dst（已存在则覆盖）；USE_HARDLINKS 时优先硬链接，失败时复制。
+    返回 "link" 或 "copy"。先写临时名再 os.replace，dst 不会出现半个文件。
+    """
+    src, dst = Path(src), Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_name(dst)
+    try:
+        how = "copy"
+        if USE_HARDLINKS:
+            try:
+                os.link(src, tmp)
+                how = "link"
+            except OSError:
+                pass  # 跨盘 / 无权限 / FAT 等
+        if how == "copy":
+            shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        # dst 与 src 已是同一个文件时 rename 什么也不做，临时链接要自己删
+        tmp.unlink(missing_ok=True)
+    return how
+
+def verify_pdf(path: str | Path, expected_size: Optional[int] = None) -> Optional[str]:
+    """
+    粗查文件是否是一份完整的 PDF：大小与 Content-Length 一致、开头有 %PDF-、结尾 1 KiB 内有 %%EOF。
+    正常返回 None，否则返回原因。只读头尾各 1 KiB，对缓存里的每个文件都查一遍也很便宜。
+    """
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return "empty"
+        if expected_size is not None and size != expected_size:
+            return f"size {size} != {expected_size}"
+        with open(path, "rb") as f:
+            head = f.read(1024)
+            f.seek(max(0, size - 1024))
+            tail = f.read()
+    except OSError as e:
+        return str(e)
+    if b"%PDF-" not in head:
+        return "no %PDF- header"
+    if b"%%EOF" not in tail:
+        return "no %%EOF trailer (truncated?)"
+    return None
+
+def file_sha256(path: str | Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class PdfStore:
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.tmp_dir = self.root / "tmp"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def blob_path(self, sha: str) -> Path:
+        return self.objects / sha[:2] / f"{sha}.pdf"
+
+    def part_path(self, name: str) -> Path:
+        """下载中的 .part 文件（与 objects 同盘，入库时只是改名；中断后下次从这里续传）"""
+        return self.tmp_dir / f"{name}.part"
+
+    def lookup(self, arxiv_id: str, verify: bool = False) -> Optional[Path]:
+        """
+        该 id（含版本号）已入库且实体文件还在时返回其路径。
+        verify=True 时顺带用 verify_pdf 检查，坏文件直接删掉并从索引里去掉（返回 None，调用方重新下载）。
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT sha256 FROM pdfs WHERE arxiv_id=?", (arxiv_id,)).fetchone()
+        if row is None:
+            return None
+        blob = self.blob_path(row[0])
+        if not blob.exists():
+            return None
+        if verify:
+            bad = verify_pdf(blob)
+            if bad is not None:
+                print(f"[WARN] PDF 仓库里 {arxiv_id} 已损坏（{bad}），删除后重新下载")
+                blob.unlink(missing_ok=True)
+                self.forget([row[0]])
+                return None
+        return blob
+
+    def _record(self, arxiv_id: str, sha: str, size: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pdfs (arxiv_id, sha256, size, added_at) VALUES (?,?,?,?)",
+                (arxiv_id, sha, size, datetime.now(timezone.utc).isoformat()),
+            )
+            self._conn.commit()
+
+    def put(self, arxiv_id: str, tmp: str | Path, sha: str, size: int) -> Path:
+        """把下载好的临时文件收入仓库（同内容已存在时 tmp 原样留给调用方删除），返回实体路径"""
+        blob = self.blob_path(sha)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, blob)
+        self._record(arxiv_id, sha, size)
+        return blob
+
+    def adopt(self, arxiv_id: str, path: str | Path) -> Path:
+        """把已有的本地 PDF（比如仓库启用前下载的）登记进仓库"""
+        sha = file_sha256(path)
+        blob = self.blob_path(sha)
+        if not blob.exists():
+            link_or_copy(path, blob)
+        self._record(arxiv_id, sha, Path(path).stat().st_size)
+        return blob
+
+    def ids_for(self, sha: str) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT arxiv_id FROM pdfs WHERE sha256=?", (sha,))]
+
+    def forget(self, shas: Iterable[str]) -> None:
+        """实体文件被清理后删掉对应的索引行"""
+        with self._lock:
+            self._conn.executemany("DELETE FROM pdfs WHERE sha256=?", [(s,) for s in shas])
+            self._conn.commit()
+
+    def materialize(self, arxiv_id: str, dst: str | Path) -> Optional[str]:
+        """仓库里有该 id 时把它放到 dst，返回 "link"/"copy"；没有时返回 None"""
+        blob = self.lookup(arxiv_id, verify=True)
+        if blob is None:
+            return None
+        return link_or_copy(blob, dst)
+
+_STORE: Optional[PdfStore] = None
+_STORE_LOCK = threading.Lock()
+
+def get_pdf_store() -> Optional[PdfStore]:
+    """进程内单例；PDF_STORE_ENABLED=False 时返回 None"""
+    global _STORE
+    if not PDF_STORE_ENABLED:
+        return None
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = PdfStore(PDF_STORE_DIR)
+        return _STORE
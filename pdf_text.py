@@ -0,0 +1,49 @@
+# pdf_text.py
+"""
+从本地缓存的 PDF 直接抽前几页文字（作者/单位通常在首页/次页），供机构判定（json2decide.call_qwen_plus）用，
+不必先等 MinerU 把整篇解析完。引擎由 PDF_EXTRACT_ENGINE 指定（"pymupdf" | "pypdf"），
+首选引擎没装时自动换另一个；两个都没装、或 PDF 没有文字层（扫描件）时返回空串，调用方退回 MinerU。
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional
+
+from config import DEBUG, MAX_PDF_PAGES_TO_SCAN, PDF_EXTRACT_ENGINE
+
+def _pymupdf_text(path: Path, max_pages: int) -> str:
+    try:
+        import pymupdf
+    except ImportError:
+        import fitz as pymupdf   # 旧版 PyMuPDF 的包名
+    with pymupdf.open(str(path)) as doc:
+        # sort=True 按阅读顺序（上→下、左→右）输出，双栏作者区不会被拆散
+        return "\n".join(doc[i].get_text("text", sort=True) for i in range(min(max_pages, doc.page_count)))
+
+def _pypdf_text(path: Path, max_pages: int) -> str:
+    from pypdf import PdfReader
+    reader = PdfReader(str(path))
+    return "\n".join((reader.pages[i].extract_text() or "") for i in range(min(max_pages, len(reader.pages))))
+
+_ENGINES = {"pymupdf": _pymupdf_text, "pypdf": _pypdf_text}
+
+def first_pages_text(pdf_path: str | Path, max_pages: Optional[int] = None, engine: Optional[str] = None) -> str:
+    """前 max_pages（默认 MAX_PDF_PAGES_TO_SCAN）页的文字；抽不到时返回空串"""
+    max_pages = MAX_PDF_PAGES_TO_SCAN if max_pages is None else max_pages
+    first = (engine or PDF_EXTRACT_ENGINE or "pymupdf").lower()
+    order = [first] + [e for e in _ENGINES if e != first]
+    for name in order:
+        fn = _ENGINES.get(name)
+        if fn is None:
+            continue
+        try:
+            text = fn(Path(pdf_path), max_pages)
+        except ImportError:
+            continue
+        except Exception as e:
+            if DEBUG:
+                print(f"[DEBUG] {name} failed on {Path(pdf_path).name}: {e}")
+            return ""
+        return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+    if DEBUG:
+        print("[DEBUG] neither PyMuPDF nor pypdf is installed; local first-pages extraction disabled")
+    return ""
@@ -1,14 +1,19 @@
 # prefetch.py
 from __future__ import annotations
-import os, re, requests
-from typing import Dict, Any, List
+import hashlib, os, re, requests, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 from requests.exceptions import HTTPError
-from config import PDF_CACHE_DIR, CONNECT_TIMEOUT_SEC, READ_TIMEOUT_SEC
+from config import PDF_CACHE_DIR, CONNECT_TIMEOUT_SEC, READ_TIMEOUT_SEC, DOWNLOAD_CONCURRENCY
 from fetch_arxiv import get_arxiv_id  # 你之前已添加的工具函数
+from paper_entry import PaperEntry
+from pdf_store import PdfStore, get_pdf_store, link_or_copy, verify_pdf
 from datetime import datetime
 
 SAFE_NAME = re.compile(r"[^a-zA-Z0-9._/-]+")
+_CHUNK = 1 << 16   # 流式写盘的块大小
 
 def ensure_dir(p: str | Path):
     Path(p).mkdir(parents=True, exist_ok=True)
@@ -21,43 +26,174 @@ def canonical_pdf_urls(arxiv_id: str) -> List[str]:
             urls.append(f"https://arxiv.org/pdf/{base}.pdf")
     return urls
 
-def cache_pdfs(entries: List[Dict[str, Any]], subdir: str | None = None) -> Dict[str, str]:
+@dataclass
+class PrefetchStats:
+    downloaded: int = 0
+    skipped: int = 0       # 当日目录里已有
+    reused: int = 0        # 从 PDF 仓库链接（之前某天下载过）
+    resumed: int = 0       # 从上次中断的 .part 续传
+    corrupt: int = 0       # 缓存里发现的坏文件（已删掉重新获取）
+    failed: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.bytes / 1e6 / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"downloaded={self.downloaded} resumed={self.resumed} reused={self.reused} skipped={self.skipped} "
+                f"corrupt={self.corrupt} failed={self.failed} "
+                f"{self.bytes / 1e6:.1f} MB in {self.seconds:.1f}s ({self.mb_per_sec:.2f} MB/s)")
+
+# requests.Session 不保证线程安全：每个下载线程各用一个
+_TLS = threading.local()
+
+def _session() -> requests.Session:
+    sess = getattr(_TLS, "sess", None)
+    if sess is None:
+        sess = requests.Session()
+        sess.headers.update({"User-Agent": "DailyPaper/1.0 (+cache)"})
+        _TLS.sess = sess
+    return sess
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-\d+/(\d+|\*)")
+_ATTEMPTS = 3      # 同一地址中途断开时，本次运行内接着 .part 续传的次数
+
+class IncompleteDownload(IOError):
+    """下载完的文件没通过 verify_pdf（长度不符 / 不是 PDF / 被截断）"""
+
+def _hash_file(h, path: Path) -> None:
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+def _download(url: str, part: Path) -> Tuple[int, str, bool]:
     """
-    预下载所有候选 entry 到 PDF_CACHE_DIR，返回 {arxiv_id: local_path}
-    已存在则跳过。
+    下载到 part；part 里已有内容时发 Range 请求续传（服务端不支持 Range 时从头写）。
+    完成后用 verify_pdf 校验（长度对上 Content-Length / Content-Range 的总长、%PDF 头、%%EOF 尾），
+    不通过时删掉 part 并抛 IncompleteDownload。返回 (本次下载字节数, 整个文件的 sha256, 是否续传)。
+    """
+    offset = part.stat().st_size if part.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with _session().get(url, headers=headers, stream=True, timeout=(CONNECT_TIMEOUT_SEC, READ_TIMEOUT_SEC)) as r:
+        m = _CONTENT_RANGE.match(r.headers.get("Content-Range") or "")
+        if offset and (r.status_code == 416 or (r.status_code == 206 and (m is None or int(m.group(1)) != offset))):
+            # .part 与服务端对不上（文件变了 / 已经超长）：丢掉从头下
+            part.unlink(missing_ok=True)
+            return _download(url, part)
+        r.raise_for_status()
+        h = hashlib.sha256()
+        resumed = bool(offset) and r.status_code == 206
+        if resumed:
+            _hash_file(h, part)
+            total = int(m.group(2)) if m.group(2) != "*" else None
+        else:
+            # 200：完整响应；Content-Encoding 压缩时 Content-Length 是压缩后的长度，不能拿来比
+            cl = r.headers.get("Content-Length")
+            total = int(cl) if cl and r.headers.get("Content-Encoding", "identity") == "identity" else None
+        n = 0
+        with open(part, "ab" if resumed else "wb") as f:
+            for chunk in r.iter_content(_CHUNK):
+                f.write(chunk)
+                h.update(chunk)
+                n += len(chunk)
+    bad = verify_pdf(part, total)
+    if bad is not None:
+        part.unlink(missing_ok=True)
+        raise IncompleteDownload(f"{url}: {bad}")
+    return n, h.hexdigest(), resumed
+
+def _download_resuming(url: str, part: Path) -> Tuple[int, str, bool]:
+    """连接中途断开 / 读超时时，接着 .part 再试，最多 _ATTEMPTS 次；HTTP 错误与校验失败直接抛出"""
+    for _ in range(_ATTEMPTS - 1):
+        try:
+            return _download(url, part)
+        except (HTTPError, IncompleteDownload):
+            raise
+        except requests.RequestException:
+            continue
+    return _download(url, part)
+
+def _fetch_one(aid: str, fpath: Path, store: Optional[PdfStore]) -> Tuple[Optional[int], Any, bool]:
+    """
+    (字节数, None, 是否续传) 或 (None, 最后一个错误, False)；带版本号的 404 时退回不带版本号的地址。
+    有仓库时先下载进仓库再链接到 fpath，否则写同目录 .part 文件，校验通过后原子改名。
+    失败时 .part 留着，下次运行从断点续传（校验失败的已在 _download 里删掉）。
+    """
+    part = store.part_path(fpath.name) if store else fpath.with_name(fpath.name + ".part")
+    last_err = None
+    for url in canonical_pdf_urls(aid):
+        try:
+            n, sha, resumed = _download_resuming(url, part)
+        except HTTPError as e2:
+            last_err = e2
+            if e2.response is not None and e2.response.status_code == 404:
+                continue
+            break
+        except Exception as e3:
+            last_err = e3
+            break
+        if store:
+            link_or_copy(store.put(aid, part, sha, part.stat().st_size), fpath)
+            part.unlink(missing_ok=True)   # 仓库里已有同内容时 put 不会挪走它
+        else:
+            os.replace(part, fpath)
+        return n, None, resumed
+    return None, last_err, False
+
+def cache_pdfs(entries: List[PaperEntry], subdir: str | None = None, concurrency: int | None = None) -> Dict[str, str]:
+    """
+    预下载所有候选 entry 到 PDF_CACHE_DIR/<subdir>，返回 {arxiv_id: local_path}
+    当日目录已有且通过 verify_pdf 则跳过（坏文件删掉重新获取）；PDF 仓库（pdf_store）里有同一 id 的直接链接过来；
+    其余由 DOWNLOAD_CONCURRENCY 个线程并发流式下载进仓库（.part + Range 续传，校验通过才入库）。
     """
     date_dir = subdir or datetime.now().date().isoformat()
     root = Path(PDF_CACHE_DIR) / date_dir
     ensure_dir(root)
     out: Dict[str, str] = {}
-    sess = requests.Session()
-    sess.headers.update({"User-Agent": "DailyPaper/1.0 (+cache)"})
+    stats = PrefetchStats()
+    todo: Dict[str, Path] = {}
+    store = get_pdf_store()
 
     for e in entries:
         aid = get_arxiv_id(e)  # e.g. 2506.16012v2
         rel = SAFE_NAME.sub("_", aid) + ".pdf"
         fpath = root / rel
         if fpath.exists():
+            bad = verify_pdf(fpath)
+            if bad is None:
+                if store and store.lookup(aid) is None:
+                    store.adopt(aid, fpath)  # 仓库启用前下载的文件，登记后其他日期可直接复用
+                out[aid] = str(fpath)
+                stats.skipped += 1
+                continue
+            # 被杀掉的旧运行留下的半截文件等：现在就重新获取，别等到 MinerU 那边才失败
+            print(f"[WARN] 缓存的 {fpath.name} 不完整（{bad}），重新获取")
+            fpath.unlink()
+            stats.corrupt += 1
+        if store and store.materialize(aid, fpath):
             out[aid] = str(fpath)
+            stats.reused += 1
             continue
-        last_err = None
-        for url in canonical_pdf_urls(aid):
-            try:
-                r = sess.get(url, timeout=(CONNECT_TIMEOUT_SEC, READ_TIMEOUT_SEC))
-                r.raise_for_status()
-                with open(fpath, "wb") as f:
-                    f.write(r.content)
-                out[aid] = str(fpath)
-                break
-            except HTTPError as e2:
-                last_err = e2
-                if e2.response is not None and e2.response.status_code == 404:
+        todo[aid] = fpath
+
+    workers = max(1, int(concurrency or DOWNLOAD_CONCURRENCY))
+    t0 = time.perf_counter()
+    if todo:
+        with ThreadPoolExecutor(max_workers=min(workers, len(todo)), thread_name_prefix="pdf") as ex:
+            futures = {aid: ex.submit(_fetch_one, aid, fpath, store) for aid, fpath in todo.items()}
+            for aid, fut in futures.items():
+                n, last_err, resumed = fut.result()
+                if n is None:
+                    stats.failed += 1
+                    print(f"[WARN] 缓存失败 {aid}: {last_err}")
                     continue
-                else:
-                    break
-            except Exception as e3:
-                last_err = e3
-                break
-        if aid not in out:
-            print(f"[WARN] 缓存失败 {aid}: {last_err}")
+                out[aid] = str(todo[aid])
+                stats.downloaded += 1
+                stats.resumed += resumed
+                stats.bytes += n
+    stats.seconds = time.perf_counter() - t0
+    print(f"[prefetch] {stats}")
+    cache_pdfs.last_stats = stats
     return out
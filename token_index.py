@@ -0,0 +1,178 @@
+# token_index.py
+"""
+元数据库上的倒排索引（token -> (base_id, version)）与基于它的“规则重放”查询。
+改了 INSTITUTIONS_PATTERNS / TOPIC_*_PATTERNS 之后，想看最近几天的论文在新规则下会怎样，
+不必重新抓取、也不必对窗口内每篇都跑全部正则：
+- 条目入库（meta_store.MetaStore.upsert_many）时，title/summary/comment/journal_ref/作者 切词，
+  写入 SQLite FTS5 表 doc_tokens（倒排索引本身由 FTS5 在 C 里维护）；
+- 查询时把每条规则开头的字面串（multimatch.literal_prefixes）换成索引条件（整词 / 词前缀 / 中文单字与二字组），
+  拼成一条 FTS5 MATCH 取出候选，再只对候选跑正则确认。
+  有规则取不到索引条件时退回到窗口内全量校验；两种情况结果都与逐条跑正则一致。
+
+    python token_index.py orgs --hours 24          # 当前 INSTITUTIONS_PATTERNS 下最近 24 小时的机构分桶
+    python token_index.py topics --hours 24        # 当前主题规则下的候选数与最高分
+    python token_index.py reindex                  # 对库里已有条目重建索引
+"""
+from __future__ import annotations
+import argparse
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config import DEBUG
+from multimatch import literal_prefixes
+
+# 中日韩文字 / 其余字母数字，各自成段（两者相邻或遇到下划线时也断开，与 FTS5 unicode61 的切分一致）
+_CJK = "\u3400-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af"
+_SEG = re.compile(f"([{_CJK}]+)|([^\\W_{_CJK}]+)")
+
+def _cjk_grams(seg: str) -> List[str]:
+    return list(seg) if len(seg) == 1 else [seg[i:i + 2] for i in range(len(seg) - 1)]
+
+def tokenize(text: str) -> Set[str]:
+    """小写后的词；中日韩文字按单字 + 相邻二字组切"""
+    out: Set[str] = set()
+    for cjk, word in _SEG.findall(text.lower()):
+        if cjk:
+            out.update(cjk)
+            out.update(_cjk_grams(cjk))
+        else:
+            out.add(word)
+    return out
+
+# 索引条件：("eq", token) 整词；("pre", token) 词前缀
+Constraint = Tuple[str, str]
+
+def literal_constraints(lit: str, bounded: bool) -> Optional[List[Constraint]]:
+    """
+    文本里出现字面串 lit（且 bounded 时前面是词边界）时必然成立的索引条件（取交集）；
+    一个都取不到时返回 None。段的起止若落在 lit 内部的分隔处，就与文本里 token 的起止重合。
+    """
+    cons: List[Constraint] = []
+    for m in _SEG.finditer(lit):
+        seg, s, e = m.group(), m.start(), m.end()
+        if m.group(1):
+            cons.extend(("eq", g) for g in _cjk_grams(seg))
+            continue
+        start_fixed = s > 0 or bounded
+        end_fixed = e < len(lit)
+        if start_fixed and end_fixed:
+            cons.append(("eq", seg))
+        elif start_fixed:
+            cons.append(("pre", seg))
+    return cons or None
+
+def rule_constraints(patterns: Iterable[str]) -> Optional[List[List[Constraint]]]:
+    """一组模式（取并集）→ 各字面分支的条件列表；任何一支取不到条件时返回 None（= 全量校验）"""
+    out: List[List[Constraint]] = []
+    for p in patterns:
+        lits = literal_prefixes(p)
+        if lits is None:
+            return None
+        for lit, bounded in lits:
+            cons = literal_constraints(lit, bounded)
+            if cons is None:
+                return None
+            out.append(cons)
+    return out
+
+Key = Tuple[str, int]
+
+def _fts_term(c: Constraint) -> str:
+    return f'"{c[1]}"*' if c[0] == "pre" else f'"{c[1]}"'
+
+def fts_query(patterns: Iterable[str]) -> Optional[str]:
+    """命中任一模式的条目必然满足的 FTS5 查询；有模式取不到索引条件时返回 None"""
+    branches = rule_constraints(patterns)
+    if branches is None:
+        return None
+    parts = sorted({"(" + " AND ".join(_fts_term(c) for c in cons) + ")" for cons in branches})
+    return " OR ".join(parts) if parts else None
+
+def candidate_keys(store, patterns: Iterable[str], start_utc: datetime, end_utc: datetime,
+                   mode: str = "both") -> Set[Key]:
+    """窗口内可能命中任一模式的 (base_id, version)"""
+    q = fts_query(patterns)
+    if q is None:
+        return store.window_keys(start_utc, end_utc, mode)
+    missing = store.unindexed_in_window(start_utc, end_utc, mode)
+    if missing:
+        # 窗口里有没建索引的条目：这次退回全量校验，保证结果不漏
+        if DEBUG:
+            print(f"[DEBUG] token index: {missing} entries in window not indexed, scanning window (run `python token_index.py reindex`)")
+        return store.window_keys(start_utc, end_utc, mode)
+    return store.keys_for_match(q, start_utc, end_utc, mode)
+
+def requery_orgs(start_utc: datetime, end_utc: datetime, mode: str = "both",
+                 patterns: Optional[Dict[str, List[str]]] = None, store=None) -> Dict[str, list]:
+    """窗口内条目按（新的）机构规则分桶；与对窗口内全部条目跑 classify.group_by_org 结果一致"""
+    from classify import OrgMatcher
+    from config import INSTITUTIONS_PATTERNS
+    from meta_store import get_store
+    store = store or get_store()
+    patterns = patterns or INSTITUTIONS_PATTERNS
+    keys = candidate_keys(store, [p for pats in patterns.values() for p in pats], start_utc, end_utc, mode)
+    matcher = OrgMatcher(patterns)
+    buckets: Dict[str, list] = {}
+    for e in store.get_by_keys(keys).values():
+        for org in matcher.match(e.haystack, low=e.haystack_lower):
+            buckets.setdefault(org, []).append(e)
+    return buckets
+
+def requery_topics(start_utc: datetime, end_utc: datetime, mode: str = "both",
+                   include: Optional[List[str]] = None, exclude: Optional[List[str]] = None, store=None) -> list:
+    """
+    窗口内 is_cs 且通过（新的）主题规则的 [(TopicScore, 条目)]，按分数降序；
+    即“用这套规则，这个窗口的候选集会是什么”。
+    """
+    from batch_classify import classify_batch
+    from config import TOPIC_INCLUDE_PATTERNS, TOPIC_EXCLUDE_PATTERNS
+    from filters import TopicScorer
+    from meta_store import get_store
+    store = store or get_store()
+    include = TOPIC_INCLUDE_PATTERNS if include is None else include
+    exclude = TOPIC_EXCLUDE_PATTERNS if exclude is None else exclude
+    # 只有命中某条 include 的条目才可能通过，exclude 在确认阶段由 TopicScorer 处理
+    keys = candidate_keys(store, include, start_utc, end_utc, mode)
+    rows = list(store.get_by_keys(keys).values())
+    batch = classify_batch(rows, orgs=False, topics=False)
+    scorer = TopicScorer(include, exclude)
+    scored = [(scorer.score(e), e) for e in batch.select(batch.is_cs)]
+    scored = [(s, e) for s, e in scored if s.accepted]
+    scored.sort(key=lambda se: -se[0].score)
+    return scored
+
+def main() -> None:
+    from meta_store import get_store
+    pa = argparse.ArgumentParser("token_index")
+    pa.add_argument("cmd", choices=["orgs", "topics", "reindex"])
+    pa.add_argument("--hours", type=int, default=24)
+    pa.add_argument("--published", choices=["both", "updated"], default="both")
+    args = pa.parse_args()
+    store = get_store()
+    if store is None:
+        print("META_STORE_ENABLED=False，没有可查询的本地库")
+        return
+    t0 = time.perf_counter()
+    if args.cmd == "reindex":
+        n = store.reindex()
+        print(f"reindexed {n} entries in {time.perf_counter() - t0:.1f}s")
+        return
+    end_utc = datetime.now(timezone.utc)
+    start_utc = end_utc - timedelta(hours=args.hours)
+    if args.cmd == "orgs":
+        buckets = requery_orgs(start_utc, end_utc, args.published, store=store)
+        ms = (time.perf_counter() - t0) * 1000
+        for org, rows in sorted(buckets.items(), key=lambda kv: -len(kv[1])):
+            print(f"{org:>16}: {len(rows)}")
+        print(f"[{ms:.0f} ms]")
+    else:
+        scored = requery_topics(start_utc, end_utc, args.published, store=store)
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"candidates: {len(scored)}  [{ms:.0f} ms]")
+        for s, e in scored[:10]:
+            print(f"{s.score:6.1f}  {e.arxiv_id}  {e.title[:80]}")
+
+if __name__ == "__main__":
+    main()
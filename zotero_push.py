@@ -5,7 +5,6 @@ import hashlib
 import json
 import re
 import uuid
-import xml.etree.ElementTree as ET
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Tuple, Optional
@@ -130,6 +129,36 @@ def infer_arxiv_url(stem: str) -> str:
     return ""
 
 
+# fetch_arxiv_metadata 的进程内结果：由 prefetch_arxiv_metadata 批量填充
+_ARXIV_META: Dict[str, Tuple[str, str]] = {}
+
+
+def prefetch_arxiv_metadata(arxiv_ids: List[str], timeout: int = 20) -> int:
+    """
+    Bulk-resolve title/summary for many ids (local metadata store first, then id_list batches).
+    Fills the cache used by fetch_arxiv_metadata; returns how many ids were resolved.
+    Ids that were looked up but not returned by arXiv are cached as ("", "") so they are not re-requested;
+    ids from a failed batch are left uncached and retried on the next call.
+    """
+    ids = [i for i in arxiv_ids if is_arxiv_id(i) and i not in _ARXIV_META]
+    if not ids:
+        return 0
+    failed: List[str] = []
+    try:
+        from fetch_arxiv import lookup_ids
+        from meta_store import get_store
+        recs = lookup_ids(ids, store=get_store(), timeout=timeout, failed=failed)
+    except Exception:
+        return 0
+    for aid, rec in recs.items():
+        _ARXIV_META[aid] = (normalize_spaces(rec.title), rec.summary)
+    failed_set = set(failed)
+    for aid in ids:
+        if aid not in recs and aid not in failed_set:
+            _ARXIV_META[aid] = ("", "")
+    return len(recs)
+
+
 def fetch_arxiv_metadata(arxiv_id: str, timeout: int = 20) -> Tuple[str, str]:
     """
     Fetch title/summary from arXiv Atom API.
@@ -137,22 +166,9 @@ def fetch_arxiv_metadata(arxiv_id: str, timeout: int = 20) -> Tuple[str, str]:
     """
     if not is_arxiv_id(arxiv_id):
         return "", ""
-
-    api = f"https://export.arxiv.org/api/query?id_list={arxiv_id}"
-    try:
-        r = requests.get(api, timeout=timeout, headers={"User-Agent": "arxiv-daily-paper/1.0"})
-        if r.status_code != 200 or not r.text:
-            return "", ""
-        root = ET.fromstring(r.text)
-        ns = {"a": "http://www.w3.org/2005/Atom"}
-        entry = root.find("a:entry", ns)
-        if entry is None:
-            return "", ""
-        title = entry.findtext("a:title", default="", namespaces=ns)
-        summary = entry.findtext("a:summary", default="", namespaces=ns)
-        return normalize_spaces(title), (summary or "").strip()
-    except Exception:
-        return "", ""
+    if arxiv_id not in _ARXIV_META:
+        prefetch_arxiv_metadata([arxiv_id], timeout=timeout)
+    return _ARXIV_META.get(arxiv_id, ("", ""))
 
 
 def apply_title_template(tpl: str, *, stem: str, title: str) -> str:
@@ -406,6 +422,11 @@ def run_mode_a(args: argparse.Namespace) -> int:
             print(f"[A][ERR] failed to load title map: {e}")
             return 2
 
+    if args.a_title_mode == "drag":
+        # 一次（或几次）id_list 请求取回当天所有论文的官方标题，避免逐篇请求
+        n = prefetch_arxiv_metadata(stems, timeout=args.arxiv_timeout)
+        print(f"[A] arXiv metadata prefetched: {n}/{len(stems)}")
+
     session_id = f"arxiv_daily_{uuid.uuid4().hex}"
 
     items_payload: List[Dict[str, Any]] = []